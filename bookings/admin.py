@@ -1,13 +1,19 @@
-from django.contrib import admin
-from .models import Booking
+from django.contrib import admin, messages
+from core.admin import LargeTableAdmin
+from .bulk import BookingOverlapError, set_booking_status
+from .models import ArchivedBooking, Booking, BookingHold
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LargeTableAdmin):
     list_display = ('id', 'customer', 'vehicle', 'start_date', 'end_date', 'total_amount', 'status', 'created_at')
-    list_filter = ('status', 'deposit_paid', 'start_date', 'end_date', 'created_at')
-    search_fields = ('customer__username', 'vehicle__plate_number', 'vehicle__make', 'vehicle__model')
+    list_filter = ('status', 'deposit_paid')
+    list_select_related = ('customer', 'vehicle')
+    # Prefix matches only, served by the UPPER(...) text_pattern_ops indexes
+    search_fields = ('^customer__username', '^vehicle__plate_number')
+    date_hierarchy = 'start_date'
     ordering = ('-created_at',)
+    actions = ('confirm_bookings', 'cancel_bookings')
     readonly_fields = ('created_at', 'updated_at', 'duration_days', 'is_active', 'is_overdue')
     
     fieldsets = (
@@ -29,3 +35,43 @@ class BookingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+    def set_status(self, request, queryset, status):
+        try:
+            updated = set_booking_status(queryset, status)
+        except BookingOverlapError as exc:
+            self.message_user(request, f'No bookings were marked {status}: {exc}', messages.ERROR)
+            return
+        self.message_user(request, f'{updated} booking(s) marked {status}.')
+
+    @admin.action(description='Confirm selected bookings')
+    def confirm_bookings(self, request, queryset):
+        self.set_status(request, queryset, 'confirmed')
+
+    @admin.action(description='Cancel selected bookings')
+    def cancel_bookings(self, request, queryset):
+        self.set_status(request, queryset, 'cancelled')
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer', 'vehicle', 'start_date', 'end_date', 'status', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    list_select_related = ('customer', 'vehicle')
+    search_fields = ('^customer__username', '^vehicle__plate_number')
+    ordering = ('-created_at',)
+    exclude = ('payload',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BookingHold)
+class BookingHoldAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customer', 'vehicle', 'start_date', 'end_date', 'expires_at', 'created_at')
+    search_fields = ('^customer__username', '^vehicle__plate_number')
+    list_select_related = ('customer', 'vehicle')
+    readonly_fields = ('created_at',)
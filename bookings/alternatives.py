@@ -0,0 +1,86 @@
+"""
+Similar vehicles that are free when a requested one is not.
+
+One query ranks available vehicles by how closely they match the requested
+one: same make and model, same seats, same transmission, daily rate within
+``BOOKING_ALTERNATIVES_RATE_BAND``. Vehicles with a confirmed or active
+booking or another customer's active hold over the window are removed with
+``NOT EXISTS`` anti-joins. Suggestions tolerate replica lag, so unlike the
+overlap checks they are read from a replica when one is configured, even
+while serving the POST that asked for them. On
+PostgreSQL the query is cancelled after
+``BOOKING_ALTERNATIVES_TIMEOUT_MS``; suggestions are best effort, so a slow
+query just yields none.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, router
+from django.db.models import Case, Exists, F, Func, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from core.db.timeouts import statement_timeout
+from core.db_router import read_from_replicas
+from vehicles.models import Vehicle
+
+from .models import Booking, BookingHold
+
+logger = logging.getLogger(__name__)
+
+
+def _points(condition, points):
+    return Case(When(condition, then=Value(points)), default=Value(0), output_field=IntegerField())
+
+
+def alternatives_queryset(vehicle, start_date, end_date, customer_id=None):
+    """Free vehicles similar to ``vehicle``, best match first"""
+    now = timezone.now()
+    max_duration = timedelta(days=settings.BOOKING_MAX_DURATION_DAYS)
+    band = settings.BOOKING_ALTERNATIVES_RATE_BAND
+    rate = Vehicle._meta.get_field('daily_rate').to_python(vehicle.daily_rate)
+    booked = Booking.objects.filter(
+        vehicle=OuterRef('pk'),
+        status__in=['confirmed', 'active'],
+        start_date__gt=start_date - max_duration,
+        start_date__lt=end_date,
+        end_date__gt=start_date,
+    )
+    held = BookingHold.objects.filter(
+        vehicle=OuterRef('pk'), expires_at__gt=now, start_date__lt=end_date, end_date__gt=start_date,
+    )
+    if customer_id is not None:
+        held = held.exclude(customer_id=customer_id)
+
+    score = (
+        _points(Q(make=vehicle.make, model=vehicle.model), 8)
+        + _points(Q(seats=vehicle.seats), 4)
+        + _points(Q(transmission=vehicle.transmission), 2)
+        + _points(Q(daily_rate__range=(rate - band, rate + band)), 1)
+    )
+    return (
+        Vehicle.objects.filter(status='available')
+        .exclude(pk=vehicle.pk)
+        .annotate(match_score=score, rate_distance=Func(F('daily_rate') - rate, function='ABS'))
+        .filter(match_score__gt=0)
+        .exclude(Exists(booked))
+        .exclude(Exists(held))
+        .order_by('-match_score', 'rate_distance', 'id')
+    )
+
+
+def alternative_vehicles(vehicle, start_date, end_date, customer_id=None, limit=None):
+    """Return up to ``limit`` free vehicles similar to ``vehicle``"""
+    limit = settings.BOOKING_ALTERNATIVES_LIMIT if limit is None else limit
+    if limit <= 0:
+        return []
+    # Writes are pinned to the primary; the suggestions need not be
+    with read_from_replicas():
+        using = router.db_for_read(Vehicle)
+    queryset = alternatives_queryset(vehicle, start_date, end_date, customer_id).using(using)[:limit]
+    try:
+        with statement_timeout(using, settings.BOOKING_ALTERNATIVES_TIMEOUT_MS):
+            return list(queryset)
+    except OperationalError:
+        logger.warning('Alternative vehicle lookup for vehicle %s timed out', vehicle.pk)
+        return []
@@ -0,0 +1,76 @@
+"""
+Cold archive for old completed and cancelled bookings.
+
+``archive_bookings`` moves terminal bookings that ended before a cutoff into
+``bookings_archive`` in chunks, one transaction per chunk. ``BookingHistory``
+lets list views page through live bookings followed by archived ones,
+touching the archive only once a page goes past the live rows.
+"""
+from django.db import transaction
+
+from .counters import counters_paused
+from .models import ArchivedBooking, Booking
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+
+
+def archive_bookings(cutoff, chunk_size=1000):
+    """
+    Archive terminal bookings that ended before ``cutoff``.
+
+    Yields the number of bookings moved by each chunk.
+    """
+    candidates = Booking.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        end_date__lt=cutoff,
+    ).order_by('id')
+    while True:
+        with transaction.atomic():
+            chunk = list(candidates.select_for_update(skip_locked=True)[:chunk_size])
+            if not chunk:
+                return
+            ArchivedBooking.objects.bulk_create(
+                [ArchivedBooking.from_booking(booking) for booking in chunk],
+                ignore_conflicts=True,
+            )
+            # Archived bookings still count towards the user and vehicle totals
+            with counters_paused():
+                Booking.objects.filter(id__in=[booking.id for booking in chunk]).delete()
+        yield len(chunk)
+
+
+class BookingHistory:
+    """
+    Sliceable sequence of live bookings followed by archived ones
+    """
+
+    def __init__(self, live, archived, convert=None):
+        self.live = live
+        self.archived = archived.select_related('customer', 'vehicle')
+        # Turns the rebuilt Booking into whatever the live rows are
+        self.convert = convert
+        self._live_count = None
+
+    def live_count(self):
+        if self._live_count is None:
+            self._live_count = self.live.count()
+        return self._live_count
+
+    def count(self):
+        return self.live_count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        live_count = self.live_count()
+        items = list(self.live[start:min(stop, live_count)]) if start < live_count else []
+        if stop > live_count:
+            offset = max(start - live_count, 0)
+            archived = self.archived[offset:stop - live_count]
+            bookings = (archived_booking.to_booking() for archived_booking in archived)
+            items.extend(map(self.convert, bookings) if self.convert else bookings)
+        return items
@@ -0,0 +1,131 @@
+"""
+Set-based status changes for many bookings at once.
+
+The bookings are changed with one ``UPDATE ... WHERE id IN (...)``, and the
+vehicle status changes ``BookingDetailView`` makes per booking are applied
+to all affected vehicles with one more. The user and vehicle counters take
+one ``UPDATE`` each.
+
+Moving bookings to a status that reserves the vehicle (confirmed, active)
+repeats the availability rules of ``Booking.clean`` for the whole batch:
+one query finds bookings that overlap a confirmed or active booking or
+another customer's active hold, and overlaps inside the batch are found
+in memory. Both run while the vehicles are locked, as placing a hold does.
+"""
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.concurrency import bump_version
+from core.signals import bulk_updated
+from vehicles.bulk import update_vehicles
+from vehicles.models import Vehicle
+
+from .counters import COUNTED_FIELDS, record_status_change
+from .models import Booking, BookingHold
+
+VEHICLE_STATUS_FOR = {
+    'cancelled': 'available',
+    'confirmed': 'rented',
+}
+
+# Statuses that take the vehicle for the booking window
+RESERVING_STATUSES = ('confirmed', 'active')
+
+# Bulk transitions each party to a booking may make, as {to: [from, ...]}
+CUSTOMER_TRANSITIONS = {
+    'cancelled': ['pending', 'confirmed'],
+}
+OWNER_TRANSITIONS = {
+    'confirmed': ['pending'],
+    'active': ['confirmed'],
+    'completed': ['active'],
+    'cancelled': ['pending', 'confirmed'],
+}
+
+
+class BookingOverlapError(Exception):
+    """Some bookings cannot take a reserving status because their dates are taken"""
+
+    def __init__(self, ids):
+        super().__init__(f'Bookings {", ".join(map(str, ids))} overlap other bookings or holds.')
+        self.ids = ids
+
+
+def overlapping_ids(rows):
+    """
+    Ids among ``rows`` of ``(id, vehicle_id, start_date, end_date)`` whose
+    windows overlap another row of the same vehicle
+    """
+    ids = set()
+    last = {}
+    for row in sorted(rows, key=lambda row: (row[1], row[2])):
+        previous = last.get(row[1])
+        if previous is not None and row[2] < previous[3]:
+            ids.update((row[0], previous[0]))
+        if previous is None or row[3] > previous[3]:
+            last[row[1]] = row
+    return ids
+
+
+def check_availability(ids, using):
+    """Raise BookingOverlapError unless the bookings ``ids`` can all reserve their vehicles"""
+    now = timezone.now()
+    taken = Booking.objects.using(using).filter(
+        vehicle=OuterRef('vehicle'),
+        status__in=RESERVING_STATUSES,
+        start_date__lt=OuterRef('end_date'),
+        end_date__gt=OuterRef('start_date'),
+    ).exclude(id__in=ids)
+    held = BookingHold.objects.using(using).filter(
+        vehicle=OuterRef('vehicle'),
+        expires_at__gt=now,
+        start_date__lt=OuterRef('end_date'),
+        end_date__gt=OuterRef('start_date'),
+    ).exclude(customer=OuterRef('customer'))
+    rows = list(
+        Booking.objects.using(using).filter(id__in=ids).order_by()
+        .annotate(taken=Exists(taken), held=Exists(held))
+        .values_list('id', 'vehicle_id', 'start_date', 'end_date', 'taken', 'held')
+    )
+    conflicts = {row[0] for row in rows if row[4] or row[5]}
+    conflicts |= overlapping_ids([row[:4] for row in rows])
+    if conflicts:
+        raise BookingOverlapError(sorted(conflicts))
+
+
+def set_booking_status(queryset, status):
+    """
+    Move every booking in ``queryset`` to ``status``.
+
+    Bookings already in that status are left alone. Returns the number of
+    bookings changed; raises BookingOverlapError, changing nothing, when
+    confirming or activating bookings whose dates are taken.
+    """
+    using = router.db_for_write(Booking)
+    queryset = queryset.using(using).exclude(status=status).order_by()
+    with transaction.atomic(using=using):
+        if status in RESERVING_STATUSES:
+            # Same lock order as placing or converting a hold: vehicles first
+            vehicle_ids = queryset.values('vehicle_id')
+            list(
+                Vehicle.objects.using(using).select_for_update().filter(id__in=vehicle_ids)
+                .order_by('pk').values_list('pk')
+            )
+        rows = list(queryset.select_for_update(of=('self',)).values_list('id', *COUNTED_FIELDS))
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        if status in RESERVING_STATUSES:
+            check_availability(ids, using)
+        updated = Booking.objects.using(using).filter(id__in=ids).update(
+            status=status, updated_at=timezone.now(), version=bump_version(),
+        )
+        record_status_change([row[1:] for row in rows], status, using)
+        bulk_updated.send(sender=Booking, ids=ids, fields=['status'], using=using)
+
+        vehicle_status = VEHICLE_STATUS_FOR.get(status)
+        if vehicle_status:
+            vehicle_ids = {row[2] for row in rows}
+            update_vehicles(Vehicle.objects.filter(id__in=vehicle_ids), status=vehicle_status)
+    return updated
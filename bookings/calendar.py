@@ -0,0 +1,231 @@
+"""
+iCalendar (RFC 5545) feeds of booking intervals.
+
+Every vehicle has a version marker in the cache that is replaced after
+each committed booking or vehicle change. Feed ETags are derived from the
+markers, so a poll whose ``If-None-Match`` matches is answered without
+reading any bookings, and a changed feed is rendered once, streamed to the
+client as it is built and cached under its ETag for later polls. Bookings
+are read from the primary, where the markers are bumped, so a lagging
+replica's rows are never cached under a newer ETag.
+
+Calendar apps subscribe to a plain URL and cannot send a JWT, so feeds also
+accept the owner's feed key as ``?key=``. Only a SHA-256 digest of the key
+is stored; rotating it revokes the URLs handed out before.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Booking
+
+FEED_STATUSES = ('pending', 'confirmed', 'active', 'completed')
+PRODID = '-//1Now//Lahore Car Rental//EN'
+UID_DOMAIN = 'lahore-car-rental'
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+EVENT_FIELDS = (
+    'id', 'status', 'start_date', 'end_date', 'updated_at',
+    'vehicle__year', 'vehicle__make', 'vehicle__model', 'vehicle__plate_number',
+)
+
+
+def hash_feed_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def rotate_feed_key(user):
+    """Give ``user`` a new feed key, revoking the old one, and return it"""
+    key = secrets.token_urlsafe(32)
+    get_user_model().objects.filter(pk=user.pk).update(calendar_feed_key=hash_feed_key(key))
+    return key
+
+
+def revoke_feed_key(user):
+    get_user_model().objects.filter(pk=user.pk).update(calendar_feed_key=None)
+
+
+class FeedKeyAuthentication(BaseAuthentication):
+    """
+    Authenticate feed requests by the owner's ``?key=`` feed key
+    """
+
+    def authenticate(self, request):
+        key = request.query_params.get('key')
+        if not key:
+            return None
+        user = get_user_model().objects.filter(calendar_feed_key=hash_feed_key(key), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Invalid or revoked calendar feed key.')
+        return user, None
+
+
+class FeedKeyScheme(OpenApiAuthenticationExtension):
+    target_class = FeedKeyAuthentication
+    name = 'calendarFeedKey'
+
+    def get_security_definition(self, auto_schema):
+        return {
+            'type': 'apiKey',
+            'in': 'query',
+            'name': 'key',
+            'description': 'Calendar feed key from POST /api/vehicles/calendar/key/',
+        }
+
+
+def marker_key(vehicle_id):
+    return f'booking_calendar:vehicle:{vehicle_id}'
+
+
+def bump_markers(vehicle_ids, using=None):
+    """Invalidate the feeds of ``vehicle_ids`` once the current transaction commits"""
+    vehicle_ids = {pk for pk in vehicle_ids if pk is not None}
+
+    def bump():
+        cache.set_many({marker_key(pk): uuid.uuid4().hex for pk in vehicle_ids}, timeout=None)
+    transaction.on_commit(bump, using=using)
+
+
+def vehicle_markers(vehicle_ids):
+    """Return the current marker of each vehicle, creating missing ones"""
+    keys = {pk: marker_key(pk) for pk in vehicle_ids}
+    found = cache.get_many(keys.values())
+    missing = {key: uuid.uuid4().hex for key in keys.values() if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [(pk, found[key]) for pk, key in sorted(keys.items())]
+
+
+def window_start():
+    """Earliest end date included in feeds, fixed for the whole UTC day"""
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    return datetime.combine(today - timedelta(days=settings.BOOKING_CALENDAR_PAST_DAYS), time.min, dt_timezone.utc)
+
+
+def feed_etag(scope, vehicle_ids):
+    markers = ','.join(f'{pk}:{marker}' for pk, marker in vehicle_markers(vehicle_ids))
+    raw = f'{scope}|{window_start().date()}|{markers}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def feed_bookings(vehicle_ids):
+    start = window_start()
+    return (
+        Booking.objects.using(router.db_for_write(Booking)).filter(
+            vehicle_id__in=vehicle_ids,
+            status__in=FEED_STATUSES,
+            end_date__gte=start,
+            # Lets PostgreSQL skip partitions that cannot hold such bookings
+            start_date__gte=start - timedelta(days=settings.BOOKING_MAX_DURATION_DAYS),
+        )
+        .order_by('start_date', 'id')
+        .values_list(*EVENT_FIELDS)
+    )
+
+
+def escape_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def content_line(line):
+    """Encode one content line, folded at 75 octets"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def event_lines(row):
+    pk, status, start_date, end_date, updated_at, year, make, model, plate_number = row
+    yield 'BEGIN:VEVENT'
+    yield f'UID:booking-{pk}@{UID_DOMAIN}'
+    yield f'DTSTAMP:{format_datetime(updated_at)}'
+    yield f'LAST-MODIFIED:{format_datetime(updated_at)}'
+    yield f'DTSTART:{format_datetime(start_date)}'
+    yield f'DTEND:{format_datetime(end_date)}'
+    yield f'SUMMARY:{escape_text(f"Booking #{pk}: {year} {make} {model} ({plate_number})")}'
+    yield f'STATUS:{"TENTATIVE" if status == "pending" else "CONFIRMED"}'
+    yield 'TRANSP:OPAQUE'
+    yield 'END:VEVENT'
+
+
+def render_feed(name, vehicle_ids):
+    """Yield the feed in chunks of one event each"""
+    yield b''.join(content_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ))
+    for row in feed_bookings(vehicle_ids).iterator(chunk_size=500):
+        yield b''.join(content_line(line) for line in event_lines(row))
+    yield content_line('END:VCALENDAR')
+
+
+def cached_feed(etag, name, vehicle_ids):
+    """
+    Return ``(content, None)`` from the cache, or ``(None, chunks)``.
+
+    ``chunks`` renders the feed and stores it under ``etag`` once the last
+    chunk has been produced.
+    """
+    key = f'booking_calendar:feed:{etag}'
+    content = cache.get(key)
+    if content is not None:
+        return content, None
+
+    def chunks():
+        rendered = []
+        for chunk in render_feed(name, vehicle_ids):
+            rendered.append(chunk)
+            yield chunk
+        cache.set(key, b''.join(rendered), settings.BOOKING_CALENDAR_CACHE_TIMEOUT)
+    return None, chunks()
+
+
+def feed_response(request, scope, name, vehicle_ids):
+    """Answer a feed request with 304, the cached feed or a streamed one"""
+    etag = feed_etag(scope, vehicle_ids)
+    if quote_etag(etag) in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        content, chunks = cached_feed(etag, name, vehicle_ids)
+        if content is not None:
+            response = HttpResponse(content, content_type=CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPE)
+    response['ETag'] = quote_etag(etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,192 @@
+"""
+Booking totals kept on users and vehicles.
+
+Every booking counts towards ``booking_count`` of its customer and vehicle,
+pending and confirmed ones towards ``upcoming_booking_count``, and completed
+ones add their ``total_amount`` to the customer's ``lifetime_spend`` and the
+vehicle's ``revenue``. Archived bookings keep counting, so archiving runs
+under ``counters_paused()``.
+
+Saves and deletes adjust the counters from the signal receivers in
+``bookings.signals``; set-based status changes call ``record_status_change``.
+``reconcile_counters`` recomputes everything from the bookings to repair
+drift.
+"""
+import json
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Count, Q, Sum
+
+from core.counters import add_to_counters, counter_deltas
+from vehicles.models import Vehicle
+
+from .models import ArchivedBooking, Booking
+
+User = get_user_model()
+
+UPCOMING_STATUSES = ('pending', 'confirmed')
+COUNTED_FIELDS = ('customer_id', 'vehicle_id', 'status', 'total_amount')
+
+_paused = ContextVar('booking_counters_paused', default=False)
+
+
+@contextmanager
+def counters_paused():
+    """Leave the counters alone for bookings deleted inside the block"""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def counters_are_paused():
+    return _paused.get()
+
+
+def counted_state(booking):
+    """What the counters know about ``booking``: (customer, vehicle, status, amount)"""
+    amount = Booking._meta.get_field('total_amount').to_python(booking.total_amount)
+    return (booking.customer_id, booking.vehicle_id, booking.status, amount)
+
+
+def stored_state(booking_id, using):
+    """The counted state of the saved row, or None if there is none"""
+    row = Booking.objects.using(using).filter(pk=booking_id).values_list(*COUNTED_FIELDS).first()
+    return tuple(row) if row else None
+
+
+def _add(user_deltas, vehicle_deltas, state, sign):
+    customer_id, vehicle_id, status, total_amount = state
+    upcoming = sign if status in UPCOMING_STATUSES else 0
+    spend = sign * total_amount if status == 'completed' else 0
+    for deltas, pk, spend_field in (
+        (user_deltas, customer_id, 'lifetime_spend'),
+        (vehicle_deltas, vehicle_id, 'revenue'),
+    ):
+        changes = deltas[pk]
+        changes['booking_count'] += sign
+        changes['upcoming_booking_count'] += upcoming
+        changes[spend_field] += spend
+
+
+def record_changes(changes, using):
+    """
+    Apply ``(before, after)`` pairs of counted states to the counters.
+
+    ``before`` is None for new bookings and ``after`` None for deleted ones.
+    Users and vehicles are updated with one query each.
+    """
+    user_deltas, vehicle_deltas = counter_deltas(), counter_deltas()
+    for before, after in changes:
+        if before == after:
+            continue
+        if before is not None:
+            _add(user_deltas, vehicle_deltas, before, -1)
+        if after is not None:
+            _add(user_deltas, vehicle_deltas, after, 1)
+    add_to_counters(User, user_deltas, using)
+    add_to_counters(Vehicle, vehicle_deltas, using)
+
+
+def record_status_change(rows, status, using):
+    """Counters for ``(customer_id, vehicle_id, old_status, total_amount)`` rows moved to ``status``"""
+    record_changes(
+        [((customer_id, vehicle_id, old_status, amount), (customer_id, vehicle_id, status, amount))
+         for customer_id, vehicle_id, old_status, amount in rows],
+        using,
+    )
+
+
+def _archived_spend(field, ids):
+    """Completed archived spend per ``field`` value; amounts live in the compressed payload"""
+    totals = {}
+    archived = ArchivedBooking.objects.filter(**{f'{field}__in': ids}, status='completed')
+    for key, payload in archived.values_list(field, 'payload').iterator():
+        amount = Decimal(json.loads(zlib.decompress(bytes(payload)))['total_amount'])
+        totals[key] = totals.get(key, 0) + amount
+    return totals
+
+
+def expected_booking_counters(field, ids, spend_field):
+    """Recompute the booking counters of users or vehicles ``ids``, grouped by ``field``"""
+    expected = {pk: {'booking_count': 0, 'upcoming_booking_count': 0, spend_field: Decimal('0')} for pk in ids}
+    live = (
+        Booking.objects.filter(**{f'{field}__in': ids}).order_by().values(field)
+        .annotate(
+            total=Count('id'),
+            upcoming=Count('id', filter=Q(status__in=UPCOMING_STATUSES)),
+            spend=Sum('total_amount', filter=Q(status='completed')),
+        )
+    )
+    for row in live:
+        counters = expected[row[field]]
+        counters['booking_count'] += row['total']
+        counters['upcoming_booking_count'] += row['upcoming']
+        counters[spend_field] += row['spend'] or 0
+    archived = (
+        ArchivedBooking.objects.filter(**{f'{field}__in': ids}).order_by().values(field)
+        .annotate(total=Count('id'))
+    )
+    for row in archived:
+        expected[row[field]]['booking_count'] += row['total']
+    for pk, amount in _archived_spend(field, ids).items():
+        expected[pk][spend_field] += amount
+    return expected
+
+
+def _reconcile(model, fields, expected_for, chunk_size, dry_run):
+    using = router.db_for_write(model)
+    repaired = 0
+    last_id = 0
+    while True:
+        # Locking the chunk makes concurrent increments wait, so they are
+        # applied on top of the recomputed values rather than lost.
+        with transaction.atomic(using=using):
+            rows = list(
+                model._default_manager.using(using).filter(pk__gt=last_id).order_by('pk')
+                .select_for_update().only('pk', *fields)[:chunk_size]
+            )
+            if not rows:
+                return repaired
+            last_id = rows[-1].pk
+            expected = expected_for([row.pk for row in rows])
+            drifted = []
+            for row in rows:
+                if any(getattr(row, name) != value for name, value in expected[row.pk].items()):
+                    for name, value in expected[row.pk].items():
+                        setattr(row, name, value)
+                    drifted.append(row)
+            if drifted and not dry_run:
+                model._default_manager.using(using).bulk_update(drifted, fields)
+            repaired += len(drifted)
+
+
+def reconcile_counters(chunk_size=1000, dry_run=False):
+    """
+    Recompute every user and vehicle counter and fix the ones that drifted.
+
+    Returns ``(users, vehicles)``, the number of rows that were wrong.
+    """
+    def expected_for_users(ids):
+        expected = expected_booking_counters('customer_id', ids, 'lifetime_spend')
+        for pk in ids:
+            expected[pk]['vehicle_count'] = 0
+        vehicles = (
+            Vehicle.objects.filter(owner_id__in=ids).order_by().values('owner_id').annotate(total=Count('id'))
+        )
+        for row in vehicles:
+            expected[row['owner_id']]['vehicle_count'] = row['total']
+        return expected
+
+    def expected_for_vehicles(ids):
+        return expected_booking_counters('vehicle_id', ids, 'revenue')
+
+    users = _reconcile(User, User.counter_fields, expected_for_users, chunk_size, dry_run)
+    vehicles = _reconcile(Vehicle, Vehicle.counter_fields, expected_for_vehicles, chunk_size, dry_run)
+    return users, vehicles
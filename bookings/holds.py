@@ -0,0 +1,56 @@
+"""
+Converting and purging booking holds.
+
+A hold's window was checked against bookings and other holds when it was
+placed, and no other hold can overlap it while it is active. Direct
+bookings check for holds without taking the vehicle's row lock, though, so
+one validated just before the hold was placed can still commit after it.
+Converting a hold therefore checks for overlapping bookings once more,
+under the vehicle lock, before inserting the Booking.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from .models import Booking, BookingHold
+
+
+class HoldUnavailable(Exception):
+    """A booking overlapping the hold was made before the hold took effect"""
+
+
+def convert_hold(customer, hold_id):
+    """
+    Turn the customer's active hold into a pending Booking.
+
+    Returns the new booking, or None if the hold does not exist or has
+    expired. Raises HoldUnavailable if the dates were booked after all.
+    """
+    using = router.db_for_write(BookingHold)
+    vehicle_id = (
+        BookingHold.objects.using(using).filter(pk=hold_id, customer=customer)
+        .values_list('vehicle_id', flat=True).first()
+    )
+    if vehicle_id is None:
+        return None
+    with transaction.atomic(using=using):
+        # Same lock order as placing a hold: vehicle first, then the hold
+        list(Vehicle.objects.using(using).select_for_update().filter(pk=vehicle_id).values_list('pk'))
+        hold = (
+            BookingHold.objects.using(using).select_for_update()
+            .filter(pk=hold_id, customer=customer, expires_at__gt=timezone.now()).first()
+        )
+        if hold is None:
+            return None
+        if Booking.overlapping(vehicle_id, hold.start_date, hold.end_date).exists():
+            raise HoldUnavailable('Vehicle is not available for the selected dates.')
+        booking = hold.to_booking()
+        booking.save(using=using, validate=False)
+        hold.delete()
+    return booking
+
+
+def purge_expired_holds(now=None):
+    """Delete expired holds in one statement and return how many went"""
+    deleted, _ = BookingHold.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
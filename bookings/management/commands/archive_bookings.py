@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookings.archive import archive_bookings
+
+
+class Command(BaseCommand):
+    help = 'Move old completed and cancelled bookings into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help='Archive bookings that ended at least this many days ago',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BOOKING_ARCHIVE_CHUNK_SIZE,
+            help='Bookings moved per transaction',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        total = 0
+        for moved in archive_bookings(cutoff, options['chunk_size']):
+            total += moved
+            self.stdout.write(f'Archived {total} bookings...')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} bookings that ended before {cutoff:%Y-%m-%d}.'))
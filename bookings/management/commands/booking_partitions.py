@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from bookings.archive import archive_bookings
+from bookings.partitions import (
+    add_months, create_month_partition, detach_partitions_before, is_partitioned, month_start,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly bookings partitions and detach expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=settings.BOOKING_PARTITION_MONTHS_AHEAD,
+            help='Months of future partitions to keep created',
+        )
+        parser.add_argument(
+            '--retain', type=int, default=settings.BOOKING_PARTITION_RETAIN_MONTHS,
+            help=(
+                'Months of past partitions to keep attached (default: keep all). Older '
+                'completed and cancelled bookings are archived first; partitions still '
+                'holding other bookings stay attached'
+            ),
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not is_partitioned(connection):
+            self.stdout.write('The bookings table is not partitioned on this database.')
+            return
+
+        current = month_start(timezone.now())
+        for offset in range(options['ahead'] + 1):
+            month = add_months(current, offset)
+            if create_month_partition(connection, month):
+                self.stdout.write(self.style.SUCCESS(f'Created partition for {month:%Y-%m}.'))
+
+        if options['retain'] is not None:
+            cutoff = add_months(current, -options['retain'])
+            archived = sum(archive_bookings(cutoff, settings.BOOKING_ARCHIVE_CHUNK_SIZE))
+            if archived:
+                self.stdout.write(f'Archived {archived} bookings that ended before {cutoff:%Y-%m}.')
+            detached, kept = detach_partitions_before(connection, cutoff)
+            for name in detached:
+                self.stdout.write(self.style.WARNING(f'Detached {name}.'))
+            for name in kept:
+                self.stdout.write(self.style.ERROR(f'Kept {name}: it still holds live bookings.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from bookings.projection import check_projection
+
+
+class Command(BaseCommand):
+    help = 'Compare the booking list projection with the bookings table, optionally repairing it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Fix missing, stale and orphaned entries')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Bookings compared per transaction')
+
+    def handle(self, *args, **options):
+        counts = check_projection(options['repair'], options['chunk_size'])
+        summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        if not any(counts.values()):
+            self.stdout.write(self.style.SUCCESS('Booking list is consistent.'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired booking list entries: {summary}.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Booking list differs from bookings: {summary}.'))
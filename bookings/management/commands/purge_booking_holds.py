@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bookings.holds import purge_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired booking holds'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_holds()
+        self.stdout.write(f'Deleted {deleted} expired holds.')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from bookings.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the booking and vehicle counters of users and vehicles and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows checked and locked per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        users, vehicles = reconcile_counters(options['chunk_size'], options['dry_run'])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} drifted counters on {users} users and {vehicles} vehicles.'))
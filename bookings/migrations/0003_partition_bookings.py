@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from bookings.partitions import add_months, month_start, partition_table, unpartition_table
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    current = month_start(timezone.now())
+    last = add_months(current, settings.BOOKING_PARTITION_MONTHS_AHEAD)
+    partition_table(schema_editor.connection, current, last)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    unpartition_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vehicles', '0002_vehicle_search_index'),
+        ('bookings', '0004_booking_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('deposit_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'booking_holds',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['vehicle', 'start_date'], name='booking_holds_vehicle_idx'), models.Index(fields=['expires_at'], name='booking_holds_expires_idx')],
+            },
+        ),
+    ]
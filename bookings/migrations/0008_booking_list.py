@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+LISTED_FIELDS = ('start_date', 'end_date', 'total_amount', 'status', 'created_at')
+
+
+def backfill(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingListEntry = apps.get_model('bookings', 'BookingListEntry')
+    using = schema_editor.connection.alias
+    rows = Booking.objects.using(using).order_by('pk').values_list(
+        'pk', 'customer_id', 'customer__username', 'vehicle_id',
+        'vehicle__year', 'vehicle__make', 'vehicle__model', *LISTED_FIELDS,
+    )
+    batch = []
+    for pk, customer_id, username, vehicle_id, year, make, model, *listed in rows.iterator(chunk_size=1000):
+        batch.append(BookingListEntry(
+            id=pk, customer_id=customer_id, customer_username=username, vehicle_id=vehicle_id,
+            vehicle_name=f"{year} {make} {model}", **dict(zip(LISTED_FIELDS, listed)),
+        ))
+        if len(batch) == 1000:
+            BookingListEntry.objects.using(using).bulk_create(batch)
+            batch = []
+    BookingListEntry.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vehicles', '0005_counters'),
+        ('bookings', '0007_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingListEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('customer_username', models.CharField(max_length=150)),
+                ('vehicle_name', models.CharField(max_length=220)),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('active', 'Active'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('customer', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'booking_list',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['customer', '-created_at'], name='booking_list_customer_idx'), models.Index(fields=['customer', 'status', '-created_at'], name='booking_list_status_idx'), models.Index(fields=['customer', 'start_date'], name='booking_list_start_idx')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_updated_at(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingListEntry = apps.get_model('bookings', 'BookingListEntry')
+    using = schema_editor.connection.alias
+    updated_at = Booking.objects.using(using).filter(pk=models.OuterRef('pk')).values('updated_at')[:1]
+    BookingListEntry.objects.using(using).update(updated_at=models.Subquery(updated_at))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_list'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinglistentry',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bookinglistentry',
+            index=models.Index(fields=['customer', 'updated_at', 'id'], name='booking_list_sync_idx'),
+        ),
+    ]
@@ -1,13 +1,22 @@
-from django.db import models
+import json
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from core.concurrency import VersionedModelMixin
 from vehicles.models import Vehicle
 
 User = get_user_model()
 
 
-class Booking(models.Model):
+class Booking(VersionedModelMixin, models.Model):
     """
     Booking model for car rental system
     """
@@ -28,12 +37,18 @@ class Booking(models.Model):
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     deposit_paid = models.BooleanField(default=False)
     notes = models.TextField(blank=True, null=True)
+    # Bumped on every update; see core.concurrency
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'bookings'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['start_date'], name='bookings_start_date_idx'),
+            models.Index(fields=['created_at'], name='bookings_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.customer.username} - {self.vehicle.full_name}"
@@ -48,23 +63,44 @@ class Booking(models.Model):
         # Check if end_date is after start_date
         if self.start_date and self.end_date and self.end_date <= self.start_date:
             raise ValidationError("End date must be after start date.")
+
+        max_duration = timedelta(days=settings.BOOKING_MAX_DURATION_DAYS)
+        if self.start_date and self.end_date and self.end_date - self.start_date > max_duration:
+            raise ValidationError(f"Bookings cannot be longer than {settings.BOOKING_MAX_DURATION_DAYS} days.")
         
         # Check if vehicle is available for the booking period
         if self.vehicle and self.start_date and self.end_date:
-            overlapping_bookings = Booking.objects.filter(
-                vehicle=self.vehicle,
-                status__in=['confirmed', 'active'],
-                start_date__lt=self.end_date,
-                end_date__gt=self.start_date
-            )
+            overlapping_bookings = Booking.overlapping(self.vehicle, self.start_date, self.end_date)
             if self.pk:
                 overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
             
             if overlapping_bookings.exists():
                 raise ValidationError("Vehicle is not available for the selected dates.")
 
-    def save(self, *args, **kwargs):
-        self.clean()
+            if BookingHold.active_overlapping(self.vehicle, self.start_date, self.end_date, self.customer_id).exists():
+                raise ValidationError("Vehicle is on hold for the selected dates.")
+
+    @classmethod
+    def overlapping(cls, vehicle, start_date, end_date):
+        """Confirmed or active bookings of ``vehicle`` overlapping the window, read from the primary"""
+        # No booking is longer than max_duration, so bounding start_date
+        # on both sides lets Postgres prune the monthly partitions.
+        max_duration = timedelta(days=settings.BOOKING_MAX_DURATION_DAYS)
+        return cls.objects.using(router.db_for_write(cls)).filter(
+            vehicle=vehicle,
+            status__in=['confirmed', 'active'],
+            start_date__gt=start_date - max_duration,
+            start_date__lt=end_date,
+            end_date__gt=start_date
+        )
+
+    def save(self, *args, validate=True, **kwargs):
+        # validate=False is for callers that have already reserved the dates,
+        # e.g. converting a BookingHold
+        if validate:
+            self.clean()
+        # VersionedModelMixin.save runs in a transaction, so receivers of
+        # post_save (e.g. the webhook outbox) commit together with the booking
         super().save(*args, **kwargs)
 
     @property
@@ -87,3 +123,173 @@ class Booking(models.Model):
         now = timezone.now()
         return (self.status == 'active' and 
                 self.end_date < now)
+
+
+class BookingHold(models.Model):
+    """
+    Short-lived reservation of a vehicle for a booking window.
+
+    While a hold is active no other customer can book or hold overlapping
+    dates; converting it into a Booking only re-checks bookings that were
+    validated before the hold was placed. The price is fixed when the hold
+    is placed.
+    """
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_holds')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='booking_holds')
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    deposit_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    notes = models.TextField(blank=True, null=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'booking_holds'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['vehicle', 'start_date'], name='booking_holds_vehicle_idx'),
+            models.Index(fields=['expires_at'], name='booking_holds_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.id} - {self.vehicle_id} until {self.expires_at}"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    @classmethod
+    def active_overlapping(cls, vehicle, start_date, end_date, customer_id=None):
+        """Unexpired holds of other customers overlapping the window"""
+        holds = cls.objects.using(router.db_for_write(cls)).filter(
+            vehicle=vehicle,
+            expires_at__gt=timezone.now(),
+            start_date__lt=end_date,
+            end_date__gt=start_date,
+        )
+        if customer_id is not None:
+            holds = holds.exclude(customer_id=customer_id)
+        return holds
+
+    def to_booking(self):
+        return Booking(
+            customer_id=self.customer_id,
+            vehicle_id=self.vehicle_id,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            total_amount=self.total_amount,
+            deposit_amount=self.deposit_amount,
+            notes=self.notes,
+        )
+
+
+class BookingListEntry(models.Model):
+    """
+    Read model behind the booking list: one flat row per live booking.
+
+    Holds the display columns the list would otherwise join ``users`` and
+    ``vehicles`` for. Rows are written in the same transaction as the
+    booking, vehicle or user change they mirror; see ``bookings.projection``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    # The bookings table is partitioned on PostgreSQL, so rows here cannot
+    # reference it; deleting a booking removes its entry instead.
+    customer = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+',
+    )
+    customer_username = models.CharField(max_length=150)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    vehicle_name = models.CharField(max_length=220)
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    # When this row last changed; delta sync pages by it
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'booking_list'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='booking_list_customer_idx'),
+            models.Index(fields=['customer', 'status', '-created_at'], name='booking_list_status_idx'),
+            models.Index(fields=['customer', 'start_date'], name='booking_list_start_idx'),
+            models.Index(fields=['customer', 'updated_at', 'id'], name='booking_list_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"Booking list entry {self.id}"
+
+    # Same rule as the booking it mirrors
+    duration_days = Booking.duration_days
+
+
+class ArchivedBooking(models.Model):
+    """
+    Completed or cancelled booking moved out of the live bookings table.
+
+    Columns needed to find and filter archived rows are kept as-is; the rest
+    of the booking is stored as zlib-compressed JSON in ``payload``.
+    """
+    PAYLOAD_FIELDS = ('total_amount', 'deposit_amount', 'deposit_paid', 'notes', 'updated_at')
+
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='archived_bookings')
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.BinaryField()
+
+    class Meta:
+        db_table = 'bookings_archive'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='bookings_archive_cust_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived booking {self.id}"
+
+    @classmethod
+    def from_booking(cls, booking):
+        payload = {name: getattr(booking, name) for name in cls.PAYLOAD_FIELDS}
+        # DjangoJSONEncoder drops microseconds, so keep the exact timestamp
+        payload['updated_at'] = booking.updated_at.isoformat()
+        return cls(
+            id=booking.id,
+            customer_id=booking.customer_id,
+            vehicle_id=booking.vehicle_id,
+            status=booking.status,
+            start_date=booking.start_date,
+            end_date=booking.end_date,
+            created_at=booking.created_at,
+            payload=zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8')),
+        )
+
+    def to_booking(self):
+        """Rebuild the original (unsaved) Booking, reusing loaded relations"""
+        payload = json.loads(zlib.decompress(bytes(self.payload)))
+        booking = Booking(
+            id=self.id,
+            customer_id=self.customer_id,
+            vehicle_id=self.vehicle_id,
+            status=self.status,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            created_at=self.created_at,
+            total_amount=Decimal(payload['total_amount']),
+            deposit_amount=Decimal(payload['deposit_amount']),
+            deposit_paid=payload['deposit_paid'],
+            notes=payload['notes'],
+            updated_at=parse_datetime(payload['updated_at']),
+        )
+        for name in ('customer', 'vehicle'):
+            field = self._meta.get_field(name)
+            if field.is_cached(self):
+                setattr(booking, name, field.get_cached_value(self))
+        return booking
@@ -0,0 +1,186 @@
+"""
+Monthly range partitions of the ``bookings`` table on PostgreSQL.
+
+``bookings`` is partitioned by ``start_date``: one ``bookings_pYYYY_MM``
+partition per month plus ``bookings_default`` for anything outside them.
+Month boundaries are in UTC. Other databases keep a plain table; check
+``is_partitioned`` before calling the maintenance helpers.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+TABLE = 'bookings'
+DEFAULT_PARTITION = 'bookings_default'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    """Return the names of the partitions currently attached to bookings"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s AND pg_table_is_visible(p.oid) ORDER BY c.relname',
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_month_partition(connection, month):
+    """
+    Create and attach the partition for ``month``.
+
+    Rows already sitting in the default partition for that month are moved
+    into the new partition first, as PostgreSQL refuses to attach otherwise.
+    Returns False if the partition already exists.
+    """
+    name = partition_name(month)
+    if name in list_partitions(connection):
+        return False
+    lower, upper = month, add_months(month, 1)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE start_date >= %s AND start_date < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [lower, upper],
+        )
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)',
+            [lower, upper],
+        )
+    return True
+
+
+def detach_partitions_before(connection, month):
+    """
+    Detach monthly partitions that end on or before ``month``.
+
+    Detached bookings disappear from history, counters, ``booking_list`` and
+    sync, so only empty partitions are detached; archive their bookings
+    first. Detached partitions are left in place as standalone tables to be
+    dropped separately. Returns the detached table names and the names of
+    those kept because they still hold bookings.
+    """
+    cutoff = partition_name(month)
+    detached, kept = [], []
+    for name in list_partitions(connection):
+        if name == DEFAULT_PARTITION or name >= cutoff:
+            continue
+        # DETACH locks the parent anyway; taking that lock first stops a
+        # booking from landing in the partition between the check and the
+        # detach, in the same lock order as inserts.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+            if cursor.fetchone()[0]:
+                kept.append(name)
+                continue
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        detached.append(name)
+    return detached, kept
+
+
+def partition_table(connection, first_month, last_month):
+    """
+    Convert the plain bookings table into a partitioned one.
+
+    Partitions are created for every month from ``first_month`` (or the
+    earliest booking, if older) up to ``last_month``; existing rows are copied
+    across. The identity column becomes a sequence owned by ``id``, since
+    partitioned tables cannot carry identity columns before PostgreSQL 17.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(start_date), MAX(id) FROM {TABLE}')
+        earliest, max_id = cursor.fetchone()
+        cursor.execute(
+            f'CREATE TABLE {TABLE}_partitioned (LIKE {TABLE} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (start_date)'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE}_partitioned ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'ALTER TABLE {TABLE}_partitioned ADD PRIMARY KEY (id, start_date)')
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE}_partitioned DEFAULT')
+
+        month = min(month_start(earliest), first_month) if earliest else first_month
+        while month <= last_month:
+            cursor.execute(
+                f'CREATE TABLE {partition_name(month)} PARTITION OF {TABLE}_partitioned '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {TABLE}_partitioned SELECT * FROM {TABLE}')
+        cursor.execute(f'DROP TABLE {TABLE}')
+        cursor.execute(f'ALTER TABLE {TABLE}_partitioned RENAME TO {TABLE}')
+        cursor.execute(f'ALTER INDEX {TABLE}_partitioned_pkey RENAME TO {TABLE}_pkey')
+
+        cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+        cursor.execute(f"SELECT setval('{TABLE}_id_seq', %s, false)", [(max_id or 0) + 1])
+
+        cursor.execute(f'CREATE INDEX {TABLE}_customer_id_621160fd ON {TABLE} (customer_id)')
+        cursor.execute(f'CREATE INDEX {TABLE}_vehicle_id_c9b8f9f4 ON {TABLE} (vehicle_id)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_customer_id_621160fd_fk_users_id '
+            f'FOREIGN KEY (customer_id) REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_vehicle_id_c9b8f9f4_fk_vehicles_id '
+            f'FOREIGN KEY (vehicle_id) REFERENCES vehicles (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def unpartition_table(connection):
+    """Reverse of ``partition_table``: copy everything back into a plain table"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {TABLE}_plain (LIKE {TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(f'ALTER TABLE {TABLE}_plain ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'INSERT INTO {TABLE}_plain SELECT * FROM {TABLE}')
+        cursor.execute(f'SELECT MAX(id) FROM {TABLE}')
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f'DROP TABLE {TABLE} CASCADE')
+        cursor.execute(f'ALTER TABLE {TABLE}_plain RENAME TO {TABLE}')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY '
+            f'(START WITH %s)',
+            [(max_id or 0) + 1],
+        )
+        cursor.execute(f'CREATE INDEX {TABLE}_customer_id_621160fd ON {TABLE} (customer_id)')
+        cursor.execute(f'CREATE INDEX {TABLE}_vehicle_id_c9b8f9f4 ON {TABLE} (vehicle_id)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_customer_id_621160fd_fk_users_id '
+            f'FOREIGN KEY (customer_id) REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_vehicle_id_c9b8f9f4_fk_vehicles_id '
+            f'FOREIGN KEY (vehicle_id) REFERENCES vehicles (id) DEFERRABLE INITIALLY DEFERRED'
+        )
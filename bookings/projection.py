@@ -0,0 +1,167 @@
+"""
+Booking list projection.
+
+``booking_list`` holds one flat row per live booking with everything the
+list endpoint shows, so listing never joins ``users`` or ``vehicles``. It is
+kept in step synchronously from the signal receivers in ``bookings.signals``:
+booking saves, deletes and set-based updates rewrite their rows, and
+renaming a vehicle or user rewrites the names it appears under. Anything
+that bypasses those (raw SQL, ``queryset.update()`` without
+``bulk_updated``) is caught by ``check_projection``.
+
+``updated_at`` is when the entry last changed, which is what delta sync
+(``core.sync``) pages by: it follows the booking's own ``updated_at`` and is
+set to the current time when a rename or repair rewrites the entry.
+"""
+from django.db import router, transaction
+from django.db.models import CharField, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from core.sync import record_deletions
+from vehicles.models import Vehicle
+
+from .models import Booking, BookingListEntry
+
+# Booking columns copied as-is
+LISTED_FIELDS = ('start_date', 'end_date', 'total_amount', 'status', 'created_at')
+ENTRY_FIELDS = ('customer_id', 'customer_username', 'vehicle_id', 'vehicle_name', *LISTED_FIELDS)
+# Vehicle columns making up ``vehicle_name`` (``Vehicle.full_name``)
+VEHICLE_NAME_FIELDS = ('year', 'make', 'model')
+
+
+def vehicle_name(year, make, model):
+    return Vehicle(year=year, make=make, model=model).full_name
+
+
+def vehicle_name_expression():
+    """SQL for ``Vehicle.full_name``"""
+    return Concat(
+        Cast('year', CharField()), Value(' '), 'make', Value(' '), 'model', output_field=CharField(),
+    )
+
+
+def entry_for(booking):
+    """Unsaved entry for ``booking`` (reads its customer and vehicle)"""
+    return BookingListEntry(
+        id=booking.pk,
+        customer_id=booking.customer_id,
+        customer_username=booking.customer.username,
+        vehicle_id=booking.vehicle_id,
+        vehicle_name=booking.vehicle.full_name,
+        updated_at=booking.updated_at,
+        **{name: getattr(booking, name) for name in LISTED_FIELDS},
+    )
+
+
+def save_booking(booking, created, using):
+    """Write the entry of a saved booking"""
+    if created:
+        entry_for(booking).save(using=using, force_insert=True)
+        return
+    # The names only need reading when the booking moved to another
+    # customer or vehicle (or the entry is missing).
+    updated = BookingListEntry.objects.using(using).filter(
+        pk=booking.pk, customer_id=booking.customer_id, vehicle_id=booking.vehicle_id,
+    ).update(updated_at=booking.updated_at, **{name: getattr(booking, name) for name in LISTED_FIELDS})
+    if not updated:
+        entry_for(booking).save(using=using)
+
+
+def delete_booking(booking_id, using):
+    BookingListEntry.objects.using(using).filter(pk=booking_id).delete()
+
+
+def copy_booking_fields(ids, fields, using):
+    """Copy ``fields`` of bookings ``ids`` into their entries with one UPDATE"""
+    fields = [name for name in fields if name in LISTED_FIELDS]
+    if not fields:
+        return
+    fields.append('updated_at')
+    source = Booking.objects.using(using).filter(pk=OuterRef('pk'))
+    BookingListEntry.objects.using(using).filter(pk__in=ids).update(
+        **{name: Subquery(source.values(name)[:1]) for name in fields}
+    )
+
+
+def rename_vehicles(ids, using):
+    """Refresh ``vehicle_name`` of the entries of vehicles ``ids``"""
+    name = Vehicle.objects.using(using).filter(pk=OuterRef('vehicle_id')).annotate(
+        name=vehicle_name_expression(),
+    ).values('name')[:1]
+    BookingListEntry.objects.using(using).filter(vehicle_id__in=ids).update(
+        vehicle_name=Subquery(name), updated_at=timezone.now(),
+    )
+
+
+def rename_customer(user_id, username, using):
+    BookingListEntry.objects.using(using).filter(customer_id=user_id).update(
+        customer_username=username, updated_at=timezone.now(),
+    )
+
+
+def _expected_entries(ids, using):
+    rows = Booking.objects.using(using).filter(pk__in=ids).values_list(
+        'pk', 'customer_id', 'customer__username', 'vehicle_id',
+        *(f'vehicle__{name}' for name in VEHICLE_NAME_FIELDS), *LISTED_FIELDS,
+    )
+    expected = {}
+    for pk, customer_id, username, vehicle_id, year, make, model, *listed in rows:
+        expected[pk] = BookingListEntry(
+            id=pk, customer_id=customer_id, customer_username=username, vehicle_id=vehicle_id,
+            vehicle_name=vehicle_name(year, make, model), **dict(zip(LISTED_FIELDS, listed)),
+        )
+    return expected
+
+
+def check_projection(repair=False, chunk_size=1000):
+    """
+    Compare ``booking_list`` with the bookings it mirrors.
+
+    Returns counts of ``missing`` entries, ``stale`` ones that differ from
+    their booking and ``orphaned`` ones without a booking. With ``repair``
+    the differences are fixed as they are found.
+    """
+    using = router.db_for_write(BookingListEntry)
+    counts = {'missing': 0, 'stale': 0, 'orphaned': 0}
+
+    last_id = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(
+                Booking.objects.using(using).filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            expected = _expected_entries(ids, using)
+            current = BookingListEntry.objects.using(using).in_bulk(list(expected))
+            missing = [entry for pk, entry in expected.items() if pk not in current]
+            stale = [
+                entry for pk, entry in expected.items()
+                if pk in current
+                and any(getattr(current[pk], name) != getattr(entry, name) for name in ENTRY_FIELDS)
+            ]
+            counts['missing'] += len(missing)
+            counts['stale'] += len(stale)
+            if repair:
+                # Newer than any sync cursor, so synced clients pick up the fix
+                now = timezone.now()
+                for entry in missing + stale:
+                    entry.updated_at = now
+                BookingListEntry.objects.using(using).bulk_create(missing, ignore_conflicts=True)
+                BookingListEntry.objects.using(using).bulk_update(
+                    stale, ['customer', 'customer_username', 'vehicle', 'vehicle_name', *LISTED_FIELDS, 'updated_at'],
+                )
+
+    orphans = BookingListEntry.objects.using(using).exclude(
+        Exists(Booking.objects.using(using).filter(pk=OuterRef('pk')))
+    )
+    orphaned = list(orphans.values_list('pk', 'customer_id'))
+    counts['orphaned'] = len(orphaned)
+    if repair and orphaned:
+        with transaction.atomic(using=using):
+            BookingListEntry.objects.using(using).filter(pk__in=[pk for pk, _ in orphaned]).delete()
+            record_deletions('bookings', orphaned, using)
+    return counts
@@ -1,14 +1,54 @@
 from rest_framework import serializers
+from core.fieldsets import SparseFieldsetMixin
+from core.serializers import BulkUpdateSerializer
+from django.conf import settings
+from django.db import router, transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import Booking
+from decimal import Decimal
+from .alternatives import alternative_vehicles
+from .models import Booking, BookingHold, BookingListEntry
 from vehicles.models import Vehicle
 
 
-class BookingSerializer(serializers.ModelSerializer):
+def validate_booking_window(start_date, end_date):
+    """Check the dates of a booking or hold"""
+    # Check if start_date is in the future
+    if start_date and start_date <= timezone.now():
+        raise serializers.ValidationError("Start date must be in the future.")
+
+    # Check if end_date is after start_date
+    if start_date and end_date and end_date <= start_date:
+        raise serializers.ValidationError("End date must be after start date.")
+
+    max_duration = timedelta(days=settings.BOOKING_MAX_DURATION_DAYS)
+    if start_date and end_date and end_date - start_date > max_duration:
+        raise serializers.ValidationError(
+            f"Bookings cannot be longer than {settings.BOOKING_MAX_DURATION_DAYS} days."
+        )
+
+
+def booking_amounts(vehicle, start_date, end_date):
+    """Return (total_amount, deposit_amount) for booking ``vehicle``"""
+    # Calculate duration and total amount
+    duration = (end_date - start_date).days
+    if duration == 0:
+        duration = 1  # Minimum 1 day
+
+    total_amount = vehicle.daily_rate * duration
+
+    # Set deposit amount (20% of total)
+    deposit_amount = (total_amount * Decimal('0.2')).quantize(Decimal('0.01'))
+    return total_amount, deposit_amount
+
+
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Booking model
     """
+    # Free vehicles similar to the requested one, set when a new booking conflicts
+    alternatives = None
+
     customer = serializers.ReadOnlyField(source='customer.username')
     vehicle_details = serializers.SerializerMethodField()
     duration_days = serializers.ReadOnlyField()
@@ -20,9 +60,19 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer', 'vehicle', 'vehicle_details', 'start_date', 'end_date',
             'total_amount', 'status', 'deposit_amount', 'deposit_paid', 'notes',
-            'duration_days', 'is_active', 'is_overdue', 'created_at', 'updated_at'
+            'duration_days', 'is_active', 'is_overdue', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'customer', 'total_amount', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'customer', 'total_amount', 'version', 'created_at', 'updated_at']
+        # Columns read by method and property fields, used to narrow queries
+        read_dependencies = {
+            'vehicle_details': [
+                'vehicle__id', 'vehicle__make', 'vehicle__model', 'vehicle__year',
+                'vehicle__plate_number', 'vehicle__daily_rate',
+            ],
+            'duration_days': ['start_date', 'end_date'],
+            'is_active': ['status', 'start_date', 'end_date'],
+            'is_overdue': ['status', 'end_date'],
+        }
 
     def get_vehicle_details(self, obj):
         """Get vehicle details for the booking"""
@@ -44,50 +94,48 @@ class BookingSerializer(serializers.ModelSerializer):
         end_date = attrs.get('end_date')
         vehicle = attrs.get('vehicle')
 
-        # Check if start_date is in the future
-        if start_date and start_date <= timezone.now():
-            raise serializers.ValidationError("Start date must be in the future.")
+        validate_booking_window(start_date, end_date)
 
-        # Check if end_date is after start_date
-        if start_date and end_date and end_date <= start_date:
-            raise serializers.ValidationError("End date must be after start date.")
+        request = self.context.get('request')
+        if self.instance:
+            customer_id = self.instance.customer_id
+        else:
+            customer_id = request.user.pk if request else None
 
         # Check if vehicle exists and is available
         if vehicle:
             if vehicle.status != 'available':
-                raise serializers.ValidationError("Vehicle is not available for booking.")
+                self.conflict("Vehicle is not available for booking.", vehicle, start_date, end_date, customer_id)
 
-            # Check for overlapping bookings
+            # Check for overlapping bookings, always against the primary
             if start_date and end_date:
-                overlapping_bookings = Booking.objects.filter(
-                    vehicle=vehicle,
-                    status__in=['confirmed', 'active'],
-                    start_date__lt=end_date,
-                    end_date__gt=start_date
-                )
+                overlapping_bookings = Booking.overlapping(vehicle, start_date, end_date)
                 if self.instance:
                     overlapping_bookings = overlapping_bookings.exclude(pk=self.instance.pk)
                 
                 if overlapping_bookings.exists():
-                    raise serializers.ValidationError("Vehicle is not available for the selected dates.")
+                    self.conflict(
+                        "Vehicle is not available for the selected dates.", vehicle, start_date, end_date, customer_id
+                    )
+
+                if BookingHold.active_overlapping(vehicle, start_date, end_date, customer_id).exists():
+                    self.conflict(
+                        "Vehicle is on hold for the selected dates.", vehicle, start_date, end_date, customer_id
+                    )
 
         return attrs
 
+    def conflict(self, message, vehicle, start_date, end_date, customer_id):
+        """Raise ``message``, remembering similar free vehicles for new bookings"""
+        if not self.instance and start_date and end_date:
+            self.alternatives = alternative_vehicles(vehicle, start_date, end_date, customer_id)
+        raise serializers.ValidationError(message)
+
     def create(self, validated_data):
         """Create booking with calculated total amount"""
-        vehicle = validated_data['vehicle']
-        start_date = validated_data['start_date']
-        end_date = validated_data['end_date']
-        
-        # Calculate duration and total amount
-        duration = (end_date - start_date).days
-        if duration == 0:
-            duration = 1  # Minimum 1 day
-        
-        total_amount = vehicle.daily_rate * duration
-        
-        # Set deposit amount (20% of total)
-        deposit_amount = total_amount * 0.2
+        total_amount, deposit_amount = booking_amounts(
+            validated_data['vehicle'], validated_data['start_date'], validated_data['end_date']
+        )
         
         booking = Booking.objects.create(
             customer=self.context['request'].user,
@@ -99,17 +147,107 @@ class BookingSerializer(serializers.ModelSerializer):
         return booking
 
 
-class BookingListSerializer(serializers.ModelSerializer):
+class AlternativeVehicleSerializer(serializers.ModelSerializer):
     """
-    Simplified serializer for booking listing
+    Free vehicle suggested in place of one that is already booked
     """
-    customer = serializers.ReadOnlyField(source='customer.username')
-    vehicle_name = serializers.ReadOnlyField(source='vehicle.full_name')
+    full_name = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Vehicle
+        fields = [
+            'id', 'full_name', 'make', 'model', 'year', 'seats', 'transmission', 'fuel_type', 'daily_rate'
+        ]
+        read_only_fields = fields
+
+
+class BookingConflictSerializer(serializers.Serializer):
+    """
+    400 response for a booking that cannot be made, with suggestions when
+    the vehicle is taken
+    """
+    non_field_errors = serializers.ListField(child=serializers.CharField(), required=False)
+    alternatives = AlternativeVehicleSerializer(many=True, required=False)
+
+
+class BookingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Simplified serializer for booking listing, read from the booking list projection
+    """
+    customer = serializers.ReadOnlyField(source='customer_username')
+    vehicle_name = serializers.ReadOnlyField()
     duration_days = serializers.ReadOnlyField()
 
     class Meta:
-        model = Booking
+        model = BookingListEntry
         fields = [
             'id', 'customer', 'vehicle', 'vehicle_name', 'start_date', 'end_date',
             'total_amount', 'status', 'duration_days', 'created_at'
-        ] 
\ No newline at end of file
+        ]
+        read_only_fields = ['id', 'created_at']
+        # Columns read by property fields, used by the fast path and to narrow queries
+        read_dependencies = {
+            'duration_days': ['start_date', 'end_date'],
+        }
+
+
+class BookingBulkStatusSerializer(BulkUpdateSerializer):
+    """
+    Serializer for moving many bookings to one status
+    """
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES)
+
+
+class BookingHoldSerializer(serializers.ModelSerializer):
+    """
+    Serializer for placing and listing booking holds
+    """
+    vehicle_name = serializers.CharField(source='vehicle.full_name', read_only=True)
+
+    class Meta:
+        model = BookingHold
+        fields = [
+            'id', 'vehicle', 'vehicle_name', 'start_date', 'end_date', 'total_amount',
+            'deposit_amount', 'notes', 'expires_at', 'created_at'
+        ]
+        read_only_fields = ['id', 'total_amount', 'deposit_amount', 'expires_at', 'created_at']
+
+    def validate(self, attrs):
+        """Validate the hold window; availability is checked when the hold is placed"""
+        validate_booking_window(attrs['start_date'], attrs['end_date'])
+        if attrs['vehicle'].status != 'available':
+            raise serializers.ValidationError("Vehicle is not available for booking.")
+        return attrs
+
+    def create(self, validated_data):
+        """Place the hold while holding the vehicle's row lock"""
+        customer = self.context['request'].user
+        vehicle = validated_data['vehicle']
+        start_date = validated_data['start_date']
+        end_date = validated_data['end_date']
+        using = router.db_for_write(BookingHold)
+        now = timezone.now()
+
+        with transaction.atomic(using=using):
+            # Holds on the same vehicle are placed one at a time
+            list(Vehicle.objects.using(using).select_for_update().filter(pk=vehicle.pk).values_list('pk'))
+            BookingHold.objects.using(using).filter(vehicle=vehicle, expires_at__lte=now).delete()
+
+            active_holds = BookingHold.objects.using(using).filter(customer=customer, expires_at__gt=now)
+            if active_holds.count() >= settings.BOOKING_HOLD_MAX_PER_CUSTOMER:
+                raise serializers.ValidationError(
+                    f"You cannot hold more than {settings.BOOKING_HOLD_MAX_PER_CUSTOMER} vehicles at once."
+                )
+            if Booking.overlapping(vehicle, start_date, end_date).exists():
+                raise serializers.ValidationError("Vehicle is not available for the selected dates.")
+            if BookingHold.active_overlapping(vehicle, start_date, end_date).exists():
+                raise serializers.ValidationError("Vehicle is on hold for the selected dates.")
+
+            total_amount, deposit_amount = booking_amounts(vehicle, start_date, end_date)
+            return BookingHold.objects.using(using).create(
+                customer=customer,
+                total_amount=total_amount,
+                deposit_amount=deposit_amount,
+                expires_at=now + timedelta(seconds=settings.BOOKING_HOLD_TTL_SECONDS),
+                **validated_data
+            )
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from core.signals import bulk_updated
+from core.sync import record_deletions
+from vehicles.models import Vehicle
+from . import projection
+from .calendar import bump_markers
+from .counters import COUNTED_FIELDS, counted_state, counters_are_paused, record_changes, stored_state
+from .models import Booking
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=Booking)
+def remember_vehicle(sender, instance, **kwargs):
+    instance._calendar_vehicle_id = instance.__dict__.get('vehicle_id')
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, using, **kwargs):
+    """Refresh the calendar feeds of the booked vehicle (and the previous one)"""
+    bump_markers([instance.vehicle_id, instance._calendar_vehicle_id], using=using)
+    instance._calendar_vehicle_id = instance.vehicle_id
+
+
+@receiver(post_init, sender=Booking)
+def remember_counted_state(sender, instance, **kwargs):
+    values = instance.__dict__
+    if all(name in values for name in COUNTED_FIELDS):
+        instance._counted = counted_state(instance)
+    else:
+        instance._counted = None
+
+
+@receiver(pre_save, sender=Booking)
+def load_counted_state(sender, instance, using, raw=False, **kwargs):
+    """Instances loaded with deferred fields have to read what was counted"""
+    if not raw and not instance._state.adding and instance._counted is None:
+        instance._counted = stored_state(instance.pk, using)
+
+
+@receiver(post_save, sender=Booking)
+def update_counters(sender, instance, created, using, raw=False, **kwargs):
+    """Move the booking's share of the user and vehicle counters"""
+    if raw:
+        return
+    after = counted_state(instance)
+    record_changes([(None if created else instance._counted, after)], using)
+    instance._counted = after
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_counters(sender, instance, using, **kwargs):
+    if instance._counted is not None and not counters_are_paused():
+        record_changes([(instance._counted, None)], using)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def vehicle_changed(sender, instance, using, **kwargs):
+    """Event summaries show the vehicle, so its feed changes with it"""
+    bump_markers([instance.pk], using=using)
+
+
+@receiver(bulk_updated, sender=Booking)
+def bookings_bulk_updated(sender, ids, using, **kwargs):
+    vehicle_ids = Booking.objects.using(using).filter(id__in=ids).values_list('vehicle_id', flat=True).distinct()
+    bump_markers(list(vehicle_ids), using=using)
+
+
+@receiver(bulk_updated, sender=Vehicle)
+def vehicles_bulk_updated(sender, ids, using, **kwargs):
+    bump_markers(ids, using=using)
+
+
+@receiver(post_save, sender=Booking)
+def update_list_entry(sender, instance, created, using, raw=False, **kwargs):
+    """Mirror the booking into the booking list projection"""
+    if not raw:
+        projection.save_booking(instance, created, using)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_list_entry(sender, instance, using, **kwargs):
+    projection.delete_booking(instance.pk, using)
+
+
+@receiver(post_delete, sender=Booking)
+def leave_tombstone(sender, instance, using, **kwargs):
+    """Tell the customer's synced copies to drop the booking (archiving included)"""
+    record_deletions('bookings', [(instance.pk, instance.customer_id)], using)
+
+
+@receiver(bulk_updated, sender=Booking)
+def update_list_entries(sender, ids, fields, using, **kwargs):
+    projection.copy_booking_fields(ids, fields, using)
+
+
+@receiver(post_init, sender=Vehicle)
+def remember_vehicle_name(sender, instance, **kwargs):
+    values = instance.__dict__
+    if all(name in values for name in projection.VEHICLE_NAME_FIELDS):
+        instance._listed_name = instance.full_name
+    else:
+        instance._listed_name = None
+
+
+@receiver(post_save, sender=Vehicle)
+def rename_vehicle_entries(sender, instance, created, using, raw=False, update_fields=None, **kwargs):
+    """Booking list rows show the vehicle's name"""
+    if raw or created:
+        return
+    if update_fields is not None and not set(projection.VEHICLE_NAME_FIELDS).intersection(update_fields):
+        return
+    if instance._listed_name != instance.full_name:
+        projection.rename_vehicles([instance.pk], using)
+    instance._listed_name = instance.full_name
+
+
+@receiver(bulk_updated, sender=Vehicle)
+def rename_vehicle_entries_in_bulk(sender, ids, fields, using, **kwargs):
+    if set(projection.VEHICLE_NAME_FIELDS).intersection(fields):
+        projection.rename_vehicles(ids, using)
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._listed_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+def rename_customer_entries(sender, instance, created, using, raw=False, **kwargs):
+    """Booking list rows show the customer's username"""
+    if not raw and not created and instance._listed_username != instance.username:
+        projection.rename_customer(instance.pk, instance.username, using)
+    instance._listed_username = instance.username
@@ -1,11 +1,27 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
-from .models import Booking
+from .models import ArchivedBooking, Booking, BookingHold, BookingListEntry
+from .alternatives import alternative_vehicles
+from .bulk import set_booking_status
+from .counters import reconcile_counters
+from .partitions import add_months, create_month_partition, list_partitions, month_start, partition_name
+from .serializers import BookingSerializer
+from core.sync import encode_cursor
 from vehicles.models import Vehicle
 
 User = get_user_model()
@@ -79,6 +95,18 @@ class BookingModelTest(TestCase):
         )
         self.assertIn(booking.status, dict(Booking.STATUS_CHOICES))
 
+    def test_booking_longer_than_max_duration(self):
+        """Test that bookings longer than BOOKING_MAX_DURATION_DAYS are rejected"""
+        with self.settings(BOOKING_MAX_DURATION_DAYS=7):
+            with self.assertRaises(ValidationError):
+                Booking.objects.create(
+                    customer=self.user,
+                    vehicle=self.vehicle,
+                    start_date=self.start_date,
+                    end_date=self.start_date + timedelta(days=8),
+                    total_amount=400.00
+                )
+
 
 class BookingAPITest(APITestCase):
     """Test cases for Booking API"""
@@ -215,6 +243,20 @@ class BookingAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
     
+    def test_list_fast_path_matches_serializer(self):
+        """Test that the fast list path renders the same bytes as the serializer"""
+        Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.end_date + timedelta(hours=7),
+            total_amount=123.4,
+            status='confirmed'
+        )
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(self.booking_list_url, {'status': 'confirmed'}).content
+        self.assertEqual(self.client.get(self.booking_list_url, {'status': 'confirmed'}).content, expected)
+
     def test_retrieve_booking(self):
         """Test retrieving a specific booking"""
         booking = Booking.objects.create(
@@ -230,7 +272,95 @@ class BookingAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['customer'], 'testuser')
         self.assertEqual(response.data['total_amount'], '100.00')
+
+    def test_retrieve_booking_loads_vehicle_in_one_query(self):
+        """Test that booking details join the vehicle instead of loading it lazily"""
+        booking = Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            total_amount=100.00
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('bookings:booking-detail', args=[booking.id]))
+        self.assertEqual(response.data['vehicle_details']['full_name'], '2020 Toyota Camry')
+
+    def test_retrieve_booking_sparse_fields(self):
+        """Test that ?fields= trims the response and the SELECT"""
+        booking = Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            total_amount=100.00,
+            notes='Child seat please'
+        )
+        url = reverse('bookings:booking-detail', args=[booking.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,status,start_date,duration_days'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), ['id', 'start_date', 'status', 'duration_days'])
+        self.assertEqual(len(queries.captured_queries), 1)
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"notes"', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_list_bookings_omit_fields(self):
+        """Test that ?omit= drops fields and the joins they needed"""
+        Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            total_amount=100.00
+        )
+        for fast in (True, False):
+            with self.settings(FAST_LIST_SERIALIZATION=fast):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(self.booking_list_url, {'omit': 'customer,vehicle_name'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            result = response.data['results'][0]
+            self.assertNotIn('customer', result)
+            self.assertNotIn('vehicle_name', result)
+            self.assertEqual(result['total_amount'], '100.00')
+            self.assertFalse(any('JOIN' in q['sql'] for q in queries.captured_queries))
+
+    def test_sparse_fields_reject_unknown_fields(self):
+        """Test that unknown fields in ?fields= are rejected"""
+        response = self.client.get(self.booking_list_url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', str(response.data['fields']))
     
+    def test_batch_retrieve_bookings(self):
+        """Test fetching several bookings in request order with missing ids reported"""
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='pass123')
+        bookings = [
+            Booking.objects.create(
+                customer=customer,
+                vehicle=self.vehicle,
+                start_date=self.start_date,
+                end_date=self.end_date,
+                total_amount=100.00
+            )
+            for customer in (self.user, self.user, other_user)
+        ]
+        ids = [bookings[1].id, 999999, bookings[0].id, bookings[2].id]
+        url = reverse('bookings:booking-batch')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['id'] for b in response.data['results']], [bookings[1].id, bookings[0].id])
+        self.assertEqual(response.data['missing'], [999999, bookings[2].id])
+
+    def test_batch_retrieve_bookings_invalid_ids(self):
+        """Test that malformed or missing id lists are rejected"""
+        url = reverse('bookings:booking-batch')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'ids': '1,abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(BATCH_MAX_IDS=2):
+            self.assertEqual(self.client.get(url, {'ids': '1,2,3'}).status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_update_booking_status(self):
         """Test updating booking status"""
         booking = Booking.objects.create(
@@ -251,6 +381,45 @@ class BookingAPITest(APITestCase):
         self.vehicle.refresh_from_db()
         self.assertEqual(self.vehicle.status, 'rented')
     
+    def test_confirmed_booking_with_concurrently_changed_vehicle(self):
+        """Test that a vehicle changed since it was validated does not fail a confirmed booking"""
+        def touch_vehicle(sender, instance, created, **kwargs):
+            Vehicle.objects.filter(pk=instance.vehicle_id).update(version=F('version') + 1)
+
+        post_save.connect(touch_vehicle, sender=Booking)
+        self.addCleanup(post_save.disconnect, touch_vehicle, sender=Booking)
+        response = self.client.post(self.booking_list_url, {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'status': 'confirmed',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.vehicle.refresh_from_db()
+        self.assertEqual((self.vehicle.status, self.vehicle.version), ('rented', 3))
+
+    def test_stale_booking_update_conflicts(self):
+        """Test that booking updates based on an old version get 409"""
+        booking = Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            total_amount=100.00
+        )
+        booking_detail_url = reverse('bookings:booking-detail', args=[booking.id])
+        Booking.objects.get(pk=booking.pk).save()
+
+        response = self.client.patch(booking_detail_url, {'status': 'confirmed'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['current']['version'], 2)
+        self.assertEqual(response.data['current']['status'], 'pending')
+
+        response = self.client.patch(booking_detail_url, {'status': 'confirmed', 'version': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 3)
+        self.assertEqual(response['ETag'], '"3"')
+
     def test_cancel_booking(self):
         """Test cancelling a booking"""
         booking = Booking.objects.create(
@@ -311,3 +480,866 @@ class BookingAPITest(APITestCase):
         other_booking_url = reverse('bookings:booking-detail', args=[other_booking.id])
         response = self.client.get(other_booking_url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookingArchiveTest(APITestCase):
+    """Test cases for archiving old bookings"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        self.client.force_authenticate(user=self.user)
+        self.booking_list_url = reverse('bookings:booking-list-create')
+
+    def create_booking(self, days_ago, booking_status):
+        """Create a booking that ended ``days_ago`` days ago"""
+        start_date = timezone.now() + timedelta(days=1)
+        booking = Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=2),
+            total_amount=100.00,
+            deposit_amount=20.00,
+            notes='Airport pickup'
+        )
+        end_date = timezone.now() - timedelta(days=days_ago)
+        Booking.objects.filter(pk=booking.pk).update(
+            start_date=end_date - timedelta(days=2),
+            end_date=end_date,
+            status=booking_status,
+        )
+        return Booking.objects.get(pk=booking.pk)
+
+    def test_archive_command_moves_old_terminal_bookings(self):
+        """Test that only old completed or cancelled bookings are archived"""
+        old_completed = self.create_booking(400, 'completed')
+        old_cancelled = self.create_booking(500, 'cancelled')
+        recent = self.create_booking(10, 'completed')
+        old_pending = self.create_booking(400, 'pending')
+
+        call_command('archive_bookings', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(Booking.objects.values_list('id', flat=True)), {recent.id, old_pending.id}
+        )
+        self.assertEqual(
+            set(ArchivedBooking.objects.values_list('id', flat=True)), {old_completed.id, old_cancelled.id}
+        )
+        restored = ArchivedBooking.objects.get(pk=old_completed.pk).to_booking()
+        for field in ('customer_id', 'vehicle_id', 'start_date', 'end_date', 'total_amount',
+                      'deposit_amount', 'deposit_paid', 'notes', 'status', 'created_at', 'updated_at'):
+            self.assertEqual(getattr(restored, field), getattr(old_completed, field), field)
+
+    def test_list_excludes_archived_by_default(self):
+        """Test that archived bookings are hidden unless requested"""
+        self.create_booking(400, 'completed')
+        self.create_booking(10, 'completed')
+        call_command('archive_bookings', stdout=StringIO())
+
+        response = self.client.get(self.booking_list_url)
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.get(self.booking_list_url, {'include_archived': '1'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][1]['vehicle_name'], '2020 Toyota Camry')
+
+    def test_archive_read_only_past_live_rows(self):
+        """Test that archived rows are only fetched for pages past the live bookings"""
+        for _ in range(3):
+            self.create_booking(400, 'completed')
+        live = [self.create_booking(10, 'completed') for _ in range(10)]
+        call_command('archive_bookings', stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.booking_list_url, {'include_archived': '1'})
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual([b['id'] for b in response.data['results']], [b.id for b in reversed(live)])
+        archive_selects = [
+            q['sql'] for q in queries.captured_queries
+            if 'bookings_archive' in q['sql'] and 'COUNT(' not in q['sql']
+        ]
+        self.assertEqual(archive_selects, [])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.booking_list_url, {'include_archived': '1', 'page': 2})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(queries.captured_queries), 3)
+
+    def test_list_filters_apply_to_archive(self):
+        """Test that status filters also apply to archived bookings"""
+        self.create_booking(400, 'completed')
+        self.create_booking(400, 'cancelled')
+        call_command('archive_bookings', stdout=StringIO())
+
+        response = self.client.get(self.booking_list_url, {'include_archived': '1', 'status': 'cancelled'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['status'], 'cancelled')
+
+    def test_retrieve_archived_booking(self):
+        """Test retrieving an archived booking with include_archived"""
+        booking = self.create_booking(400, 'completed')
+        call_command('archive_bookings', stdout=StringIO())
+        url = reverse('bookings:booking-detail', args=[booking.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(url, {'include_archived': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], booking.id)
+        self.assertEqual(response.data['total_amount'], '100.00')
+        self.assertEqual(response.data['vehicle_details']['plate_number'], 'ABC123')
+
+        response = self.client.patch(f'{url}?include_archived=1', {'notes': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookingHoldTest(APITestCase):
+    """Test cases for checkout holds"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        self.start_date = timezone.now() + timedelta(days=1)
+        self.end_date = self.start_date + timedelta(days=2)
+        self.client.force_authenticate(user=self.user)
+        self.hold_url = reverse('bookings:booking-hold-list-create')
+
+    def place_hold(self, start_date=None, end_date=None):
+        return self.client.post(self.hold_url, {
+            'vehicle': self.vehicle.id,
+            'start_date': (start_date or self.start_date).isoformat(),
+            'end_date': (end_date or self.end_date).isoformat(),
+        })
+
+    def test_place_hold(self):
+        """Test placing a hold quotes the price and sets an expiry"""
+        response = self.place_hold()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_amount'], '100.00')
+        self.assertEqual(response.data['deposit_amount'], '20.00')
+        hold = BookingHold.objects.get()
+        self.assertAlmostEqual(
+            (hold.expires_at - hold.created_at).total_seconds(), settings.BOOKING_HOLD_TTL_SECONDS, delta=1
+        )
+
+    def test_hold_blocks_other_customers(self):
+        """Test that an active hold blocks overlapping holds and bookings of others"""
+        self.place_hold()
+        self.client.force_authenticate(user=self.other_user)
+
+        response = self.place_hold(self.start_date + timedelta(days=1), self.end_date + timedelta(days=1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Vehicle is on hold for the selected dates.', str(response.data))
+
+        response = self.client.post(reverse('bookings:booking-list-create'), {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Vehicle is on hold for the selected dates.', str(response.data))
+
+        response = self.place_hold(self.end_date, self.end_date + timedelta(days=1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_expired_hold_does_not_block_and_is_purged(self):
+        """Test that expired holds are ignored and removed lazily"""
+        self.place_hold()
+        BookingHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        expired_id = BookingHold.objects.get().id
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.place_hold()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(BookingHold.objects.filter(id=expired_id).exists())
+
+    def test_convert_hold(self):
+        """Test converting a hold creates the booking with a single availability query"""
+        hold_id = self.place_hold().data['id']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bookings:booking-hold-convert', args=[hold_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response.data['total_amount'], '100.00')
+        self.assertEqual(response.data['deposit_amount'], '20.00')
+        self.assertFalse(BookingHold.objects.exists())
+        self.assertTrue(Booking.objects.filter(id=response.data['id'], customer=self.user).exists())
+        booking_reads = [
+            q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "bookings"' in q['sql']
+        ]
+        self.assertEqual(len(booking_reads), 1)
+
+    def test_convert_hold_booked_before_hold_took_effect(self):
+        """Test that a hold is not converted over a booking that committed after it was placed"""
+        hold_id = self.place_hold().data['id']
+        # A direct booking validated before the hold existed, committed after it
+        Booking(
+            customer=self.other_user, vehicle=self.vehicle, start_date=self.start_date,
+            end_date=self.end_date, total_amount=100, status='confirmed',
+        ).save(validate=False)
+
+        response = self.client.post(reverse('bookings:booking-hold-convert', args=[hold_id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.filter(customer=self.user).count(), 0)
+
+    def test_convert_expired_or_foreign_hold(self):
+        """Test that expired holds and holds of other customers cannot be converted"""
+        hold_id = self.place_hold().data['id']
+        url = reverse('bookings:booking-hold-convert', args=[hold_id])
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.user)
+        BookingHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_release_hold(self):
+        """Test releasing a hold frees the dates"""
+        hold_id = self.place_hold().data['id']
+        response = self.client.delete(reverse('bookings:booking-hold-detail', args=[hold_id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(BookingHold.objects.exists())
+
+    @override_settings(BOOKING_HOLD_MAX_PER_CUSTOMER=1)
+    def test_hold_limit_per_customer(self):
+        """Test that customers cannot hoard vehicles with holds"""
+        self.place_hold()
+        response = self.place_hold(self.end_date, self.end_date + timedelta(days=1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_purge_command(self):
+        """Test that the sweeper deletes only expired holds"""
+        self.place_hold()
+        self.place_hold(self.end_date, self.end_date + timedelta(days=1))
+        BookingHold.objects.filter(start_date=self.start_date).update(expires_at=timezone.now())
+        out = StringIO()
+        call_command('purge_booking_holds', stdout=out)
+        self.assertIn('Deleted 1 expired holds.', out.getvalue())
+        self.assertEqual(BookingHold.objects.count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Bookings are only partitioned on PostgreSQL')
+class BookingPartitionTest(APITestCase):
+    """Test cases for the monthly partitions of the bookings table"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        self.current = month_start(timezone.now())
+        call_command('booking_partitions', ahead=6, stdout=StringIO())
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def partition_of(self, booking):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM bookings WHERE id = %s', [booking.id])
+            return cursor.fetchone()[0]
+
+    def test_overlap_check_prunes_partitions(self):
+        """Test that the overlap check only scans the partitions it can match"""
+        start_date = add_months(self.current, 4) + timedelta(days=14)
+        serializer = BookingSerializer(data={
+            'vehicle': self.vehicle.id,
+            'start_date': start_date.isoformat(),
+            'end_date': (start_date + timedelta(days=3)).isoformat(),
+        })
+        with self.settings(BOOKING_MAX_DURATION_DAYS=10):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+        sql = next(q['sql'] for q in queries.captured_queries if 'FROM "bookings"' in q['sql'])
+
+        plan = self.explain(sql)
+        self.assertIn(partition_name(add_months(self.current, 4)), plan)
+        for month in (3, 5):
+            self.assertNotIn(partition_name(add_months(self.current, month)), plan)
+        self.assertNotIn('bookings_default', plan)
+
+    def test_date_filtered_list_skips_partitions(self):
+        """Test that listing bookings between dates reads the projection, not the partitions"""
+        start_date = add_months(self.current, 2) + timedelta(days=3)
+        Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=2),
+            total_amount=100.00
+        )
+        self.client.force_authenticate(user=self.user)
+        url = reverse('bookings:booking-list-create')
+        params = {'from': f'{start_date:%Y-%m-01}', 'to': f'{start_date:%Y-%m-20}'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'FROM "bookings"' in q['sql']])
+        sql = [q['sql'] for q in queries.captured_queries if 'FROM "booking_list"' in q['sql']][-1]
+        plan = self.explain(sql)
+        self.assertNotIn(partition_name(add_months(self.current, 2)), plan)
+        self.assertNotIn('bookings_default', plan)
+
+    def test_command_moves_rows_out_of_default_partition(self):
+        """Test that new partitions take over matching rows from the default one"""
+        start_date = add_months(self.current, 10) + timedelta(days=1)
+        booking = Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=2),
+            total_amount=100.00
+        )
+        self.assertEqual(self.partition_of(booking), 'bookings_default')
+
+        call_command('booking_partitions', ahead=12, stdout=StringIO())
+        self.assertEqual(self.partition_of(booking), partition_name(add_months(self.current, 10)))
+        self.assertTrue(Booking.objects.filter(pk=booking.pk).exists())
+
+    def test_command_detaches_old_partitions(self):
+        """Test that partitions older than the retention window are detached"""
+        old_month = add_months(self.current, -3)
+        create_month_partition(connection, old_month)
+
+        out = StringIO()
+        call_command('booking_partitions', ahead=0, retain=1, stdout=out)
+        self.assertIn(f'Detached {partition_name(old_month)}', out.getvalue())
+        partitions = list_partitions(connection)
+        self.assertNotIn(partition_name(old_month), partitions)
+        self.assertIn(partition_name(self.current), partitions)
+        self.assertIn('bookings_default', partitions)
+
+    def test_command_archives_before_detaching(self):
+        """Test that finished bookings are archived first and partitions with live bookings stay attached"""
+        finished_month, pending_month = add_months(self.current, -4), add_months(self.current, -3)
+        create_month_partition(connection, finished_month)
+        create_month_partition(connection, pending_month)
+        # Past dates do not pass Booking.clean
+        finished = Booking(
+            customer=self.user, vehicle=self.vehicle, status='completed',
+            start_date=finished_month + timedelta(days=2), end_date=finished_month + timedelta(days=4),
+            total_amount=100.00,
+        )
+        finished.save(validate=False)
+        pending = Booking(
+            customer=self.user, vehicle=self.vehicle,
+            start_date=pending_month + timedelta(days=2), end_date=pending_month + timedelta(days=4),
+            total_amount=100.00,
+        )
+        pending.save(validate=False)
+
+        out = StringIO()
+        call_command('booking_partitions', ahead=0, retain=1, stdout=out)
+        self.assertIn('Archived 1 bookings', out.getvalue())
+        self.assertIn(f'Detached {partition_name(finished_month)}', out.getvalue())
+        self.assertIn(f'Kept {partition_name(pending_month)}', out.getvalue())
+        self.assertTrue(ArchivedBooking.objects.filter(pk=finished.pk).exists())
+        partitions = list_partitions(connection)
+        self.assertNotIn(partition_name(finished_month), partitions)
+        self.assertIn(partition_name(pending_month), partitions)
+        self.assertTrue(Booking.objects.filter(pk=pending.pk).exists())
+
+
+class BookingAdminTest(TestCase):
+    """Test cases for the bookings admin changelist"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass12345')
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:bookings_booking_changelist')
+
+    def create_bookings(self, count, prefix):
+        start = timezone.now() + timedelta(days=1)
+        for index in range(count):
+            customer = User.objects.create_user(username=f'{prefix}{index}', password='pass12345')
+            vehicle = Vehicle.objects.create(
+                owner=self.admin, make='Toyota', model='Corolla', year=2021,
+                plate_number=f'{prefix.upper()}-{index}', daily_rate=50,
+            )
+            Booking.objects.create(
+                customer=customer, vehicle=vehicle, start_date=start,
+                end_date=start + timedelta(days=2), total_amount=100,
+            )
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that customers and vehicles are joined instead of fetched per row"""
+        self.create_bookings(2, 'few')
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.create_bookings(6, 'many')
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    def test_prefix_search(self):
+        """Test that search matches username and plate number prefixes only"""
+        self.create_bookings(2, 'alpha')
+        self.create_bookings(1, 'beta')
+        response = self.client.get(self.url, {'q': 'ALPHA'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get(self.url, {'q': 'beta-0'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(self.url, {'q': 'lpha'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_cancel_action(self):
+        """Test that the cancel action updates the selected bookings and their vehicles"""
+        self.create_bookings(3, 'act')
+        selected = list(Booking.objects.values_list('id', flat=True)[:2])
+        response = self.client.post(self.url, {'action': 'cancel_bookings', '_selected_action': selected})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 2)
+        self.assertEqual(
+            set(Booking.objects.filter(status='cancelled').values_list('vehicle__status', flat=True)), {'available'},
+        )
+
+
+class BookingBulkStatusTest(APITestCase):
+    """Test cases for changing the status of many bookings at once"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass12345')
+        self.stranger = User.objects.create_user(username='stranger', email='s@example.com', password='pass12345')
+        self.url = reverse('bookings:booking-bulk-status')
+        self.start = timezone.now() + timedelta(days=1)
+
+    def create_bookings(self, count, owner=None):
+        bookings = []
+        for index in range(count):
+            vehicle = Vehicle.objects.create(
+                owner=owner or self.owner, make='Suzuki', model='Swift', year=2022,
+                plate_number=f'BLK-{Vehicle.objects.count()}', daily_rate=40,
+            )
+            bookings.append(Booking.objects.create(
+                customer=self.customer, vehicle=vehicle, start_date=self.start,
+                end_date=self.start + timedelta(days=2), total_amount=80,
+            ))
+        return bookings
+
+    def test_owner_cancels_bookings_in_one_update(self):
+        """Test that bookings are cancelled set-wise and their vehicles freed"""
+        bookings = self.create_bookings(3)
+        bookings[0].vehicle.status = 'rented'
+        bookings[0].vehicle.save()
+        self.client.force_authenticate(self.owner)
+
+        response = self.client.patch(self.url, {'ids': [b.id for b in bookings], 'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 3})
+        for booking in bookings:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 'cancelled')
+            self.assertEqual(booking.version, 2)
+            self.assertEqual(booking.vehicle.status, 'available')
+
+        response = self.client.patch(self.url, {'ids': [bookings[0].id], 'status': 'cancelled'}, format='json')
+        self.assertEqual(response.data, {'updated': 0})
+
+    def test_queries_do_not_grow_with_ids(self):
+        """Test that the number of queries is independent of the number of bookings"""
+        self.client.force_authenticate(self.owner)
+        few = self.create_bookings(2)
+        many = self.create_bookings(8)
+        with CaptureQueriesContext(connection) as small:
+            self.client.patch(self.url, {'ids': [b.id for b in few], 'status': 'confirmed'}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.patch(self.url, {'ids': [b.id for b in many], 'status': 'confirmed'}, format='json')
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(Vehicle.objects.filter(status='rented').count(), 10)
+
+    def test_other_users_bookings_are_skipped(self):
+        """Test that ids of bookings the user neither made nor owns the vehicle of are ignored"""
+        mine = self.create_bookings(1)
+        theirs = self.create_bookings(1, owner=self.stranger)
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(
+            self.url, {'ids': [mine[0].id, theirs[0].id], 'status': 'cancelled'}, format='json',
+        )
+        self.assertEqual(response.data, {'updated': 1})
+        theirs[0].refresh_from_db()
+        self.assertEqual(theirs[0].status, 'pending')
+
+        response = self.client.patch(self.url, {'ids': [], 'status': 'lost'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data)
+        self.assertIn('status', response.data)
+
+    def test_transitions_depend_on_role(self):
+        """Test that customers can only cancel and owners cannot skip statuses"""
+        bookings = self.create_bookings(2)
+        self.client.force_authenticate(self.customer)
+        response = self.client.patch(self.url, {'ids': [b.id for b in bookings], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.data, {'updated': 0})
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(self.url, {'ids': [b.id for b in bookings], 'status': 'completed'}, format='json')
+        self.assertEqual(response.data, {'updated': 0})
+        self.assertFalse(Booking.objects.exclude(status='pending').exists())
+
+    def test_confirming_overlaps_is_refused(self):
+        """Test that confirming fails when dates are booked, held or taken twice in the batch"""
+        booking = self.create_bookings(1)[0]
+        other = User.objects.create_user(username='other', email='o@example.com', password='pass12345')
+        rival = Booking.objects.create(
+            customer=other, vehicle=booking.vehicle, start_date=self.start + timedelta(days=1),
+            end_date=self.start + timedelta(days=4), total_amount=120,
+        )
+        self.client.force_authenticate(self.owner)
+
+        response = self.client.patch(self.url, {'ids': [booking.id, rival.id], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data)
+        self.assertFalse(Booking.objects.filter(status='confirmed').exists())
+
+        Booking.objects.filter(pk=rival.pk).update(status='confirmed')
+        response = self.client.patch(self.url, {'ids': [booking.id], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        Booking.objects.filter(pk=rival.pk).update(status='cancelled')
+        hold = BookingHold.objects.create(
+            customer=other, vehicle=booking.vehicle, start_date=self.start, end_date=self.start + timedelta(days=1),
+            total_amount=40, deposit_amount=8, expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        response = self.client.patch(self.url, {'ids': [booking.id], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        hold.delete()
+        response = self.client.patch(self.url, {'ids': [booking.id], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.data, {'updated': 1})
+
+
+class BookingAlternativesTest(APITestCase):
+    """Test cases for the vehicles suggested when a booking conflicts"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass12345')
+        self.vehicle = self.create_vehicle('Toyota', 'Corolla', daily_rate=6000, transmission='automatic')
+        self.start = timezone.now() + timedelta(days=1)
+        self.end = self.start + timedelta(days=2)
+        Booking.objects.create(
+            customer=self.owner, vehicle=self.vehicle, start_date=self.start, end_date=self.end,
+            total_amount=12000, status='confirmed',
+        )
+
+    def create_vehicle(self, make, model, daily_rate, **fields):
+        return Vehicle.objects.create(
+            owner=self.owner, make=make, model=model, year=2021,
+            plate_number=f'ALT-{Vehicle.objects.count()}', daily_rate=daily_rate, **fields,
+        )
+
+    def test_alternatives_are_ranked_by_similarity(self):
+        """Test that same make and model rank first and unrelated vehicles are left out"""
+        cheaper = self.create_vehicle('Honda', 'Civic', daily_rate=5500, transmission='automatic')
+        same_model = self.create_vehicle('Toyota', 'Corolla', daily_rate=9000)
+        closer_rate = self.create_vehicle('Suzuki', 'Alto', daily_rate=6100, transmission='automatic')
+        self.create_vehicle('Hino', 'Bus', daily_rate=20000, seats=30)
+
+        alternatives = alternative_vehicles(self.vehicle, self.start, self.end)
+        self.assertEqual(alternatives, [same_model, closer_rate, cheaper])
+        self.assertEqual(len(alternative_vehicles(self.vehicle, self.start, self.end, limit=1)), 1)
+
+    def test_booked_and_held_vehicles_are_excluded(self):
+        """Test that vehicles booked or held by others over the window are not suggested"""
+        booked = self.create_vehicle('Toyota', 'Corolla', daily_rate=6000)
+        held = self.create_vehicle('Toyota', 'Corolla', daily_rate=6000)
+        own_hold = self.create_vehicle('Toyota', 'Corolla', daily_rate=6000)
+        free = self.create_vehicle('Toyota', 'Corolla', daily_rate=6000)
+        Booking.objects.create(
+            customer=self.owner, vehicle=booked, start_date=self.start - timedelta(hours=1),
+            end_date=self.start + timedelta(hours=1), total_amount=6000, status='active',
+        )
+        expires_at = timezone.now() + timedelta(minutes=5)
+        for vehicle, customer in ((held, self.owner), (own_hold, self.customer)):
+            BookingHold.objects.create(
+                customer=customer, vehicle=vehicle, start_date=self.start, end_date=self.end,
+                total_amount=12000, deposit_amount=2400, expires_at=expires_at,
+            )
+
+        alternatives = alternative_vehicles(self.vehicle, self.start, self.end, self.customer.pk)
+        self.assertEqual(alternatives, [own_hold, free])
+
+    def test_conflict_response_lists_alternatives(self):
+        """Test that a conflicting booking gets a 400 with free similar vehicles"""
+        free = self.create_vehicle('Toyota', 'Corolla', daily_rate=6500)
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('bookings:booking-list-create'), {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start.isoformat(),
+            'end_date': self.end.isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Vehicle is not available for the selected dates.', str(response.data['non_field_errors']))
+        self.assertEqual([vehicle['id'] for vehicle in response.data['alternatives']], [free.id])
+        self.assertEqual(response.data['alternatives'][0]['full_name'], free.full_name)
+
+        response = self.client.post(reverse('bookings:booking-list-create'), {'vehicle': self.vehicle.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('alternatives', response.data)
+
+
+class BookingCountersTest(APITestCase):
+    """Test cases for the booking totals kept on users and vehicles"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass12345')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.owner, make='Honda', model='City', year=2022, plate_number='CNT-1', daily_rate=50,
+        )
+        self.start = timezone.now() + timedelta(days=1)
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual({name: getattr(obj, name) for name in expected}, expected)
+
+    def test_counters_follow_booking_writes(self):
+        """Test that creating, completing and deleting a booking moves the counters"""
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('bookings:booking-list-create'), {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=2)).isoformat(),
+            'status': 'confirmed',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The vehicle instance saved after the insert must not write back stale counts
+        self.assertCounters(self.vehicle, status='rented', booking_count=1, upcoming_booking_count=1, revenue=0)
+        self.assertCounters(self.customer, booking_count=1, upcoming_booking_count=1, lifetime_spend=0)
+        self.assertCounters(self.owner, vehicle_count=1, booking_count=0)
+
+        booking = Booking.objects.get()
+        booking.status = 'completed'
+        booking.save(validate=False)
+        self.assertCounters(self.customer, booking_count=1, upcoming_booking_count=0, lifetime_spend=100)
+        self.assertCounters(self.vehicle, booking_count=1, upcoming_booking_count=0, revenue=100)
+
+        booking.delete()
+        self.assertCounters(self.customer, booking_count=0, lifetime_spend=0)
+        self.assertCounters(self.vehicle, booking_count=0, revenue=0)
+
+    def test_bulk_status_and_archive_keep_counters(self):
+        """Test that set-based status changes count and archiving does not uncount"""
+        bookings = [
+            Booking.objects.create(
+                customer=self.customer, vehicle=self.vehicle, start_date=self.start + timedelta(days=3 * index),
+                end_date=self.start + timedelta(days=3 * index + 1), total_amount=40,
+            )
+            for index in range(3)
+        ]
+        set_booking_status(Booking.objects.filter(id__in=[b.id for b in bookings[:2]]), 'completed')
+        self.assertCounters(self.customer, booking_count=3, upcoming_booking_count=1, lifetime_spend=80)
+
+        Booking.objects.filter(status='completed').update(end_date=timezone.now() - timedelta(days=400))
+        call_command('archive_bookings', stdout=StringIO())
+        self.assertEqual(ArchivedBooking.objects.count(), 2)
+        self.assertCounters(self.customer, booking_count=3, upcoming_booking_count=1, lifetime_spend=80)
+        self.assertCounters(self.vehicle, booking_count=3, upcoming_booking_count=1, revenue=80)
+        self.assertEqual(reconcile_counters(dry_run=True), (0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        """Test that the reconcile command recomputes drifted counters"""
+        Booking.objects.create(
+            customer=self.customer, vehicle=self.vehicle, start_date=self.start,
+            end_date=self.start + timedelta(days=1), total_amount=50,
+        )
+        User.objects.filter(pk=self.customer.pk).update(booking_count=7, vehicle_count=2)
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(upcoming_booking_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', dry_run=True, stdout=out)
+        self.assertIn('1 users and 1 vehicles', out.getvalue())
+        self.assertCounters(self.customer, booking_count=7)
+
+        call_command('reconcile_counters', chunk_size=1, stdout=StringIO())
+        self.assertCounters(self.customer, booking_count=1, upcoming_booking_count=1, vehicle_count=0)
+        self.assertCounters(self.owner, vehicle_count=1)
+        self.assertCounters(self.vehicle, booking_count=1, upcoming_booking_count=1)
+        self.assertEqual(reconcile_counters(), (0, 0))
+
+
+class BookingListProjectionTest(APITestCase):
+    """Test cases for the booking list read model"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass12345')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.owner, make='Suzuki', model='Cultus', year=2019, plate_number='PRJ-1', daily_rate=40,
+        )
+        self.start = timezone.now() + timedelta(days=1)
+        self.url = reverse('bookings:booking-list-create')
+        self.client.force_authenticate(self.customer)
+
+    def create_booking(self, days=1):
+        return Booking.objects.create(
+            customer=self.customer, vehicle=self.vehicle, start_date=self.start + timedelta(days=3 * days),
+            end_date=self.start + timedelta(days=3 * days + 1), total_amount=40,
+        )
+
+    def test_list_reads_only_projection(self):
+        """Test that the list is served from booking_list without joins and follows writes"""
+        booking = self.create_booking()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'status': 'pending', 'vehicle': self.vehicle.id})
+        self.assertEqual(response.data['results'][0]['vehicle_name'], '2019 Suzuki Cultus')
+        self.assertEqual(response.data['results'][0]['customer'], 'customer')
+        listing = [q['sql'] for q in queries.captured_queries if 'booking_list' in q['sql']]
+        self.assertTrue(listing)
+        for sql in listing:
+            self.assertNotIn('JOIN', sql)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'FROM "bookings"' in q['sql']])
+
+        self.vehicle.model = 'Wagon R'
+        self.vehicle.save()
+        self.customer.username = 'renamed'
+        self.customer.save()
+        set_booking_status(Booking.objects.filter(pk=booking.pk), 'confirmed')
+        entry = BookingListEntry.objects.get(pk=booking.pk)
+        self.assertEqual(
+            (entry.vehicle_name, entry.customer_username, entry.status),
+            ('2019 Suzuki Wagon R', 'renamed', 'confirmed'),
+        )
+
+        booking.delete()
+        self.assertFalse(BookingListEntry.objects.exists())
+
+    def test_check_command_repairs_drift(self):
+        """Test that the check command finds and repairs missing, stale and orphaned entries"""
+        stale, missing = self.create_booking(1), self.create_booking(2)
+        Booking.objects.filter(pk=stale.pk).update(status='cancelled')
+        BookingListEntry.objects.filter(pk=missing.pk).delete()
+        BookingListEntry.objects.create(
+            id=999999, customer=self.customer, customer_username='customer', vehicle=self.vehicle,
+            vehicle_name='gone', start_date=self.start, end_date=self.start, total_amount=0,
+            status='pending', created_at=self.start, updated_at=self.start,
+        )
+
+        out = StringIO()
+        call_command('check_booking_list', stdout=out)
+        self.assertIn('1 missing, 1 stale, 1 orphaned', out.getvalue())
+
+        call_command('check_booking_list', repair=True, chunk_size=1, stdout=StringIO())
+        out = StringIO()
+        call_command('check_booking_list', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+        self.assertEqual(
+            dict(BookingListEntry.objects.values_list('id', 'status')), {stale.pk: 'cancelled', missing.pk: 'pending'},
+        )
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class BookingSyncTest(APITestCase):
+    """Test cases for delta sync of the booking list"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass12345')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.owner, make='Suzuki', model='Alto', year=2020, plate_number='SYN-1', daily_rate=40,
+        )
+        self.start = timezone.now() + timedelta(days=1)
+        self.url = reverse('bookings:booking-sync')
+        self.client.force_authenticate(self.customer)
+
+    def create_booking(self, days=1):
+        return Booking.objects.create(
+            customer=self.customer, vehicle=self.vehicle, start_date=self.start + timedelta(days=3 * days),
+            end_date=self.start + timedelta(days=3 * days + 1), total_amount=40,
+        )
+
+    def sync(self, cursor=None):
+        response = self.client.get(self.url, {'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sync_returns_changes_and_deletions(self):
+        """Test that a sync pages through everything, then returns only changed and deleted bookings"""
+        first, second, third = self.create_booking(1), self.create_booking(2), self.create_booking(3)
+        seen, cursor = [], None
+        with override_settings(SYNC_PAGE_SIZE=2):
+            while True:
+                data = self.sync(cursor)
+                seen += [row['id'] for row in data['results']]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+        self.assertEqual(seen, [first.pk, second.pk, third.pk])
+
+        data = self.sync(cursor)
+        self.assertEqual((data['results'], data['deleted']), ([], []))
+
+        first.status = 'confirmed'
+        first.save()
+        response = self.client.delete(reverse('bookings:booking-detail', args=[second.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        data = self.sync(data['cursor'])
+        self.assertEqual([(row['id'], row['status']) for row in data['results']], [(first.pk, 'confirmed')])
+        self.assertEqual(data['deleted'], [second.pk])
+        self.assertFalse(data['has_more'])
+
+    def test_recent_changes_are_sent_again(self):
+        """Test that rows inside the lag window are repeated rather than skipped"""
+        booking = self.create_booking()
+        with override_settings(SYNC_LAG_SECONDS=60):
+            cursor = self.sync()['cursor']
+            self.assertEqual([row['id'] for row in self.sync(cursor)['results']], [booking.pk])
+
+    def test_rejects_invalid_and_expired_cursors(self):
+        """Test that tampered cursors get a 400 and ones older than the tombstones a 410"""
+        response = self.client.get(self.url, {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        old = (timezone.now() - timedelta(days=31), 0)
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=30):
+            response = self.client.get(self.url, {'since': encode_cursor('bookings', old, old)})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        # Cursors are bound to their feed
+        response = self.client.get(self.url, {'since': encode_cursor('vehicles', old, old)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
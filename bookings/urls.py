@@ -5,5 +5,11 @@ app_name = 'bookings'
 
 urlpatterns = [
     path('', views.BookingListCreateView.as_view(), name='booking-list-create'),
+    path('sync/', views.BookingSyncView.as_view(), name='booking-sync'),
+    path('batch/', views.BookingBatchView.as_view(), name='booking-batch'),
+    path('bulk-status/', views.BookingBulkStatusView.as_view(), name='booking-bulk-status'),
+    path('holds/', views.BookingHoldListCreateView.as_view(), name='booking-hold-list-create'),
+    path('holds/<int:pk>/', views.BookingHoldDetailView.as_view(), name='booking-hold-detail'),
+    path('holds/<int:pk>/convert/', views.BookingHoldConvertView.as_view(), name='booking-hold-convert'),
     path('<int:pk>/', views.BookingDetailView.as_view(), name='booking-detail'),
 ] 
\ No newline at end of file
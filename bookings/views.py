@@ -1,11 +1,58 @@
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
-from .models import Booking
-from .serializers import BookingSerializer, BookingListSerializer
+from core.concurrency import CONFLICT_RESPONSE, IF_MATCH_PARAMETER, OptimisticConcurrencyMixin
+from core.fastpath import FastListMixin
+from core.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetViewMixin
+from core.serializers import BulkUpdateResultSerializer
+from core.views import (
+    IDS_PARAMETER, SINCE_PARAMETER, SYNC_ERROR_RESPONSES, BatchRetrieveAPIView, DeltaSyncAPIView,
+    batch_response_serializer, sync_response_serializer,
+)
+from vehicles.bulk import update_vehicles
+from vehicles.models import Vehicle
+from .archive import BookingHistory
+from .bulk import (
+    CUSTOMER_TRANSITIONS, OWNER_TRANSITIONS, VEHICLE_STATUS_FOR, BookingOverlapError, set_booking_status,
+)
+from .holds import HoldUnavailable, convert_hold
+from .models import ArchivedBooking, Booking, BookingHold, BookingListEntry
+from .projection import entry_for
+from .serializers import (
+    AlternativeVehicleSerializer, BookingBulkStatusSerializer, BookingConflictSerializer, BookingHoldSerializer,
+    BookingSerializer, BookingListSerializer,
+)
+
+
+INCLUDE_ARCHIVED_PARAMETER = OpenApiParameter(
+    name='include_archived',
+    description='Also return archived (old completed or cancelled) bookings',
+    required=False,
+    type=bool,
+)
+
+
+class ArchivedBookingsMixin:
+    """
+    Support ``?include_archived=1`` on booking views
+    """
+
+    def include_archived(self):
+        value = self.request.query_params.get('include_archived', '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_archived_queryset(self):
+        return ArchivedBooking.objects.filter(customer=self.request.user)
 
 
 @extend_schema_view(
@@ -18,26 +65,32 @@ from .serializers import BookingSerializer, BookingListSerializer
             OpenApiParameter(name='vehicle', description='Filter by vehicle', required=False, type=int),
             OpenApiParameter(name='from', description='Filter from date', required=False, type=str),
             OpenApiParameter(name='to', description='Filter to date', required=False, type=str),
+            INCLUDE_ARCHIVED_PARAMETER,
+            *SPARSE_FIELDSET_PARAMETERS,
         ],
         responses={200: BookingListSerializer}
     ),
     post=extend_schema(
         tags=['Bookings'],
         summary='Create new booking',
-        description='Create a new booking',
+        description=(
+            'Create a new booking. If the vehicle is already booked, held or otherwise unavailable, '
+            'the 400 response lists similar vehicles that are free for the same dates in `alternatives`.'
+        ),
         request=BookingSerializer,
         responses={
             201: BookingSerializer,
-            400: BookingSerializer,
+            400: BookingConflictSerializer,
         }
     )
 )
-class BookingListCreateView(generics.ListCreateAPIView):
+class BookingListCreateView(ArchivedBookingsMixin, FastListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     List all bookings for the authenticated user
     Create a new booking
     """
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'vehicle']
     
@@ -47,31 +100,67 @@ class BookingListCreateView(generics.ListCreateAPIView):
         return BookingSerializer
     
     def get_queryset(self):
-        queryset = Booking.objects.filter(customer=self.request.user)
-        
+        # Listing reads only the flat booking list projection; see bookings.projection
+        return self.filter_dates(BookingListEntry.objects.filter(customer=self.request.user))
+
+    def filter_dates(self, queryset):
         # Add date filtering
         from_date = self.request.query_params.get('from', None)
         to_date = self.request.query_params.get('to', None)
         
+        # Compare against datetime bounds rather than __date lookups so the
+        # start_date range can use the (customer, start_date) index.
         if from_date:
             from_date = parse_date(from_date)
             if from_date:
-                queryset = queryset.filter(start_date__date__gte=from_date)
+                queryset = queryset.filter(start_date__gte=self.day_start(from_date))
         
         if to_date:
             to_date = parse_date(to_date)
             if to_date:
-                queryset = queryset.filter(end_date__date__lte=to_date)
+                day_after = self.day_start(to_date + timedelta(days=1))
+                queryset = queryset.filter(start_date__lt=day_after, end_date__lt=day_after)
         
         return queryset
+
+    @staticmethod
+    def day_start(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def list(self, request, *args, **kwargs):
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+
+        # Archived rows come after the live ones and are only read once the
+        # requested page reaches past the live bookings.
+        history = BookingHistory(
+            self.filter_queryset(self.get_queryset()),
+            self.filter_queryset(self.filter_dates(self.get_archived_queryset())),
+            convert=entry_for,
+        )
+        page = self.paginate_queryset(history)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            errors = dict(serializer.errors)
+            if serializer.alternatives is not None:
+                errors['alternatives'] = AlternativeVehicleSerializer(serializer.alternatives, many=True).data
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @transaction.atomic
     def perform_create(self, serializer):
         booking = serializer.save()
         
-        # Update vehicle status to rented if booking is confirmed
+        # Update vehicle status to rented if booking is confirmed; set-based,
+        # so a stale vehicle instance cannot raise VersionConflict
         if booking.status == 'confirmed':
-            booking.vehicle.status = 'rented'
-            booking.vehicle.save()
+            update_vehicles(Vehicle.objects.filter(pk=booking.vehicle_id), status='rented')
 
 
 @extend_schema_view(
@@ -79,56 +168,255 @@ class BookingListCreateView(generics.ListCreateAPIView):
         tags=['Bookings'],
         summary='Get booking details',
         description='Get booking details',
+        parameters=[INCLUDE_ARCHIVED_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
         responses={200: BookingSerializer}
     ),
     put=extend_schema(
         tags=['Bookings'],
         summary='Update booking',
         description='Update booking',
+        parameters=[IF_MATCH_PARAMETER],
         request=BookingSerializer,
-        responses={200: BookingSerializer}
+        responses={200: BookingSerializer, 409: CONFLICT_RESPONSE}
     ),
     patch=extend_schema(
         tags=['Bookings'],
         summary='Partially update booking',
         description='Partially update booking',
+        parameters=[IF_MATCH_PARAMETER],
         request=BookingSerializer,
-        responses={200: BookingSerializer}
+        responses={200: BookingSerializer, 409: CONFLICT_RESPONSE}
     ),
     delete=extend_schema(
         tags=['Bookings'],
         summary='Cancel booking',
         description='Cancel booking',
-        responses={204: None}
+        parameters=[IF_MATCH_PARAMETER],
+        responses={204: None, 409: CONFLICT_RESPONSE}
     )
 )
-class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BookingDetailView(ArchivedBookingsMixin, OptimisticConcurrencyMixin, SparseFieldsetViewMixin,
+                        generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a booking
     """
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
     serializer_class = BookingSerializer
     
     def get_queryset(self):
         return Booking.objects.filter(customer=self.request.user)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Archived bookings are read-only
+            if self.request.method != 'GET' or not self.include_archived():
+                raise
+        archived = generics.get_object_or_404(
+            self.get_archived_queryset().select_related('customer', 'vehicle'),
+            pk=self.kwargs['pk'],
+        )
+        return archived.to_booking()
     
+    @transaction.atomic
     def perform_update(self, serializer):
         booking = serializer.save()
         
-        # Update vehicle status based on booking status
-        if booking.status == 'cancelled':
-            booking.vehicle.status = 'available'
-            booking.vehicle.save()
-        elif booking.status == 'confirmed':
-            booking.vehicle.status = 'rented'
-            booking.vehicle.save()
+        # Update vehicle status based on booking status, set-based so that
+        # only a conflict on the booking itself can raise VersionConflict
+        vehicle_status = VEHICLE_STATUS_FOR.get(booking.status)
+        if vehicle_status:
+            update_vehicles(Vehicle.objects.filter(pk=booking.vehicle_id), status=vehicle_status)
     
+    @transaction.atomic
     def perform_destroy(self, instance):
         # Update vehicle status to available when booking is deleted
-        instance.vehicle.status = 'available'
-        instance.vehicle.save()
+        update_vehicles(Vehicle.objects.filter(pk=instance.vehicle_id), status='available')
+        # Also leaves the tombstone delta sync reports (bookings.signals)
         instance.delete()
         
         return Response({
             'message': 'Booking cancelled successfully'
         }, status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(
+    tags=['Bookings'],
+    summary='Get several bookings',
+    description='Get several of your bookings by id in one request; unknown ids are listed under "missing"',
+    parameters=[IDS_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
+    responses={200: batch_response_serializer('BookingBatchResponse', BookingSerializer)},
+)
+class BookingBatchView(SparseFieldsetViewMixin, BatchRetrieveAPIView):
+    """
+    Retrieve several bookings by id
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingSerializer
+
+    def get_queryset(self):
+        return Booking.objects.filter(customer=self.request.user)
+
+
+@extend_schema(
+    tags=['Bookings'],
+    summary='Sync bookings',
+    description=(
+        'Your bookings (as in the list) created or changed since the "since" cursor, plus the ids of bookings '
+        'deleted or archived since. Leave out "since" for a full sync, then keep the returned cursor and sync '
+        'again while "has_more" is true. Rows may be sent more than once; apply them as upserts.'
+    ),
+    parameters=[SINCE_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
+    responses={200: sync_response_serializer('BookingSyncResponse', BookingListSerializer), **SYNC_ERROR_RESPONSES},
+)
+class BookingSyncView(DeltaSyncAPIView):
+    """
+    Delta sync of the booking list
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingListSerializer
+    sync_resource = 'bookings'
+
+    def get_queryset(self):
+        return BookingListEntry.objects.filter(customer=self.request.user)
+
+
+@extend_schema(
+    tags=['Bookings'],
+    summary='Change the status of several bookings',
+    description=(
+        'Move bookings you made or that are for your vehicles to one status in a single update. '
+        'Customers can cancel pending or confirmed bookings; vehicle owners can also confirm pending, '
+        'activate confirmed and complete active ones. '
+        'Vehicles of cancelled bookings become available and those of confirmed bookings rented. '
+        'Ids that are not yours or cannot move to the status are skipped. Confirming or activating fails, '
+        'changing nothing, if any of the bookings overlaps a confirmed booking, another one in the request '
+        "or another customer's hold."
+    ),
+    request=BookingBulkStatusSerializer,
+    responses={200: BulkUpdateResultSerializer, 400: BookingBulkStatusSerializer},
+)
+class BookingBulkStatusView(generics.GenericAPIView):
+    """
+    Set the status of many bookings at once
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingBulkStatusSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        return Booking.objects.filter(Q(customer=user) | Q(vehicle__owner=user))
+
+    def filter_transitions(self, queryset, to_status):
+        """Keep the bookings the user may move to ``to_status``"""
+        user = self.request.user
+        return queryset.filter(
+            Q(customer=user, status__in=CUSTOMER_TRANSITIONS.get(to_status, []))
+            | Q(vehicle__owner=user, status__in=OWNER_TRANSITIONS.get(to_status, []))
+        )
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        to_status = serializer.validated_data['status']
+        queryset = self.get_queryset().filter(id__in=serializer.validated_data['ids'])
+        try:
+            updated = set_booking_status(self.filter_transitions(queryset, to_status), to_status)
+        except BookingOverlapError as exc:
+            raise ValidationError({'ids': [str(exc)]})
+        return Response({'updated': updated})
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Bookings'],
+        summary='List booking holds',
+        description='List your active holds',
+        responses={200: BookingHoldSerializer}
+    ),
+    post=extend_schema(
+        tags=['Bookings'],
+        summary='Place booking hold',
+        description=(
+            'Reserve a vehicle for a booking window for BOOKING_HOLD_TTL_SECONDS. '
+            'Other customers cannot book or hold overlapping dates until the hold expires or is released.'
+        ),
+        request=BookingHoldSerializer,
+        responses={
+            201: BookingHoldSerializer,
+            400: BookingHoldSerializer,
+        }
+    )
+)
+class BookingHoldListCreateView(generics.ListCreateAPIView):
+    """
+    List active holds of the authenticated user
+    Place a new hold
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingHoldSerializer
+
+    def get_queryset(self):
+        return BookingHold.objects.filter(
+            customer=self.request.user, expires_at__gt=timezone.now()
+        ).select_related('vehicle')
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Bookings'],
+        summary='Get booking hold',
+        description='Get one of your active holds',
+        responses={200: BookingHoldSerializer}
+    ),
+    delete=extend_schema(
+        tags=['Bookings'],
+        summary='Release booking hold',
+        description='Release a hold before it expires',
+        responses={204: None}
+    )
+)
+class BookingHoldDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Retrieve or release a hold
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingHoldSerializer
+
+    def get_queryset(self):
+        return BookingHold.objects.filter(
+            customer=self.request.user, expires_at__gt=timezone.now()
+        ).select_related('vehicle')
+
+
+@extend_schema(
+    tags=['Bookings'],
+    summary='Convert booking hold',
+    description='Turn an active hold into a pending booking at the price quoted for the hold',
+    request=None,
+    responses={201: BookingSerializer},
+)
+class BookingHoldConvertView(generics.GenericAPIView):
+    """
+    Convert a hold into a booking
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    serializer_class = BookingSerializer
+
+    def post(self, request, *args, **kwargs):
+        try:
+            booking = convert_hold(request.user, self.kwargs['pk'])
+        except HoldUnavailable as exc:
+            raise ValidationError(str(exc))
+        if booking is None:
+            raise Http404('Hold not found or expired.')
+        serializer = self.get_serializer(booking)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
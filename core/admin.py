@@ -0,0 +1,80 @@
+"""
+Admin helpers for tables too large for exact counts.
+
+``EstimatedCountPaginator`` answers unfiltered changelists on PostgreSQL
+from ``pg_class.reltuples`` once a table passes
+``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows. Filtered changelists get an exact
+count if it finishes within ``ADMIN_COUNT_TIMEOUT_MS`` and the planner's
+row estimate otherwise. Other databases always count exactly.
+"""
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections
+from django.utils.functional import cached_property
+
+from .db.timeouts import statement_timeout
+
+
+def table_estimate(connection, table):
+    """
+    Return the planner's row count for ``table``, or None if never analyzed.
+
+    Partitioned tables are estimated from their partitions.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            '  SELECT SUM(GREATEST(p.reltuples, 0)) FROM pg_inherits i '
+            '  JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid'
+            ') ELSE c.reltuples END FROM pg_class c WHERE c.oid = %s::regclass',
+            [table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+def plan_estimate(queryset):
+    """Return the planner's row estimate for ``queryset``"""
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids exact ``COUNT(*)`` over large PostgreSQL tables
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        if not queryset.query.where:
+            estimate = table_estimate(connection, queryset.model._meta.db_table)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+            return super().count
+
+        try:
+            with statement_timeout(queryset.db, settings.ADMIN_COUNT_TIMEOUT_MS):
+                return queryset.count()
+        except OperationalError:
+            return plan_estimate(queryset)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for tables with millions of rows.
+
+    Uses estimated counts and skips the second, unfiltered count Django
+    runs to show "N of M selected".
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
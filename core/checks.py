@@ -0,0 +1,16 @@
+from django.core.checks import Error, register
+
+from .schema import generate_schema, stale_artifacts
+
+
+@register(deploy=True)
+def check_schema_artifacts(app_configs, **kwargs):
+    """The prebuilt OpenAPI schema must match the code being deployed"""
+    stale = stale_artifacts(generate_schema())
+    if not stale:
+        return []
+    return [Error(
+        f"OpenAPI schema artifact {path} is missing or out of date.",
+        hint="Run 'python manage.py build_schema' as part of the build.",
+        id='core.E001',
+    ) for path in stale]
@@ -0,0 +1,135 @@
+"""
+Optimistic concurrency control.
+
+Models using ``VersionedModelMixin`` carry an integer ``version`` column.
+Every save of an existing row runs ``UPDATE ... WHERE id = %s AND
+version = %s`` with the version the instance was loaded with (or the one
+the client asked for) and bumps it; if another writer got there first no
+row matches and ``VersionConflict`` is raised instead of overwriting their
+change. Nothing is locked while the client edits.
+
+``OptimisticConcurrencyMixin`` exposes this on detail views: responses
+carry ``ETag: "<version>"``, writes take the expected version from
+``If-Match`` or a ``version`` field in the body, and conflicts are
+answered with 409 and the current state of the object.
+"""
+from django.db import models, router, transaction
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+UNSAFE_METHODS = ('PUT', 'PATCH', 'DELETE')
+
+IF_MATCH_PARAMETER = OpenApiParameter(
+    name='If-Match', location=OpenApiParameter.HEADER, required=False, type=str,
+    description='ETag (version) the change is based on, e.g. "3"; a "version" field in the body works too',
+)
+CONFLICT_RESPONSE = OpenApiResponse(
+    description='The record was changed since the given version; the body holds the current state under "current"',
+)
+
+
+class VersionConflict(Exception):
+    """The row was changed (or its version did not match) since it was read"""
+
+    def __init__(self, instance):
+        super().__init__(f'{type(instance).__name__} {instance.pk} was modified by someone else.')
+        self.instance = instance
+
+
+class VersionedModelMixin:
+    """
+    Make saves of existing rows conditional on ``version``
+
+    The model must declare ``version = models.PositiveIntegerField(default=1)``.
+    """
+
+    def save(self, *args, **kwargs):
+        # VersionConflict is raised from inside save(); the savepoint keeps it
+        # from breaking a transaction the caller may be in.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = self.version
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, expected + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update,
+        )
+        if updated:
+            self.version = expected + 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(self)
+        return updated
+
+
+def bump_version():
+    """Value for ``queryset.update(version=...)`` in set-based updates"""
+    return models.F('version') + 1
+
+
+def parse_version(value, source):
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({source: ['A valid integer version is required.']})
+    if version < 1:
+        raise ValidationError({source: ['A valid integer version is required.']})
+    return version
+
+
+class OptimisticConcurrencyMixin:
+    """
+    ETag/If-Match handling and 409 responses for versioned detail views
+    """
+    conflict_message = 'This record was changed by someone else. Review the current state and retry.'
+
+    def get_expected_version(self):
+        """The version the client based its change on, or None if not given"""
+        header = self.request.META.get('HTTP_IF_MATCH')
+        if header and header.strip() != '*':
+            tags = parse_etags(header)
+            if len(tags) != 1:
+                raise ValidationError({'If-Match': ['Send exactly one version.']})
+            return parse_version(tags[0].strip('"'), 'If-Match')
+        if isinstance(self.request.data, dict) and self.request.data.get('version') not in (None, ''):
+            return parse_version(self.request.data['version'], 'version')
+        return None
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.request.method in UNSAFE_METHODS:
+            expected = self.get_expected_version()
+            if expected is not None:
+                if expected != obj.version:
+                    raise VersionConflict(obj)
+                obj.version = expected
+        return obj
+
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionConflict):
+            return self.conflict_response()
+        return super().handle_exception(exc)
+
+    def conflict_response(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        current = self.get_queryset().filter(pk=self.kwargs[lookup_url_kwarg]).first()
+        data = {'detail': self.conflict_message}
+        headers = {}
+        if current is not None:
+            data['current'] = self.get_serializer(current).data
+            headers['ETag'] = quote_etag(str(current.version))
+        return Response(data, status=status.HTTP_409_CONFLICT, headers=headers)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if (status.is_success(response.status_code) and isinstance(data, dict)
+                and data.get('version') is not None and not response.has_header('ETag')):
+            response['ETag'] = quote_etag(str(data['version']))
+        return response
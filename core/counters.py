@@ -0,0 +1,57 @@
+"""
+Denormalized counter columns.
+
+Counters are changed with ``UPDATE ... SET n = n + delta`` in the same
+transaction as the write they count, so concurrent writers never lose each
+other's increments and reading a counter costs nothing beyond loading the
+row. Models list the columns in ``counter_fields``; ``CounterFieldsMixin``
+leaves them out of ordinary saves so an instance loaded before an increment
+cannot write back a stale value.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Case, F, Value, When
+
+
+class CounterFieldsMixin:
+    """
+    Never write ``counter_fields`` when saving an existing row
+    """
+    counter_fields = ()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        values = [value for value in values if value[0].name not in self.counter_fields]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+
+def counter_deltas():
+    """Empty ``{pk: Counter(field=delta)}`` mapping for ``add_to_counters``"""
+    return defaultdict(Counter)
+
+
+def add_to_counters(model, deltas, using):
+    """
+    Add ``deltas`` (``{pk: {field: delta}}``) to the counters of ``model``.
+
+    All rows are changed with one UPDATE. Returns the number of rows changed.
+    """
+    deltas = {
+        pk: {name: delta for name, delta in changes.items() if delta}
+        for pk, changes in deltas.items() if pk is not None
+    }
+    deltas = {pk: changes for pk, changes in deltas.items() if changes}
+    if not deltas:
+        return 0
+    names = {name for changes in deltas.values() for name in changes}
+    values = {}
+    for name in names:
+        if len(deltas) == 1:
+            (changes,) = deltas.values()
+            values[name] = F(name) + changes.get(name, 0)
+            continue
+        values[name] = F(name) + Case(
+            *(When(pk=pk, then=Value(changes[name])) for pk, changes in deltas.items() if name in changes),
+            default=Value(0),
+            output_field=model._meta.get_field(name),
+        )
+    return model._default_manager.using(using).filter(pk__in=list(deltas)).update(**values)
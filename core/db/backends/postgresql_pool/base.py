@@ -0,0 +1,100 @@
+"""
+PostgreSQL backend that checks connections out of a process-wide pool.
+
+Configure it with ``ENGINE = 'core.db.backends.postgresql_pool'`` and an
+optional ``POOL`` dict in the database settings::
+
+    'POOL': {
+        'MIN_SIZE': 1,         # connections kept open when idle
+        'MAX_SIZE': 10,        # hard limit per process
+        'TIMEOUT': 5,          # seconds to wait for a free connection
+        'MAX_LIFETIME': 1800,  # recycle connections older than this
+        'MAX_IDLE': 600,       # close idle connections above MIN_SIZE
+        'CHECK_AFTER': 30,     # ping connections idle longer than this
+    }
+
+Leave ``CONN_MAX_AGE`` at 0: closing a connection at the end of a request
+returns it to the pool instead of disconnecting.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.db.backends.base.base import NO_DB_ALIAS
+
+from core.db.pool import ConnectionPool, get_pool
+from .creation import DatabaseCreation
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5.0,
+    'MAX_LIFETIME': 1800.0,
+    'MAX_IDLE': 600.0,
+    'CHECK_AFTER': 30.0,
+}
+
+
+def _check(conn, idle_seconds, check_after):
+    if conn.closed:
+        return False
+    if idle_seconds >= check_after:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return True
+
+
+def _reset(conn):
+    """Leave no transaction open on a connection going back to the pool"""
+    if conn.closed:
+        raise ValueError('connection is closed')
+    if conn.get_transaction_status() != base.Database.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool_enabled(self):
+        return self.alias != NO_DB_ALIAS
+
+    def get_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        key = tuple(sorted(
+            (name, repr(value)) for name, value in conn_params.items() if name != 'password'
+        ))
+
+        def factory():
+            pool = ConnectionPool(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                min_size=options['MIN_SIZE'],
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_lifetime=options['MAX_LIFETIME'],
+                max_idle=options['MAX_IDLE'],
+                check=lambda conn, idle: _check(conn, idle, options['CHECK_AFTER']),
+                reset=_reset,
+                name=f"{self.alias}:{self.settings_dict['NAME']}",
+            )
+            pool.warm()
+            return pool
+
+        return get_pool(self.alias, key, factory)
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_enabled:
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        # Mirror what the parent does on connect, since a pooled connection
+        # may have been opened by another thread's wrapper.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None
+            else IsolationLevel.READ_COMMITTED
+        )
+        return self.pool.getconn()
+
+    def _close(self):
+        if self.connection is None or not self.pool_enabled:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
@@ -0,0 +1,18 @@
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+
+from core.db.pool import close_pools
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    """
+    Close pooled connections before the test runner drops or clones a
+    database, which PostgreSQL refuses while sessions are still attached.
+    """
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools(self.connection.alias)
+        super()._clone_test_db(suffix, verbosity, keepdb)
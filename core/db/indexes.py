@@ -0,0 +1,24 @@
+"""
+Expression indexes for case-insensitive prefix search on PostgreSQL.
+
+Django compiles ``istartswith`` (admin ``search_fields`` entries starting
+with ``^``) to ``UPPER(column::text) LIKE UPPER('abc%')``. A btree index on
+that exact expression with ``text_pattern_ops`` serves such prefix matches
+in any collation. Other databases are left alone.
+"""
+
+
+def create_prefix_index(connection, table, column, name):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_index(connection, name):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,283 @@
+"""
+Thread-safe database connection pool.
+
+The pool is driver agnostic: it is given a ``connect`` callable, plus
+optional ``check`` and ``reset`` callables used when a connection is checked
+out or returned. Connections are recycled after ``max_lifetime`` seconds,
+idle connections above ``min_size`` are closed after ``max_idle`` seconds and
+a checkout that cannot be served within ``timeout`` raises ``PoolTimeout``.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from django.db import connections
+from django.db.utils import OperationalError
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, *, min_size=0, max_size=10, timeout=5.0,
+                 max_lifetime=1800.0, max_idle=600.0, check=None, reset=None, name=''):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.')
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+        }
+        self._checkout_ms_total = 0.0
+        self._checkout_ms_max = 0.0
+
+    def warm(self):
+        """Open connections until ``min_size`` are available"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic(), time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            conn, created, idle_since = self._acquire(deadline)
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created = time.monotonic()
+            elif not self._usable(conn, created, idle_since):
+                self._discard(conn)
+                continue
+            break
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        with self._cond:
+            self._in_use[id(conn)] = created
+            self._counters['checkouts'] += 1
+            self._checkout_ms_total += elapsed_ms
+            self._checkout_ms_max = max(self._checkout_ms_max, elapsed_ms)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        with self._cond:
+            created = self._in_use.pop(id(conn), None)
+        if created is None:
+            # Not ours (or the pool was reset while it was checked out).
+            self._close_quietly(conn)
+            return
+        now = time.monotonic()
+        if not discard and not self._closed and now - created < self.max_lifetime:
+            try:
+                if self._reset is not None:
+                    self._reset(conn)
+            except Exception:
+                logger.warning('Discarding connection that failed to reset', exc_info=True)
+            else:
+                with self._cond:
+                    if not self._closed:
+                        self._idle.append((conn, created, now))
+                        stale = self._trim_idle(now)
+                        self._cond.notify()
+                        conn = None
+                    else:
+                        stale = []
+                for item in stale:
+                    self._discard(item)
+                if conn is None:
+                    return
+        self._discard(conn)
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed on return"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _, _ in self._idle]
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._counters['checkouts']
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                **self._counters,
+                'checkout_ms_avg': round(self._checkout_ms_total / checkouts, 3) if checkouts else 0.0,
+                'checkout_ms_max': round(self._checkout_ms_max, 3),
+            }
+
+    def _acquire(self, deadline):
+        """Take an idle connection or reserve a slot for a new one"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise OperationalError(f'Connection pool {self.name!r} is closed.')
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection available in pool {self.name!r} '
+                            f'after {self.timeout}s ({self.max_size} in use).'
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _usable(self, conn, created, idle_since):
+        now = time.monotonic()
+        if now - created >= self.max_lifetime:
+            return False
+        if self._check is None:
+            return True
+        try:
+            return bool(self._check(conn, now - idle_since))
+        except Exception:
+            return False
+
+    def _trim_idle(self, now):
+        """Pop connections idle longer than max_idle, keeping min_size open"""
+        stale = []
+        while (self._idle and self._size - len(stale) > self.min_size
+               and now - self._idle[0][2] > self.max_idle):
+            stale.append(self._idle.popleft()[0])
+        return stale
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._counters['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size = max(self._size - 1, 0)
+            self._counters['connections_discarded'] += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, key, factory):
+    """Return the pool registered for ``(alias, key)``, creating it once"""
+    with _pools_lock:
+        pool = _pools.get((alias, key))
+        if pool is None:
+            pool = _pools[(alias, key)] = factory()
+        return pool
+
+
+def close_pools(alias=None):
+    """Close and forget the pools of ``alias`` (or every pool)"""
+    with _pools_lock:
+        keys = [key for key in _pools if alias is None or key[0] == alias]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+def release_connections():
+    """
+    Hand this thread's open connections back, e.g. before a long wait
+
+    With the pooled backend closing a connection returns it to the pool; the
+    next query checks one out again. Connections in a transaction are kept.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None and not connection.in_atomic_block:
+            connection.close()
+
+
+def pool_stats():
+    with _pools_lock:
+        items = list(_pools.items())
+    return [
+        {'alias': alias, 'name': pool.name, **pool.stats()}
+        for (alias, _), pool in items
+    ]
+
+
+class PoolTimeoutMiddleware:
+    """
+    Turn connection pool exhaustion into a clean 503 instead of a 500
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, PoolTimeout):
+            logger.warning('Database pool exhausted: %s', exception)
+            response = JsonResponse(
+                {'detail': 'The service is busy, please retry shortly.'},
+                status=503,
+            )
+            response['Retry-After'] = '1'
+            return response
+        return None
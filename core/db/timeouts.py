@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+
+@contextmanager
+def statement_timeout(using, milliseconds):
+    """
+    Run the block in a transaction whose statements are cancelled after
+    ``milliseconds`` on PostgreSQL, raising ``OperationalError``.
+
+    Inside an outer transaction the block gets a savepoint, and the previous
+    limit is put back when it ends so later statements are not affected.
+    Other databases run the block without a limit.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor != 'postgresql':
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            previous = cursor.fetchone()[0]
+            cursor.execute(f'SET LOCAL statement_timeout = {int(milliseconds)}')
+        yield
+        # SET LOCAL outlives a released savepoint; when the block fails the
+        # savepoint is rolled back, which also undoes the SET LOCAL.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [previous])
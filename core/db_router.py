@@ -0,0 +1,108 @@
+"""
+Primary/replica database routing.
+
+Reads go to a replica only while serving a safe-method request from a client
+that has not written recently. Writes, transactions, management commands and
+anything outside such a request use the primary.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_from_replicas = ContextVar('read_from_replicas', default=False)
+
+
+@contextmanager
+def read_from_replicas():
+    """Allow reads inside the block to be served by a replica"""
+    token = _read_from_replicas.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replicas.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Force every read inside the block onto the primary"""
+    token = _read_from_replicas.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replicas.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to a random replica from ``DATABASE_REPLICAS`` when allowed
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _read_from_replicas.get():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its own uncommitted writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def _client_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha1(authorization.encode('utf-8')).hexdigest()
+    return f'primary_pin:{digest}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests from replicas and pin writers to the primary.
+
+    After a successful write the client is pinned to the primary for
+    ``REPLICA_PIN_SECONDS`` with a cookie, and with a cache marker keyed on its
+    Authorization header for clients that do not keep cookies, so it reads its
+    own writes despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            with use_primary():
+                response = self.get_response(request)
+            if response.status_code < 400:
+                self.pin(request, response)
+            return response
+
+        if not settings.DATABASE_REPLICAS or self.is_pinned(request):
+            return self.get_response(request)
+        with read_from_replicas():
+            return self.get_response(request)
+
+    def is_pinned(self, request):
+        if request.COOKIES.get(settings.REPLICA_PIN_COOKIE):
+            return True
+        key = _client_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def pin(self, request, response):
+        seconds = settings.REPLICA_PIN_SECONDS
+        response.set_cookie(settings.REPLICA_PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        key = _client_key(request)
+        if key is not None:
+            cache.set(key, 1, seconds)
@@ -0,0 +1,218 @@
+"""
+Fast read path for list serializers.
+
+``compile_serializer`` turns a read-only ``ModelSerializer`` into a list of
+per-field accessors that work on ``.values()`` rows instead of model
+instances, skipping DRF's per-field ``get_attribute``/``to_representation``
+machinery. The output matches what the serializer would produce, value for
+value. Model properties are evaluated against a namespace built from the
+columns listed in the serializer's ``Meta.read_dependencies``; fields in
+``Meta.annotations`` are read from the annotation of the same name.
+"""
+import decimal
+from functools import lru_cache
+from operator import itemgetter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .fieldsets import SparseFieldsetMixin, optional_fields, requested_fields, resolve_source
+
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    PrimaryKeyRelatedField,
+)
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+def _datetime_converter(field, current_timezone):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else current_timezone
+
+    def convert(value):
+        if field_timezone is None or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _choice_converter(field):
+    if all(str(key) == key for key in field.choices):
+        return None
+    return field.to_representation
+
+
+def _converter(field, current_timezone):
+    """Return a callable formatting a non-None value, or None for identity"""
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field, current_timezone)
+    if isinstance(field, serializers.DateField):
+        return field.to_representation
+    if isinstance(field, serializers.ChoiceField):
+        return _choice_converter(field)
+    if isinstance(field, IDENTITY_FIELDS):
+        return None
+    raise ImproperlyConfigured(
+        f'{type(field).__name__} {field.field_name!r} is not supported by the fast read path.'
+    )
+
+
+class FastPath:
+    """
+    Precompiled accessors for one serializer class.
+
+    Accessors that format datetimes depend on the active timezone, so one
+    set is compiled per timezone the first time it is seen.
+    """
+
+    def __init__(self, serializer_class):
+        meta = serializer_class.Meta
+        self.dependencies = getattr(meta, 'read_dependencies', {})
+        self.annotations = getattr(meta, 'annotations', {})
+        self.fields = {
+            name: field for name, field in serializer_class().fields.items() if not field.write_only
+        }
+        self.model = meta.model
+        self.field_paths = {name: [] for name in self.fields}
+        self._accessors = {}
+        # Compile once up front so configuration errors surface immediately.
+        self.accessors(None)
+        self.values_fields = self.values_for(None)
+
+    def accessors(self, current_timezone):
+        accessors = self._accessors.get(current_timezone)
+        if accessors is None:
+            accessors = self._accessors[current_timezone] = [
+                (name, self._accessor(name, field, current_timezone))
+                for name, field in self.fields.items()
+            ]
+        return accessors
+
+    def values_for(self, names):
+        """Columns to pass to ``.values()`` for ``names`` (None for all fields)"""
+        paths = []
+        for name in self.fields if names is None else names:
+            paths.extend(path for path in self.field_paths[name] if path not in paths)
+        return paths
+
+    def _accessor(self, name, field, current_timezone):
+        convert = _converter(field, current_timezone)
+        if name in self.annotations:
+            self._require(name, name)
+            getter = itemgetter(name)
+        elif not field.source_attrs:
+            raise ImproperlyConfigured(f'Field {name!r} with source="*" is not supported by the fast read path.')
+        else:
+            getter = self._field_accessor(name, field)
+        if convert is None:
+            return getter
+
+        def accessor(row):
+            value = getter(row)
+            return None if value is None else convert(value)
+        return accessor
+
+    def _field_accessor(self, name, field):
+        model, relation_path, attr = resolve_source(self.model, field.source_attrs)
+        prefix = ''.join(f'{part}__' for part in relation_path)
+        try:
+            model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return self._property_accessor(name, model, attr, prefix)
+        path = prefix + attr
+        self._require(name, path)
+        return itemgetter(path)
+
+    def _require(self, name, path):
+        if path not in self.field_paths[name]:
+            self.field_paths[name].append(path)
+
+    def _property_accessor(self, name, model, attr, prefix):
+        prop = getattr(model, attr, None)
+        if not isinstance(prop, property):
+            raise ImproperlyConfigured(f'{model.__name__}.{attr} is neither a field nor a property.')
+        if name not in self.dependencies:
+            raise ImproperlyConfigured(
+                f'Add {name!r} to Meta.read_dependencies to use it in the fast read path.'
+            )
+        columns = []
+        for path in self.dependencies[name]:
+            if not path.startswith(prefix):
+                raise ImproperlyConfigured(f'Dependency {path!r} of {name!r} must start with {prefix!r}.')
+            self._require(name, path)
+            columns.append((path[len(prefix):], path))
+        null_check = prefix[:-2] or None
+        if null_check:
+            self._require(name, null_check)
+        fget = prop.fget
+
+        def accessor(row):
+            if null_check and row[null_check] is None:
+                return None
+            return fget(SimpleNamespace(**{column: row[path] for column, path in columns}))
+        return accessor
+
+    def serialize(self, rows, names=None):
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        accessors = self.accessors(current_timezone)
+        if names is not None:
+            accessors = [(name, accessor) for name, accessor in accessors if name in names]
+        return [{name: accessor(row) for name, accessor in accessors} for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    return FastPath(serializer_class)
+
+
+class FastListMixin:
+    """
+    Serve list responses through the compiled fast path when enabled
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.get_serializer_class()
+        fast_path = compile_serializer(serializer_class)
+        names = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            names = requested_fields(request, list(fast_path.fields), optional_fields(serializer_class))
+        queryset = self.filter_queryset(self.get_queryset()).values(*fast_path.values_for(names))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast_path.serialize(page, names))
+        return Response(fast_path.serialize(queryset, names))
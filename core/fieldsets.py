@@ -0,0 +1,180 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=a,b`` keeps only the listed fields and ``?omit=c`` drops fields
+from GET responses. Serializers opt in with ``SparseFieldsetMixin``; views
+using ``SparseFieldsetViewMixin`` also narrow their querysets with
+``only()``/``select_related()`` to the columns the remaining fields read.
+Fields backed by properties or methods declare those columns in
+``Meta.read_dependencies``.
+
+Fields listed in ``Meta.optional_fields`` are only returned when named in
+``?fields=``. Fields in ``Meta.annotations`` (name -> function returning a
+query expression) are read from an annotation the view adds only when the
+field is selected.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.constants import LOOKUP_SEP
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+
+READ_METHODS = ('GET', 'HEAD')
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields', description='Comma-separated fields to return, e.g. "id,status,start_date"',
+        required=False, type=str,
+    ),
+    OpenApiParameter(name='omit', description='Comma-separated fields to leave out', required=False, type=str),
+]
+
+
+def resolve_source(model, source_attrs):
+    """
+    Walk ``source_attrs`` through model relations.
+
+    Returns ``(model, relation_path, attr)`` for the model owning the final
+    attribute.
+    """
+    path = []
+    for attr in source_attrs[:-1]:
+        try:
+            relation = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            relation = None
+        if relation is None or relation.related_model is None:
+            raise ImproperlyConfigured(f'Cannot follow {attr!r} on {model.__name__}.')
+        model = relation.related_model
+        path.append(attr)
+    return model, path, source_attrs[-1]
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def optional_fields(serializer_class):
+    return tuple(getattr(serializer_class.Meta, 'optional_fields', ()))
+
+
+def requested_fields(request, available, optional=()):
+    """
+    Return the names from ``available`` to keep, in order, or None for all.
+
+    ``optional`` names are kept only when listed in ``fields``; serializers
+    used without a request keep every field. Unknown names in ``fields`` or
+    ``omit`` are rejected with a 400.
+    """
+    if request is None:
+        return None
+    default = [name for name in available if name not in optional] if optional else None
+    if request.method not in READ_METHODS:
+        return default
+    params = request.query_params
+    if 'fields' not in params and 'omit' not in params:
+        return default
+    fields = _split(params.get('fields', ''))
+    omit = _split(params.get('omit', ''))
+    unknown = [name for name in fields + omit if name not in available]
+    if unknown:
+        raise ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}."]})
+    return [
+        name for name in available
+        if (name in fields if fields else name not in optional) and name not in omit
+    ]
+
+
+class SparseFieldsetMixin:
+    """
+    Drop fields not selected by ``?fields=`` / ``?omit=`` before serializing
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = requested_fields(self.context.get('request'), list(self.fields), optional_fields(type(self)))
+        if keep is not None:
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
+@lru_cache(maxsize=None)
+def serializer_field_names(serializer_class):
+    return tuple(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+@lru_cache(maxsize=None)
+def field_dependencies(serializer_class, names):
+    """
+    Return the ORM paths the fields ``names`` read, or None if unknown.
+
+    Model fields are resolved from their ``source``; anything else has to be
+    listed in ``Meta.read_dependencies``. Annotated fields read no columns.
+    """
+    meta = serializer_class.Meta
+    declared = getattr(meta, 'read_dependencies', {})
+    annotations = getattr(meta, 'annotations', {})
+    fields = serializer_class().fields
+    paths = []
+    for name in names:
+        if name in annotations:
+            continue
+        if name in declared:
+            paths.extend(declared[name])
+            continue
+        source_attrs = fields[name].source_attrs
+        if not source_attrs:
+            return None
+        model, relation_path, attr = resolve_source(meta.model, source_attrs)
+        try:
+            model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        paths.append(LOOKUP_SEP.join(relation_path + [attr]))
+    return tuple(dict.fromkeys(paths))
+
+
+def narrow_queryset(queryset, paths):
+    """Load only ``paths``, joining the relations they traverse"""
+    related = []
+    for path in paths:
+        parts = path.split(LOOKUP_SEP)
+        for end in range(1, len(parts)):
+            relation = LOOKUP_SEP.join(parts[:end])
+            if relation not in related:
+                related.append(relation)
+    queryset = queryset.only(*related, *paths)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
+
+
+def annotate_fields(queryset, serializer_class, names):
+    """Add the annotations backing the selected ``names``"""
+    annotations = getattr(serializer_class.Meta, 'annotations', {})
+    selected = {name: annotations[name]() for name in names if name in annotations}
+    return queryset.annotate(**selected) if selected else queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    Narrow read querysets to the columns the selected fields need
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if (self.request.method not in READ_METHODS
+                or not issubclass(serializer_class, SparseFieldsetMixin)
+                or queryset.model is not serializer_class.Meta.model):
+            return queryset
+        available = serializer_field_names(serializer_class)
+        names = requested_fields(self.request, available, optional_fields(serializer_class))
+        if names is None:
+            names = available
+        paths = field_dependencies(serializer_class, tuple(names))
+        if paths is not None:
+            queryset = narrow_queryset(queryset, paths)
+        return annotate_fields(queryset, serializer_class, names)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema, stale_artifacts, write_artifacts
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifacts served at /api/schema/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Exit with an error if the artifacts are missing or out of date instead of writing them',
+        )
+
+    def handle(self, *args, **options):
+        rendered = generate_schema()
+        if options['check']:
+            stale = stale_artifacts(rendered)
+            if stale:
+                raise CommandError(
+                    f"Schema artifacts are out of date: {', '.join(str(path) for path in stale)}. "
+                    f"Run 'python manage.py build_schema'."
+                )
+            self.stdout.write('Schema artifacts are up to date.')
+            return
+        for path in write_artifacts(rendered):
+            self.stdout.write(f'Wrote {path}')
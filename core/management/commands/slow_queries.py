@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import get_stats, reset_stats
+
+SORT_KEYS = {
+    'total': lambda e: e['total_ms'],
+    'count': lambda e: e['count'],
+    'max': lambda e: e['max_ms'],
+    'avg': lambda e: e['total_ms'] / e['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Show the aggregated slow query table, grouped by SQL fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Number of fingerprints to show')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total', help='Sort column')
+        parser.add_argument('--reset', action='store_true', help='Clear the table after printing it')
+
+    def handle(self, *args, **options):
+        entries = sorted(get_stats(), key=SORT_KEYS[options['sort']], reverse=True)[:options['limit']]
+
+        if not entries:
+            self.stdout.write('No slow queries recorded.')
+        for rank, entry in enumerate(entries, start=1):
+            top_view = max(entry['views'].items(), key=lambda item: item[1])[0]
+            self.stdout.write(
+                f"{rank:>3}. [{entry['fingerprint']}] count={entry['count']} "
+                f"total={entry['total_ms']:.1f}ms avg={entry['total_ms'] / entry['count']:.1f}ms "
+                f"max={entry['max_ms']:.1f}ms view={top_view}"
+            )
+            self.stdout.write(f"     {entry['sql'][:300]}")
+            for frame in entry['origin']:
+                self.stdout.write(f"       at {frame}")
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Slow query table cleared.'))
@@ -0,0 +1,27 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """
+    Marker left behind by a deleted row so delta sync can report the deletion.
+
+    ``resource`` names the sync feed (e.g. ``'bookings'``) and ``user_id``
+    the user whose feed listed the row. Tombstones are kept for
+    ``SYNC_TOMBSTONE_RETENTION_DAYS``; see ``core.sync``.
+    """
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    # No foreign key: tombstones have to outlive the rows they point at
+    user_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'tombstones'
+        indexes = [
+            models.Index(fields=['resource', 'user_id', 'deleted_at', 'id'], name='tombstones_feed_idx'),
+            models.Index(fields=['deleted_at'], name='tombstones_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.resource} {self.object_id}"
@@ -0,0 +1,64 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+The output is byte-for-byte what ``rest_framework.renderers.JSONRenderer``
+produces with the default settings: compact separators, raw UTF-8 and
+escaped U+2028/U+2029. Dates, times, Decimals and other types orjson would
+format differently are handed to DRF's own encoder, and anything orjson
+cannot encode (or indented output) falls back to the stock renderer. Bare
+floats are the one exception: orjson writes ``1e16`` where Python writes
+``1e+16``, and NaN as ``null``; this API only emits Decimals as strings.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_NON_STR_KEYS
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.get_indent(accepted_media_type, renderer_context)
+                or self.ensure_ascii or not self.compact or not self.strict):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Match DRF, which escapes these for JavaScript compatibility.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Lets views that return iCalendar feeds accept ``Accept: text/calendar``.
+
+    Feeds are returned as ready-made responses; only error payloads pass
+    through here and are rendered as plain text.
+    """
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
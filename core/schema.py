@@ -0,0 +1,74 @@
+"""
+Prebuilt OpenAPI schema.
+
+``build_schema`` renders the schema once, at build time, into
+``SCHEMA_ARTIFACT_DIR`` as ``openapi-<API version>.yaml`` and ``.json``.
+``/api/schema/`` serves those files with an ETag and long-lived cache
+headers instead of introspecting every view on each request.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+FORMATS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+_loaded = {}
+
+
+def artifact_path(fmt):
+    return Path(settings.SCHEMA_ARTIFACT_DIR) / f'openapi-{spectacular_settings.VERSION}.{fmt}'
+
+
+def generate_schema():
+    """Render the schema in every format, as the live schema view would"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {fmt: renderer().render(schema, renderer_context={}) for fmt, renderer in FORMATS.items()}
+
+
+def write_artifacts(rendered):
+    """Write rendered schemas atomically; return the paths written"""
+    paths = []
+    for fmt, content in rendered.items():
+        path = artifact_path(fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.tmp')
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def stale_artifacts(rendered):
+    """Return the artifact paths that are missing or differ from ``rendered``"""
+    stale = []
+    for fmt, content in rendered.items():
+        path = artifact_path(fmt)
+        if not path.exists() or path.read_bytes() != content:
+            stale.append(path)
+    return stale
+
+
+def load_artifact(fmt):
+    """
+    Return ``(content, etag)`` for a built artifact, or None if missing.
+
+    Contents are kept in memory and re-read only when the file changes.
+    """
+    path = artifact_path(fmt)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        content = path.read_bytes()
+        cached = _loaded[path] = (mtime, content, hashlib.sha256(content).hexdigest()[:32])
+    return cached[1], cached[2]
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BulkUpdateSerializer(serializers.Serializer):
+    """
+    Base for set-based update requests: the ids of the rows to change
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, value):
+        ids = list(dict.fromkeys(value))
+        if len(ids) > settings.BULK_UPDATE_MAX_IDS:
+            raise serializers.ValidationError(f'At most {settings.BULK_UPDATE_MAX_IDS} ids can be updated at once.')
+        return ids
+
+
+class BulkUpdateResultSerializer(serializers.Serializer):
+    updated = serializers.IntegerField(help_text='Number of rows changed')
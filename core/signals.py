@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent after a set-based ``queryset.update()`` in place of a post_save per
+# row, so receivers can apply their side effects to the whole set at once.
+# Arguments: ``sender`` (the model), ``ids``, ``fields`` (names of the
+# updated fields) and ``using``. Sent inside the updating transaction.
+bulk_updated = Signal()
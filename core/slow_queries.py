@@ -0,0 +1,227 @@
+"""
+Slow query log for the ORM.
+
+Every statement is timed through ``connection.execute_wrapper``. Statements
+slower than ``SLOW_QUERY_THRESHOLD_MS`` are handed to a background thread
+which fingerprints them, logs them and folds them into an aggregated top-N
+table kept in the cache, so the request path never blocks on logging.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = 'slow_queries:stats'
+
+current_view = ContextVar('slow_query_view', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Strip literals and placeholders so equivalent statements compare equal"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(...)', sql)
+    sql = _VALUES_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Return ``(fingerprint, normalized_sql)`` for a statement"""
+    normalized = normalize_sql(sql)
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+    return digest, normalized
+
+
+def _app_prefixes():
+    return tuple(
+        os.path.join(str(settings.BASE_DIR), app) + os.sep
+        for app in settings.SLOW_QUERY_APP_DIRS
+    )
+
+
+def _capture_origin(depth):
+    """Collect the innermost application frames of the current stack"""
+    prefixes = _app_prefixes()
+    base_len = len(str(settings.BASE_DIR)) + 1
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(prefixes):
+            frames.append(f"{filename[base_len:]}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return frames
+
+
+class SlowQueryLog:
+    """
+    Execute wrapper that records slow statements.
+
+    Records are pushed onto a bounded queue without blocking; when the queue
+    is full the record is dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, max_queue_size=1000):
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._pending = {}
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.dropped = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.submit({
+                    'sql': sql,
+                    'duration_ms': duration_ms,
+                    'alias': context['connection'].alias,
+                    'view': current_view.get(),
+                    'origin': _capture_origin(settings.SLOW_QUERY_STACK_DEPTH),
+                    'at': timezone.now().isoformat(),
+                })
+
+    def submit(self, record):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record has been logged and aggregated"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='slow-query-log', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self._process(record)
+                if self._queue.empty():
+                    self._merge_pending()
+            except Exception:
+                logger.exception('Failed to record slow query')
+            finally:
+                self._queue.task_done()
+
+    def _process(self, record):
+        digest, normalized = fingerprint(record['sql'])
+        logger.warning(
+            'Slow query %.1f ms [%s] view=%s origin=%s sql=%s',
+            record['duration_ms'], digest, record['view'],
+            ' <- '.join(record['origin']) or '-', normalized,
+        )
+        entry = self._pending.setdefault(digest, {
+            'fingerprint': digest,
+            'sql': normalized,
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': {},
+            'origin': [],
+            'last_seen': None,
+        })
+        entry['count'] += 1
+        entry['total_ms'] += record['duration_ms']
+        entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+        view = record['view'] or '-'
+        entry['views'][view] = entry['views'].get(view, 0) + 1
+        if record['origin']:
+            entry['origin'] = record['origin']
+        entry['last_seen'] = record['at']
+
+    def _merge_pending(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        stats = cache.get(STATS_CACHE_KEY) or {}
+        for digest, delta in pending.items():
+            entry = stats.get(digest)
+            if entry is None:
+                stats[digest] = delta
+                continue
+            entry['count'] += delta['count']
+            entry['total_ms'] += delta['total_ms']
+            entry['max_ms'] = max(entry['max_ms'], delta['max_ms'])
+            for view, count in delta['views'].items():
+                entry['views'][view] = entry['views'].get(view, 0) + count
+            entry['origin'] = delta['origin'] or entry['origin']
+            entry['last_seen'] = delta['last_seen']
+        top = sorted(stats.values(), key=lambda e: e['total_ms'], reverse=True)
+        stats = {e['fingerprint']: e for e in top[:settings.SLOW_QUERY_TOP_N]}
+        cache.set(STATS_CACHE_KEY, stats, timeout=None)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def get_stats():
+    """Return aggregated slow query entries, slowest total time first"""
+    stats = cache.get(STATS_CACHE_KEY) or {}
+    return sorted(stats.values(), key=lambda e: e['total_ms'], reverse=True)
+
+
+def reset_stats():
+    cache.delete(STATS_CACHE_KEY)
+
+
+class SlowQueryLogMiddleware:
+    """
+    Install the slow query wrapper on every connection for the duration of a
+    request and remember which view is being served.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(None)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(slow_query_log))
+                return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match else view_func.__name__)
@@ -0,0 +1,660 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from io import StringIO
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from bookings.models import Booking, BookingListEntry
+from vehicles.models import Vehicle
+from rest_framework.test import APIClient
+from bookings.serializers import BookingListSerializer, BookingSerializer
+from vehicles.serializers import VehicleListSerializer
+from rest_framework.renderers import JSONRenderer
+from .admin import EstimatedCountPaginator
+from .checks import check_schema_artifacts
+from .db.pool import ConnectionPool, PoolTimeout, PoolTimeoutMiddleware
+from .db_router import PrimaryReplicaRouter, read_from_replicas
+from .fastpath import compile_serializer
+from .fieldsets import annotate_fields
+from .renderers import FastJSONRenderer
+from .slow_queries import fingerprint, normalize_sql, slow_query_log, get_stats
+from .throttling import TokenBucket, local_leases
+
+User = get_user_model()
+
+
+class FingerprintTest(SimpleTestCase):
+    """Test cases for SQL fingerprinting"""
+
+    def test_literals_are_normalized(self):
+        """Test that literals and placeholders collapse to the same fingerprint"""
+        first = fingerprint("SELECT * FROM bookings WHERE id = 1 AND status = 'active'")
+        second = fingerprint("SELECT *  FROM bookings\nWHERE id = %s AND status = %s")
+        self.assertEqual(first, second)
+
+    def test_in_lists_are_collapsed(self):
+        """Test that IN lists of any length share a fingerprint"""
+        self.assertEqual(
+            normalize_sql('SELECT * FROM vehicles WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM vehicles WHERE id IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM vehicles WHERE id IN (1, 2)'),
+            fingerprint('SELECT * FROM vehicles WHERE id IN (7, 8, 9, 10)'),
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        """Test that digits inside identifiers are not treated as literals"""
+        self.assertIn('bookings_p2026_01', normalize_sql('SELECT 1 FROM bookings_p2026_01'))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryLogTest(APITestCase):
+    """Test cases for the slow query log"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_slow_queries_are_attributed_to_view_and_origin(self):
+        """Test that recorded queries carry the view name and app frames"""
+        start_date = timezone.now() + timedelta(days=1)
+        Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=2),
+            total_amount=100.00,
+            status='confirmed'
+        )
+        with self.assertLogs('core.slow_queries', level='WARNING') as logs:
+            self.client.post(reverse('bookings:booking-list-create'), {
+                'vehicle': self.vehicle.id,
+                'start_date': start_date.isoformat(),
+                'end_date': (start_date + timedelta(days=1)).isoformat(),
+            })
+            slow_query_log.flush()
+        self.assertIn('view=bookings:booking-list-create', logs.output[-1])
+
+        entries = get_stats()
+        self.assertTrue(entries)
+        overlap = [e for e in entries if any('bookings/serializers.py' in f for f in e['origin'])]
+        self.assertTrue(overlap)
+        self.assertIn('bookings:booking-list-create', overlap[0]['views'])
+
+    def test_repeated_queries_are_aggregated(self):
+        """Test that the same statement shape is counted under one fingerprint"""
+        url = reverse('vehicles:vehicle-detail', args=[self.vehicle.id])
+        with self.assertLogs('core.slow_queries', level='WARNING'):
+            self.client.get(url)
+            self.client.get(url)
+            slow_query_log.flush()
+
+        detail = [e for e in get_stats() if 'vehicles:vehicle-detail' in e['views']]
+        self.assertTrue(detail)
+        self.assertGreaterEqual(max(e['count'] for e in detail), 2)
+
+    def test_management_command_prints_table(self):
+        """Test the slow_queries management command"""
+        with self.assertLogs('core.slow_queries', level='WARNING'):
+            self.client.get(reverse('vehicles:vehicle-list-create'))
+            slow_query_log.flush()
+
+        out = StringIO()
+        call_command('slow_queries', '--limit', '5', '--reset', stdout=out)
+        self.assertIn('count=', out.getvalue())
+        self.assertEqual(get_stats(), [])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadReplicaRoutingTest(TransactionTestCase):
+    """Test cases for primary/replica routing against two SQLite databases"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered after the test case set up its database guards, so the
+        # test runner never tries to create or check it.
+        super().setUpClass()
+        cls.replica_dir = tempfile.mkdtemp()
+        configured = connections.configure_settings({
+            'default': dict(connections.settings['default']),
+            'replica': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+            },
+        })
+        connections.settings['replica'] = configured['replica']
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        # The replica lags behind: it only knows about the user.
+        User.objects.using('replica').all().delete()
+        User.objects.using('replica').create(id=self.user.id, username='testuser')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.vehicle_list_url = reverse('vehicles:vehicle-list-create')
+
+    def test_safe_requests_read_from_replica(self):
+        """Test that GET requests are served from the replica"""
+        response = self.client.get(self.vehicle_list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_writers_are_pinned_to_primary(self):
+        """Test read-your-writes after a successful write"""
+        response = self.client.post(self.vehicle_list_url, {
+            'make': 'Honda',
+            'model': 'Civic',
+            'year': 2021,
+            'plate_number': 'XYZ789',
+            'daily_rate': 45.00
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('primary_pin', response.cookies)
+
+        response = self.client.get(self.vehicle_list_url)
+        self.assertEqual(response.data['count'], 2)
+
+        self.client.cookies.clear()
+        response = self.client.get(self.vehicle_list_url)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_pin_follows_authorization_header(self):
+        """Test that clients without cookies are pinned through the cache"""
+        client = APIClient(HTTP_AUTHORIZATION='Bearer token-a')
+        client.force_authenticate(user=self.user)
+        client.post(self.vehicle_list_url, {
+            'make': 'Honda',
+            'model': 'Civic',
+            'year': 2021,
+            'plate_number': 'XYZ789',
+            'daily_rate': 45.00
+        })
+        client.cookies.clear()
+        response = client.get(self.vehicle_list_url)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_overlap_check_uses_primary(self):
+        """Test that booking overlap checks never read from a replica"""
+        start_date = timezone.now() + timedelta(days=1)
+        end_date = start_date + timedelta(days=2)
+        Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=start_date,
+            end_date=end_date,
+            total_amount=100.00,
+            status='confirmed'
+        )
+        serializer = BookingSerializer()
+        with read_from_replicas(), CaptureQueriesContext(connections['default']) as primary:
+            with self.assertRaisesMessage(Exception, 'not available for the selected dates'):
+                serializer.validate({'vehicle': self.vehicle, 'start_date': start_date, 'end_date': end_date})
+        self.assertEqual(len(primary), 1)
+
+    def test_booking_alternatives_read_from_replica(self):
+        """Test that suggestions for a conflicting booking POST are read from the replica"""
+        start_date = timezone.now() + timedelta(days=1)
+        Booking.objects.create(
+            customer=self.user, vehicle=self.vehicle, start_date=start_date,
+            end_date=start_date + timedelta(days=2), total_amount=100.00, status='confirmed',
+        )
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.post(reverse('bookings:booking-list-create'), {
+                'vehicle': self.vehicle.id,
+                'start_date': start_date.isoformat(),
+                'end_date': (start_date + timedelta(days=1)).isoformat(),
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['alternatives'], [])
+        self.assertTrue([q for q in replica if 'FROM "vehicles"' in q['sql']])
+
+    def test_router_uses_primary_inside_transactions(self):
+        """Test that reads inside an atomic block stay on the primary"""
+        router = PrimaryReplicaRouter()
+        with read_from_replicas():
+            self.assertEqual(router.db_for_read(Vehicle), 'replica')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Vehicle), 'default')
+        self.assertEqual(router.db_for_read(Vehicle), 'default')
+        self.assertEqual(router.db_for_write(Vehicle), 'default')
+
+
+class FakeConnection:
+    """Stand-in for a DB-API connection"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Test cases for the connection pool"""
+
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        options = {'max_size': 2, 'timeout': 0.05, 'check': lambda conn, idle: not conn.closed}
+        options.update(kwargs)
+        return ConnectionPool(connect, **options)
+
+    def test_connections_are_reused(self):
+        """Test that returned connections are handed out again"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_warm_opens_min_size(self):
+        """Test that warming the pool opens min_size connections"""
+        pool = self.make_pool(min_size=2)
+        pool.warm()
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_checkout_times_out_when_exhausted(self):
+        """Test that a checkout beyond max_size waits and then fails"""
+        pool = self.make_pool()
+        pool.getconn()
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """Test that a waiting checkout is served when a connection is returned"""
+        pool = self.make_pool(max_size=1, timeout=2)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=[conn]).start()
+        self.assertIs(pool.getconn(), conn)
+
+    def test_unhealthy_connections_are_replaced(self):
+        """Test that a connection failing its health check is discarded"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = True
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.stats()['connections_discarded'], 1)
+
+    def test_connections_are_recycled_after_max_lifetime(self):
+        """Test max-lifetime recycling"""
+        pool = self.make_pool(max_lifetime=0.01)
+        conn = pool.getconn()
+        time.sleep(0.02)
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.getconn(), conn)
+
+    def test_stats(self):
+        """Test pool statistics"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['checkouts'], 1)
+        pool.putconn(conn)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_pool_timeout_becomes_503(self):
+        """Test that pool exhaustion is reported as 503 Service Unavailable"""
+        middleware = PoolTimeoutMiddleware(lambda request: None)
+        request = RequestFactory().get('/api/vehicles/')
+        response = middleware.process_exception(request, PoolTimeout('exhausted'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIsNone(middleware.process_exception(request, ValueError()))
+
+
+class DatabasePoolStatsAPITest(APITestCase):
+    """Test cases for the pool statistics endpoint"""
+
+    def test_requires_staff(self):
+        """Test that only staff can read pool statistics"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('core:db-pool-stats'))
+        self.assertEqual(response.status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('core:db-pool-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pools', response.data)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """Test cases for the orjson-backed renderer"""
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_drf_renderer(self):
+        """Test that output is byte-for-byte identical to DRF's JSONRenderer"""
+        self.assertSameOutput({
+            'count': 2,
+            'results': [
+                {'id': 1, 'name': 'Lahore – Gulberg 🚗', 'rate': '50.00', 'notes': None},
+                {'id': 2, 'name': 'line\u2028break here ', 'active': True, 'tags': ('a', 'b')},
+            ],
+        })
+
+    def test_delegates_special_types_to_drf_encoder(self):
+        """Test that dates, Decimals and UUIDs are encoded as DRF would"""
+        self.assertSameOutput({
+            'when': datetime(2025, 7, 19, 7, 15, 30, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2025, 7, 19),
+            'amount': Decimal('12.50'),
+            'ref': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            1: 'integer key',
+        })
+
+    def test_falls_back_for_unsupported_values(self):
+        """Test that values orjson cannot encode go through the stock renderer"""
+        self.assertSameOutput({'big': 2 ** 70})
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastPathTest(APITestCase):
+    """Test cases for compiled fast-path serializers"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='fastuser', email='fast@example.com', password='x')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user, make='Suzuki', model='Mehran', year=2018,
+            plate_number='LEA-1234', daily_rate=Decimal('35.5'), color=None,
+        )
+        start = timezone.now() + timedelta(days=1, microseconds=123456)
+        Booking.objects.create(
+            customer=self.user, vehicle=self.vehicle, start_date=start,
+            end_date=start + timedelta(days=3, hours=5), total_amount=Decimal('106.5'),
+        )
+
+    def assertMatchesSerializer(self, serializer_class, queryset):
+        fast_path = compile_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(fast_path.serialize(queryset.values(*fast_path.values_fields)))
+        self.assertEqual(actual, expected)
+
+    def test_matches_serializer_output(self):
+        """Test that fast-path rows match the DRF serializer output"""
+        self.assertMatchesSerializer(BookingListSerializer, BookingListEntry.objects.all())
+        self.assertMatchesSerializer(
+            VehicleListSerializer, annotate_fields(Vehicle.objects.all(), VehicleListSerializer, ['next_available_at']),
+        )
+
+    def test_matches_serializer_output_in_other_timezone(self):
+        """Test that datetimes follow the active timezone like DRF does"""
+        with timezone.override('Asia/Karachi'):
+            self.assertMatchesSerializer(BookingListSerializer, BookingListEntry.objects.all())
+
+    def test_fields_are_read_in_one_query(self):
+        """Test that related fields and properties come from a single values() query"""
+        fast_path = compile_serializer(BookingListSerializer)
+        with self.assertNumQueries(1):
+            fast_path.serialize(BookingListEntry.objects.values(*fast_path.values_fields))
+
+    def test_unsupported_serializer_is_rejected(self):
+        """Test that serializers with method fields cannot be compiled"""
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(BookingSerializer)
+
+
+class SchemaArtifactTest(APITestCase):
+    """Test cases for the prebuilt OpenAPI schema"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.artifact_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(SCHEMA_ARTIFACT_DIR=cls.artifact_dir)
+        cls.settings_override.enable()
+        call_command('build_schema', stdout=StringIO(), stderr=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.artifact_dir)
+        super().tearDownClass()
+
+    def test_schema_served_from_artifact(self):
+        """Test that the schema endpoint serves the built files with cache headers"""
+        response = self.client.get(reverse('schema'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi; charset=utf-8')
+        self.assertTrue(response.content.startswith(b'openapi: 3.0.3'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(reverse('schema'), {'format': 'json'})
+        self.assertEqual(response.json()['info']['title'], 'Lahore Car Rental API')
+        self.assertIn('/api/bookings/', response.json()['paths'])
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_check_detects_stale_artifact(self):
+        """Test that --check and the deploy check fail once the artifact changes"""
+        call_command('build_schema', check=True, stdout=StringIO(), stderr=StringIO())
+        path = os.path.join(self.artifact_dir, 'openapi-1.0.0.json')
+        with open(path, 'rb') as handle:
+            original = handle.read()
+        self.addCleanup(lambda: open(path, 'wb').write(original))
+        with open(path, 'wb') as handle:
+            handle.write(b'{}')
+
+        with self.assertRaises(CommandError):
+            call_command('build_schema', check=True, stdout=StringIO(), stderr=StringIO())
+        errors = check_schema_artifacts(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    def test_missing_artifact(self):
+        """Test that without an artifact the schema is unavailable outside DEBUG"""
+        with override_settings(SCHEMA_ARTIFACT_DIR=os.path.join(self.artifact_dir, 'missing')):
+            response = self.client.get(reverse('schema'))
+        self.assertEqual(response.status_code, 503)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class TokenBucketThrottleTest(APITestCase):
+    """Test cases for the cache-backed token-bucket throttles"""
+
+    def setUp(self):
+        cache.clear()
+        local_leases.clear()
+        self.addCleanup(local_leases.clear)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='throttled', email='t@example.com', password='pass12345')
+        self.other = User.objects.create_user(username='other', email='o@example.com', password='pass12345')
+
+    def test_bucket_refuses_when_empty_and_refills(self):
+        """Test that a bucket refuses once drained, does not charge refusals and refills over time"""
+        bucket = TokenBucket(cache, 'throttle:test', capacity=2, period=1)
+        self.assertTrue(bucket.take()[0])
+        self.assertTrue(bucket.take()[0])
+        allowed, tat, now = bucket.take()
+        self.assertFalse(allowed)
+        self.assertEqual(cache.get('throttle:test'), tat)
+
+        time.sleep(0.6)
+        self.assertTrue(bucket.take()[0])
+        self.assertFalse(bucket.take()[0])
+
+    def test_concurrent_takes_are_not_lost(self):
+        """Test that giving tokens back and re-basing a full bucket keep other workers' increments"""
+        class InterleavedCache:
+            """Lets another worker take a token right after our first incr"""
+            def __init__(self, cache, cost):
+                self.cache, self.cost, self.interleaved = cache, cost, False
+
+            def incr(self, key, delta=1):
+                value = self.cache.incr(key, delta)
+                if not self.interleaved:
+                    self.interleaved = True
+                    self.cache.incr(key, self.cost)
+                return value
+
+            def __getattr__(self, name):
+                return getattr(self.cache, name)
+
+        bucket = TokenBucket(cache, 'throttle:test', capacity=2, period=1)
+        bucket.take(2)
+        before = cache.get('throttle:test')
+        bucket.cache = InterleavedCache(cache, bucket.interval)
+        self.assertFalse(bucket.take()[0])
+        self.assertEqual(cache.get('throttle:test'), before + bucket.interval)
+
+        cache.set('throttle:test', int(time.time() * 1000) - 10000)
+        bucket.cache = InterleavedCache(cache, bucket.interval)
+        allowed, tat, now = bucket.take()
+        self.assertTrue(allowed)
+        self.assertEqual(cache.get('throttle:test'), now + 2 * bucket.interval)
+
+    @throttle_rates(bookings='3/min')
+    @override_settings(THROTTLE_LOCAL_LEASE=1)
+    def test_bookings_throttled_per_user(self):
+        """Test that booking requests beyond the rate get 429 with Retry-After, per user"""
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('bookings:booking-list-create')).status_code, 200)
+        response = self.client.get(reverse('bookings:booking-list-create'))
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(reverse('bookings:booking-list-create')).status_code, 200)
+
+    @throttle_rates(bookings='100/min')
+    @override_settings(THROTTLE_LOCAL_LEASE=10)
+    def test_local_leases_never_exceed_the_limit(self):
+        """Test that leased tokens skip the cache but still count against the shared bucket"""
+        self.client.force_authenticate(self.user)
+        key = f'throttle:bookings:user:{self.user.pk}'
+        self.client.get(reverse('bookings:booking-list-create'))
+        self.client.get(reverse('bookings:booking-list-create'))
+        after_lease = cache.get(key)
+        self.client.get(reverse('bookings:booking-list-create'))
+        self.assertEqual(cache.get(key), after_lease)
+
+        allowed = 3
+        for _ in range(120):
+            if self.client.get(reverse('bookings:booking-list-create')).status_code == 200:
+                allowed += 1
+        self.assertLessEqual(allowed, 101)
+        self.assertGreaterEqual(allowed, 90)
+
+    @throttle_rates(login='100/min', login_username='2/min')
+    def test_login_throttled_per_username(self):
+        """Test that repeated logins for one username are throttled across client IPs"""
+        data = {'username': 'throttled', 'password': 'wrong'}
+        for address in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post(reverse('users:login'), data, REMOTE_ADDR=address)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('users:login'), data, REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+
+        data = {'username': 'other', 'password': 'pass12345'}
+        self.assertEqual(self.client.post(reverse('users:login'), data, REMOTE_ADDR='10.0.0.3').status_code, 200)
+
+    @throttle_rates(login='2/min', login_username='100/min')
+    def test_login_throttled_per_ip(self):
+        """Test that logins from one IP are throttled whatever the username"""
+        for username in ('throttled', 'other'):
+            data = {'username': username, 'password': 'pass12345'}
+            self.assertEqual(self.client.post(reverse('users:login'), data, REMOTE_ADDR='10.0.0.9').status_code, 200)
+        data = {'username': 'nobody', 'password': 'pass12345'}
+        self.assertEqual(self.client.post(reverse('users:login'), data, REMOTE_ADDR='10.0.0.9').status_code, 429)
+        self.assertEqual(self.client.post(reverse('users:login'), data, REMOTE_ADDR='10.0.0.8').status_code, 400)
+
+
+class EstimatedCountPaginatorTest(APITestCase):
+    """Test cases for the admin estimated-count paginator"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        for index in range(5):
+            Vehicle.objects.create(
+                owner=self.owner, make='Honda', model='Civic', year=2020,
+                plate_number=f'EST-{index}', daily_rate=40, status='available' if index % 2 else 'maintenance',
+            )
+
+    def test_small_or_filtered_querysets_count_exactly(self):
+        """Test that counts are exact below the threshold and for filtered querysets"""
+        self.assertEqual(EstimatedCountPaginator(Vehicle.objects.all(), 10).count, 5)
+        self.assertEqual(EstimatedCountPaginator(Vehicle.objects.filter(status='available'), 10).count, 2)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1)
+    def test_unfiltered_count_uses_table_statistics(self):
+        """Test that large unfiltered tables are counted from pg_class.reltuples on PostgreSQL"""
+        if connections['default'].vendor != 'postgresql':
+            self.skipTest('Estimates are only used on PostgreSQL')
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE vehicles')
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = 'vehicles'")
+            reltuples = cursor.fetchone()[0]
+        with CaptureQueriesContext(connections['default']) as queries:
+            count = EstimatedCountPaginator(Vehicle.objects.all(), 10).count
+        self.assertEqual(count, int(reltuples))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
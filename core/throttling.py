@@ -0,0 +1,217 @@
+"""
+Token-bucket throttles backed by the shared cache.
+
+A bucket of ``capacity`` tokens refilled at ``capacity`` per period is
+stored as a single integer: its theoretical arrival time (TAT) in
+milliseconds, as in GCRA. Taking a token is one atomic ``cache.incr`` of
+the TAT by the refill interval; the request is allowed while the TAT stays
+within one full bucket of now. Only two cases need a second write, and both
+are relative, so increments of other workers are never lost: a refused
+request gives its tokens back with ``cache.decr``, and a bucket that had
+completely refilled is moved forward to now with one more ``incr``. Only
+the worker that wins a short ``cache.add`` lock does the latter; until the
+lock expires (one second) the TAT may lag behind now, which lets at most
+one second's worth of extra tokens through.
+
+Each process also keeps a small local lease: when the shared bucket is far
+from empty a process takes ``THROTTLE_LOCAL_LEASE`` tokens at once and
+serves the following requests from memory without touching the cache.
+Tokens are always taken from the shared bucket first, so leases never let
+more requests through than the limit; near the limit tokens are taken one
+at a time.
+
+Use a cache shared by all workers (Redis or Memcached) in production; with
+the default local-memory cache every process has its own buckets.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+LOCAL_LEASE_MAX_KEYS = 10000
+
+
+def parse_rate(rate):
+    """``'60/min'`` -> ``(60, 60)``: capacity and refill period in seconds"""
+    try:
+        count, period = rate.split('/')
+        return int(count), PERIODS[period.strip()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}; use e.g. "60/min".')
+
+
+class LocalLeases:
+    """
+    Tokens already taken from shared buckets, per process
+    """
+
+    def __init__(self, max_keys=LOCAL_LEASE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.leases = OrderedDict()
+
+    def take(self, key):
+        """Use a leased token; return the batch size to ask for next"""
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None:
+                return False, 1
+            tokens, expires, next_batch = lease
+            if tokens > 0 and expires > time.monotonic():
+                lease[0] -= 1
+                return True, next_batch
+            return False, next_batch
+
+    def grant(self, key, tokens, seconds, next_batch):
+        with self.lock:
+            self.leases[key] = [tokens, time.monotonic() + seconds, next_batch]
+            self.leases.move_to_end(key)
+            while len(self.leases) > self.max_keys:
+                self.leases.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.leases.clear()
+
+
+local_leases = LocalLeases()
+
+
+class TokenBucket:
+    """
+    One shared bucket: ``capacity`` tokens refilled over ``period`` seconds
+    """
+
+    def __init__(self, cache, key, capacity, period):
+        self.cache = cache
+        self.key = key
+        self.capacity = capacity
+        self.interval = max(1, round(period * 1000 / capacity))
+        self.window = self.interval * capacity
+        # Refreshed on every take, so a busy bucket never expires before it refills
+        self.timeout = period * 2 + 1
+
+    def take(self, tokens=1):
+        """
+        Take ``tokens`` and return ``(allowed, tat, now)`` in milliseconds.
+
+        ``tat - now`` is how far the bucket is drained after the call.
+        """
+        cost = self.interval * tokens
+        now = int(time.time() * 1000)
+        try:
+            tat = self.cache.incr(self.key, cost)
+        except ValueError:
+            tat = now + cost
+            if not self.cache.add(self.key, tat, self.timeout):
+                tat = self.cache.incr(self.key, cost)
+        if tat - cost < now:
+            # The bucket was full; start draining it from now
+            if self.cache.add(f'{self.key}:rebase', 1, 1):
+                tat = self.cache.incr(self.key, now + cost - tat)
+        elif tat - now > self.window:
+            # Refused: give the tokens back
+            try:
+                tat = self.cache.decr(self.key, cost)
+            except ValueError:
+                tat -= cost
+            return False, tat, now
+        self.cache.touch(self.key, self.timeout)
+        return True, tat, now
+
+    def remaining(self, tat, now):
+        return max(0, (self.window - (tat - now)) // self.interval)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class: subclasses say what a bucket is keyed on.
+
+    The rate comes from ``DEFAULT_THROTTLE_RATES[scope]``, where ``scope`` is
+    the class's own or the view's ``throttle_scope``. Views without a scope
+    or rate are not throttled.
+    """
+    scope = None
+    cache_alias = 'default'
+
+    def get_scope(self, view):
+        return self.scope or getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+        ident = self.get_cache_key(request, view)
+        if ident is None:
+            return True
+
+        key = f'throttle:{scope}:{ident}'
+        allowed, batch = local_leases.take(key)
+        if allowed:
+            return True
+
+        capacity, period = parse_rate(rate)
+        bucket = TokenBucket(caches[self.cache_alias], key, capacity, period)
+        allowed, tat, now = bucket.take(batch)
+        if not allowed and batch > 1:
+            batch = 1
+            allowed, tat, now = bucket.take(1)
+        if not allowed:
+            self.wait_seconds = (tat + bucket.interval - now - bucket.window) / 1000
+            return False
+
+        lease_size = settings.THROTTLE_LOCAL_LEASE
+        next_batch = lease_size if lease_size > 1 and bucket.remaining(tat, now) >= 4 * lease_size else 1
+        local_leases.grant(key, batch - 1, batch * bucket.interval / 1000, next_batch)
+        return True
+
+    def wait(self):
+        return max(0.0, getattr(self, 'wait_seconds', 0.0))
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per user, or per client IP for anonymous requests
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per client IP
+    """
+
+    def get_cache_key(self, request, view):
+        return f'ip:{self.get_ident(request)}'
+
+
+class LoginIPThrottle(IPTokenBucketThrottle):
+    scope = 'login'
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    """
+    One bucket per submitted username, so one account cannot be attacked from many IPs
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return 'username:' + hashlib.sha1(username.strip().lower().encode('utf-8')).hexdigest()
@@ -0,0 +1,168 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import generics, serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.renderers import (
+    OpenApiJsonRenderer, OpenApiJsonRenderer2, OpenApiYamlRenderer, OpenApiYamlRenderer2,
+)
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
+from drf_spectacular.views import SpectacularAPIView
+from .db.pool import pool_stats
+from .fieldsets import SparseFieldsetMixin, annotate_fields, optional_fields, requested_fields, serializer_field_names
+from .schema import load_artifact
+from .sync import sync_page
+
+IDS_PARAMETER = OpenApiParameter(
+    name='ids', description='Comma-separated ids, e.g. "1,2,3"', required=True, type=str,
+)
+
+SINCE_PARAMETER = OpenApiParameter(
+    name='since', description='"cursor" from the previous sync response; leave out for a full sync',
+    required=False, type=str,
+)
+SYNC_ERROR_RESPONSES = {
+    400: OpenApiResponse(description='"since" is not a cursor issued by this endpoint'),
+    410: OpenApiResponse(description='The cursor is too old to list every deletion; sync again without "since"'),
+}
+
+
+def batch_response_serializer(name, serializer_class):
+    """Schema for batch responses: found objects plus the missing ids"""
+    return inline_serializer(name=name, fields={
+        'results': serializer_class(many=True),
+        'missing': serializers.ListField(child=serializers.IntegerField()),
+    })
+
+
+class BatchRetrieveAPIView(generics.GenericAPIView):
+    """
+    Fetch many objects from ``get_queryset`` by ``?ids=`` in one query.
+
+    Results follow the order of the requested ids; ids that do not exist or
+    fall outside the view's scoping are listed under ``missing``.
+    """
+    pagination_class = None
+
+    def get_ids(self):
+        raw = self.request.query_params.get('ids', '')
+        try:
+            ids = [int(value) for value in raw.split(',') if value.strip()]
+        except ValueError:
+            raise ValidationError({'ids': ['Provide a comma-separated list of integer ids.']})
+        if not ids:
+            raise ValidationError({'ids': ['This parameter is required.']})
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > settings.BATCH_MAX_IDS:
+            raise ValidationError({'ids': [f'At most {settings.BATCH_MAX_IDS} ids can be requested at once.']})
+        return ids
+
+    def get(self, request, *args, **kwargs):
+        ids = self.get_ids()
+        found = {obj.pk: obj for obj in self.filter_queryset(self.get_queryset()).filter(pk__in=ids)}
+        serializer = self.get_serializer([found[pk] for pk in ids if pk in found], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+
+def sync_response_serializer(name, serializer_class):
+    """Schema for delta sync responses"""
+    return inline_serializer(name=name, fields={
+        'results': serializer_class(many=True, help_text='Rows created or changed since the cursor'),
+        'deleted': serializers.ListField(
+            child=serializers.IntegerField(), help_text='Ids deleted since the cursor; drop them locally',
+        ),
+        'cursor': serializers.CharField(help_text='Pass as "since" on the next sync'),
+        'has_more': serializers.BooleanField(help_text='Another page is ready; sync again right away'),
+    })
+
+
+class DeltaSyncAPIView(generics.GenericAPIView):
+    """
+    Rows of ``get_queryset`` changed since ``?since=`` plus the ids deleted
+    since, from the ``sync_resource`` tombstones of the requesting user.
+
+    See ``core.sync`` for the cursor. Rows are paged by ``updated_at`` and
+    read whole, so ``?fields=`` trims the output but not the query.
+    """
+    pagination_class = None
+    sync_resource = None
+
+    def filter_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            available = serializer_field_names(serializer_class)
+            names = requested_fields(self.request, available, optional_fields(serializer_class))
+            queryset = annotate_fields(queryset, serializer_class, available if names is None else names)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        rows, deleted, cursor, has_more = sync_page(
+            self.sync_resource,
+            self.filter_queryset(self.get_queryset()),
+            request.user.pk,
+            request.query_params.get('since'),
+        )
+        return Response({
+            'results': self.get_serializer(rows, many=True).data,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+
+@extend_schema(
+    tags=['Operations'],
+    summary='Database pool statistics',
+    description='Size, idle, in-use and waiting counts plus checkout latency for each connection pool in this process',
+    responses={200: None}
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def database_pool_stats(request):
+    """
+    Report connection pool statistics for this worker process
+    """
+    return Response({'pools': pool_stats()})
+
+
+class SchemaUnavailable(APIException):
+    status_code = 503
+    default_detail = "The API schema has not been built. Run 'python manage.py build_schema'."
+    default_code = 'schema_unavailable'
+
+
+@extend_schema(exclude=True)
+class SchemaArtifactView(APIView):
+    """
+    Serve the prebuilt OpenAPI schema; YAML by default, JSON on request.
+
+    Responses carry a strong ETag and are cacheable for
+    ``SCHEMA_CACHE_MAX_AGE`` seconds. Without a built artifact the schema is
+    generated live in DEBUG and unavailable otherwise.
+    """
+    renderer_classes = [OpenApiYamlRenderer, OpenApiYamlRenderer2, OpenApiJsonRenderer, OpenApiJsonRenderer2]
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        artifact = load_artifact(renderer.format)
+        if artifact is None:
+            if settings.DEBUG:
+                return SpectacularAPIView.as_view()(request._request)
+            raise SchemaUnavailable()
+        content, etag = artifact
+        if quote_etag(etag) in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_MAX_AGE)
+        return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from decimal import Decimal
 import os
 from dotenv import load_dotenv
 
@@ -48,20 +49,26 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     'drf_spectacular',
+    'core',
     'users',
     'vehicles',
     'bookings',
+    'webhooks',
+    'payments',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db.pool.PoolTimeoutMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.slow_queries.SlowQueryLogMiddleware',
 ]
 
 ROOT_URLCONF = 'lahore_car_rental.urls'
@@ -90,15 +97,143 @@ WSGI_APPLICATION = 'lahore_car_rental.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL with a process-wide connection pool, see core/db/backends/postgresql_pool
+        'ENGINE': 'core.db.backends.postgresql_pool',
         'NAME': os.environ.get('DB_NAME', 'lahore_car_rental'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+            'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+        },
+    }
+}
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1.internal,replica2.internal
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+# Cache
+# Use a shared backend (e.g. Redis) in production so aggregated stats are
+# visible across workers and management commands.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Throttling
+# Tokens a worker takes from a shared bucket at once while it is far from
+# empty; 1 checks the cache on every request
+THROTTLE_LOCAL_LEASE = int(os.environ.get('THROTTLE_LOCAL_LEASE', 10))
+
+# Admin changelists
+# Unfiltered changelists show pg_class estimates for tables at least this big
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000))
+# Filtered changelists fall back to the planner estimate after this long
+ADMIN_COUNT_TIMEOUT_MS = int(os.environ.get('ADMIN_COUNT_TIMEOUT_MS', 200))
+
+# Slow query log
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_TOP_N = 50
+SLOW_QUERY_STACK_DEPTH = 5
+SLOW_QUERY_APP_DIRS = ('bookings', 'vehicles', 'users', 'webhooks', 'payments')
+
+# Serve list endpoints from .values() rows through compiled serializers
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'True') == 'True'
+
+# Webhooks
+WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 100))
+WEBHOOK_CONCURRENCY = int(os.environ.get('WEBHOOK_CONCURRENCY', 10))
+WEBHOOK_TIMEOUT = float(os.environ.get('WEBHOOK_TIMEOUT', 10))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 8))
+# Claimed events are retried by another dispatcher once the lease runs out
+WEBHOOK_LEASE_SECONDS = 300
+WEBHOOK_RETRY_BASE_SECONDS = 30
+WEBHOOK_RETRY_MAX_SECONDS = 3600
+WEBHOOK_POLL_INTERVAL = 2.0
+
+# Deposit payments
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'payments.gateways.FakeGateway')
+PAYMENT_CURRENCY = os.environ.get('PAYMENT_CURRENCY', 'PKR')
+PAYMENT_WORKERS = int(os.environ.get('PAYMENT_WORKERS', 8))
+PAYMENT_BATCH_SIZE = int(os.environ.get('PAYMENT_BATCH_SIZE', 50))
+PAYMENT_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_MAX_ATTEMPTS', 5))
+PAYMENT_LEASE_SECONDS = 300
+PAYMENT_RETRY_BASE_SECONDS = 10
+PAYMENT_RETRY_MAX_SECONDS = 900
+PAYMENT_POLL_INTERVAL = 0.5
+PAYMENT_LONG_POLL_MAX_SECONDS = float(os.environ.get('PAYMENT_LONG_POLL_MAX_SECONDS', 25))
+# Simulated behaviour of payments.gateways.FakeGateway
+PAYMENT_FAKE_LATENCY = float(os.environ.get('PAYMENT_FAKE_LATENCY', 0.3))
+PAYMENT_FAKE_FAILURE_RATE = float(os.environ.get('PAYMENT_FAKE_FAILURE_RATE', 0.05))
+PAYMENT_FAKE_DECLINE_RATE = float(os.environ.get('PAYMENT_FAKE_DECLINE_RATE', 0.02))
+
+# Maximum number of ids accepted by the batch fetch endpoints
+BATCH_MAX_IDS = 100
+# ... and by the bulk update endpoints
+BULK_UPDATE_MAX_IDS = int(os.environ.get('BULK_UPDATE_MAX_IDS', 1000))
+
+# Delta sync (/sync/ endpoints): rows per page, how far behind now a
+# caught-up cursor stays (longer than the slowest write transaction plus
+# replica delay and clock skew between workers), and how long deletions are
+# remembered; older cursors must start over with a full sync.
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+SYNC_LAG_SECONDS = int(os.environ.get('SYNC_LAG_SECONDS', 60))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Vehicle facets
+VEHICLE_FACET_YEAR_BUCKET = 5
+VEHICLE_FACET_RATE_BAND = 50
+VEHICLE_FACET_CACHE_TIMEOUT = 60
+
+# Vehicle bulk import
+VEHICLE_IMPORT_BATCH_SIZE = 500
+VEHICLE_IMPORT_MAX_ROWS = 10000
+
+# Bookings
+# Longest allowed booking; also bounds overlap checks so PostgreSQL can prune
+# monthly partitions of the bookings table.
+BOOKING_MAX_DURATION_DAYS = int(os.environ.get('BOOKING_MAX_DURATION_DAYS', 90))
+BOOKING_PARTITION_MONTHS_AHEAD = int(os.environ.get('BOOKING_PARTITION_MONTHS_AHEAD', 3))
+# Months of partitions to keep attached; unset keeps them all
+BOOKING_PARTITION_RETAIN_MONTHS = (
+    int(os.environ['BOOKING_PARTITION_RETAIN_MONTHS'])
+    if os.environ.get('BOOKING_PARTITION_RETAIN_MONTHS') else None
+)
+# Completed/cancelled bookings that ended this long ago move to the archive
+BOOKING_ARCHIVE_AFTER_DAYS = int(os.environ.get('BOOKING_ARCHIVE_AFTER_DAYS', 365))
+BOOKING_ARCHIVE_CHUNK_SIZE = 1000
+# iCalendar feeds include bookings that ended up to this many days ago
+BOOKING_CALENDAR_PAST_DAYS = int(os.environ.get('BOOKING_CALENDAR_PAST_DAYS', 30))
+BOOKING_CALENDAR_CACHE_TIMEOUT = 24 * 60 * 60
+# Checkout holds: how long a hold blocks the vehicle and how many a customer may have
+BOOKING_HOLD_TTL_SECONDS = int(os.environ.get('BOOKING_HOLD_TTL_SECONDS', 600))
+BOOKING_HOLD_MAX_PER_CUSTOMER = int(os.environ.get('BOOKING_HOLD_MAX_PER_CUSTOMER', 3))
+# Similar free vehicles suggested when a booking conflicts: how many, the
+# daily rate band counted as similar, and the query's time budget (PostgreSQL)
+BOOKING_ALTERNATIVES_LIMIT = int(os.environ.get('BOOKING_ALTERNATIVES_LIMIT', 5))
+BOOKING_ALTERNATIVES_RATE_BAND = Decimal(os.environ.get('BOOKING_ALTERNATIVES_RATE_BAND', '2000'))
+BOOKING_ALTERNATIVES_TIMEOUT_MS = int(os.environ.get('BOOKING_ALTERNATIVES_TIMEOUT_MS', 100))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -152,9 +287,22 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Views opt in with throttle_scope; see core/throttling.py
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.UserTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'bookings': os.environ.get('THROTTLE_RATE_BOOKINGS', '300/min'),
+        'login': os.environ.get('THROTTLE_RATE_LOGIN', '20/min'),
+        'login_username': os.environ.get('THROTTLE_RATE_LOGIN_USERNAME', '10/min'),
+    },
 }
 
 # JWT Settings
@@ -186,6 +334,10 @@ SIMPLE_JWT = {
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
+# Prebuilt OpenAPI schema (python manage.py build_schema)
+SCHEMA_ARTIFACT_DIR = os.environ.get('SCHEMA_ARTIFACT_DIR', str(BASE_DIR / 'build' / 'schema'))
+SCHEMA_CACHE_MAX_AGE = int(os.environ.get('SCHEMA_CACHE_MAX_AGE', 3600))
+
 # Swagger/OpenAPI Settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Lahore Car Rental API',
@@ -198,6 +350,8 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Authentication', 'description': 'User auth endpoints'},
         {'name': 'Vehicles', 'description': 'Vehicle operations'},
         {'name': 'Bookings', 'description': 'Booking operations'},
+        {'name': 'Payments', 'description': 'Deposit payments'},
+        {'name': 'Operations', 'description': 'Operational endpoints for staff'},
     ],
     'SECURITY': [
         {
@@ -14,17 +14,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from core.views import SchemaArtifactView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # API Documentation
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path(
+        'api/docs/',
+        SpectacularSwaggerView.as_view(url_name='schema-live' if settings.DEBUG else 'schema'),
+        name='swagger-ui',
+    ),
+    path('api/schema/', SchemaArtifactView.as_view(), name='schema'),
     
     # JWT Token endpoints
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -33,4 +39,12 @@ urlpatterns = [
     path('api/', include('users.urls')),
     path('api/vehicles/', include('vehicles.urls')),
     path('api/bookings/', include('bookings.urls')),
+    path('api/payments/', include('payments.urls')),
+    path('api/ops/', include('core.urls')),
 ]
+
+if settings.DEBUG:
+    # Introspects every view on each request; prebuilt artifacts are served at api/schema/
+    urlpatterns += [
+        path('api/schema/live/', SpectacularAPIView.as_view(), name='schema-live'),
+    ]
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import PaymentIntent
+
+
+@admin.register(PaymentIntent)
+class PaymentIntentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'booking_id', 'customer', 'amount', 'currency', 'status', 'attempts', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('booking_id', 'gateway_reference', 'customer__username')
+    list_select_related = ('customer',)
+    readonly_fields = ('created_at', 'updated_at', 'completed_at')
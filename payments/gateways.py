@@ -0,0 +1,60 @@
+"""
+Payment gateways used by the deposit worker pool.
+
+A gateway exposes ``charge(intent)`` returning the gateway's reference for
+the charge. It raises ``PaymentDeclined`` for permanent failures and
+``GatewayError`` for anything worth retrying. ``intent.idempotency_key``
+stays the same across retries, so a charge that went through before a
+worker crashed is not taken twice. The gateway class is chosen with the
+``PAYMENT_GATEWAY`` setting.
+"""
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GatewayError(Exception):
+    """Temporary failure; the charge may be retried"""
+
+
+class PaymentDeclined(Exception):
+    """The charge was refused and should not be retried"""
+
+
+class FakeGateway:
+    """
+    Local stand-in for Stripe that simulates latency and failures.
+
+    ``failure_rate`` is the share of charges that fail with a retryable
+    error and ``decline_rate`` the share that are declined outright.
+    """
+
+    def __init__(self, latency=None, failure_rate=None, decline_rate=None):
+        self.latency = settings.PAYMENT_FAKE_LATENCY if latency is None else latency
+        self.failure_rate = settings.PAYMENT_FAKE_FAILURE_RATE if failure_rate is None else failure_rate
+        self.decline_rate = settings.PAYMENT_FAKE_DECLINE_RATE if decline_rate is None else decline_rate
+        self.charges = {}
+        self.lock = threading.Lock()
+
+    def charge(self, intent):
+        if self.latency:
+            time.sleep(random.uniform(0, 2 * self.latency))
+        with self.lock:
+            if intent.idempotency_key in self.charges:
+                return self.charges[intent.idempotency_key]
+        roll = random.random()
+        if roll < self.decline_rate:
+            raise PaymentDeclined('Card declined.')
+        if roll < self.decline_rate + self.failure_rate:
+            raise GatewayError('Gateway unavailable.')
+        reference = f'ch_{uuid.uuid4().hex[:24]}'
+        with self.lock:
+            return self.charges.setdefault(intent.idempotency_key, reference)
+
+
+def get_gateway():
+    return import_string(settings.PAYMENT_GATEWAY)()
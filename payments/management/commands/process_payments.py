@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.gateways import get_gateway
+from payments.processor import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Charge queued booking deposits with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.PAYMENT_WORKERS, help='Concurrent gateway calls')
+        parser.add_argument('--batch-size', type=int, default=settings.PAYMENT_BATCH_SIZE, help='Intents per batch')
+        parser.add_argument('--once', action='store_true', help='Process the due intents and exit')
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.PAYMENT_POLL_INTERVAL,
+            help='Seconds to wait when no intents are due',
+        )
+
+    def handle(self, *args, **options):
+        gateway = get_gateway()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                counts = process_batch(gateway, executor, options['batch_size'])
+                if counts:
+                    self.stdout.write(
+                        f"Succeeded {counts['succeeded']}, retrying {counts['retried']}, "
+                        f"failed {counts['failed']}, canceled {counts['canceled']} deposit charges."
+                    )
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
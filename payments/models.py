@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class PaymentIntent(models.Model):
+    """
+    Deposit charge queued for a booking.
+
+    Intents are created with the booking and charged by the
+    ``process_payments`` worker pool; the booking's ``deposit_paid`` flag is
+    set once the gateway accepts the charge.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('canceled', 'Canceled'),
+    ]
+    FINAL_STATUSES = ('succeeded', 'failed', 'canceled')
+
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payment_intents')
+    # Plain id: bookings may be partitioned or archived, so no foreign key
+    booking_id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=settings.PAYMENT_CURRENCY)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Claimed intents are retried by another worker once the lease runs out;
+    # ``lease`` identifies the claim, so a worker that lost it cannot record results
+    lease = models.UUIDField(blank=True, null=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    gateway_reference = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'payment_intents'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='payment_intents_due_idx'),
+            models.Index(fields=['booking_id', '-created_at'], name='payment_intents_booking_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deposit {self.amount} {self.currency} for booking {self.booking_id} ({self.status})"
+
+    @property
+    def idempotency_key(self):
+        return f'deposit-{self.pk}'
+
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
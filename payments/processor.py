@@ -0,0 +1,150 @@
+"""
+Deposit charge processing.
+
+``claim_batch`` leases due intents with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and commits straight away, so gateway calls never run inside a
+database transaction and several worker processes can share the queue.
+``process_batch`` charges the claimed intents on a thread pool and writes
+the outcomes back with one UPDATE per outcome, including a single UPDATE
+setting ``deposit_paid`` on every booking that was paid. Outcomes are only
+written for intents that still carry the claim's lease token, so a worker
+whose lease ran out cannot overwrite the result of the one that took over.
+"""
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from bookings.models import Booking
+from core.concurrency import bump_version
+from .gateways import GatewayError, PaymentDeclined
+from .models import PaymentIntent
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at PAYMENT_RETRY_MAX_SECONDS"""
+    delay = min(settings.PAYMENT_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.PAYMENT_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1, 1.2))
+
+
+def due_intents(now):
+    """Pending intents that are due, plus processing ones whose lease expired"""
+    return PaymentIntent.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) | Q(status='processing', locked_until__lt=now)
+    ).order_by('next_attempt_at', 'id')
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due intents.
+
+    Returns ``(intents, canceled)``: intents whose booking has been
+    cancelled or removed are canceled rather than charged.
+    """
+    now = timezone.now()
+    lease = uuid.uuid4()
+    with transaction.atomic():
+        ids = list(
+            due_intents(now).select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return [], 0
+        PaymentIntent.objects.filter(id__in=ids).update(
+            status='processing',
+            lease=lease,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.PAYMENT_LEASE_SECONDS),
+            updated_at=now,
+        )
+        intents = list(PaymentIntent.objects.filter(id__in=ids).order_by('id'))
+
+    payable = set(
+        Booking.objects.filter(id__in={intent.booking_id for intent in intents})
+        .exclude(status='cancelled')
+        .values_list('id', flat=True)
+    )
+    abandoned = [intent.pk for intent in intents if intent.booking_id not in payable]
+    if abandoned:
+        PaymentIntent.objects.filter(id__in=abandoned, lease=lease).update(
+            status='canceled', lease=None, locked_until=None, last_error='Booking was cancelled.',
+            completed_at=now, updated_at=now,
+        )
+    return [intent for intent in intents if intent.booking_id in payable], len(abandoned)
+
+
+def charge(gateway, intent):
+    """Return ``(reference, error, retryable)`` for one charge attempt"""
+    try:
+        return gateway.charge(intent), '', False
+    except PaymentDeclined as exc:
+        return '', str(exc) or 'Declined.', False
+    except GatewayError as exc:
+        return '', str(exc) or 'Gateway error.', True
+
+
+def apply_results(intents, results):
+    """Write charge outcomes back with set-based updates, for intents whose lease is still held"""
+    if not intents:
+        return {'succeeded': 0, 'retried': 0, 'failed': 0}
+    lease = intents[0].lease
+    now = timezone.now()
+    succeeded, declined, retry, exhausted = [], [], [], []
+    for intent, (reference, error, retryable) in zip(intents, results):
+        intent.lease = intent.locked_until = None
+        intent.updated_at = now
+        if not error:
+            intent.status, intent.gateway_reference, intent.completed_at = 'succeeded', reference, now
+            succeeded.append(intent)
+        elif retryable and intent.attempts < settings.PAYMENT_MAX_ATTEMPTS:
+            intent.status, intent.last_error = 'pending', error
+            intent.next_attempt_at = now + retry_delay(intent.attempts)
+            retry.append(intent)
+        else:
+            intent.status, intent.last_error, intent.completed_at = 'failed', error, now
+            (declined if not retryable else exhausted).append(intent)
+
+    with transaction.atomic():
+        held = set(
+            PaymentIntent.objects.filter(id__in=[intent.pk for intent in intents], lease=lease)
+            .select_for_update().values_list('id', flat=True)
+        )
+        succeeded, retry, declined, exhausted = (
+            [intent for intent in group if intent.pk in held] for group in (succeeded, retry, declined, exhausted)
+        )
+        if succeeded:
+            PaymentIntent.objects.bulk_update(
+                succeeded, ['status', 'gateway_reference', 'lease', 'locked_until', 'completed_at', 'updated_at'],
+            )
+            Booking.objects.filter(
+                id__in=[intent.booking_id for intent in succeeded], deposit_paid=False,
+            ).update(deposit_paid=True, updated_at=now, version=bump_version())
+        if retry:
+            PaymentIntent.objects.bulk_update(
+                retry, ['status', 'last_error', 'next_attempt_at', 'lease', 'locked_until', 'updated_at'],
+            )
+        if declined or exhausted:
+            PaymentIntent.objects.bulk_update(
+                declined + exhausted,
+                ['status', 'last_error', 'lease', 'locked_until', 'completed_at', 'updated_at'],
+            )
+    return {'succeeded': len(succeeded), 'retried': len(retry), 'failed': len(declined) + len(exhausted)}
+
+
+def process_batch(gateway, executor, batch_size=None):
+    """Claim, charge and record one batch; return counts per outcome"""
+    intents, canceled = claim_batch(batch_size or settings.PAYMENT_BATCH_SIZE)
+    if not intents and not canceled:
+        return {}
+    results = list(executor.map(lambda intent: charge(gateway, intent), intents))
+    return {**apply_results(intents, results), 'canceled': canceled}
+
+
+def run_once(gateway, workers=None, batch_size=None):
+    """Process a single batch on a temporary thread pool"""
+    with ThreadPoolExecutor(max_workers=workers or settings.PAYMENT_WORKERS) as executor:
+        return process_batch(gateway, executor, batch_size)
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import PaymentIntent
+
+
+class PaymentIntentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for deposit payment intents
+    """
+
+    class Meta:
+        model = PaymentIntent
+        fields = [
+            'id', 'booking_id', 'amount', 'currency', 'status', 'attempts',
+            'last_error', 'created_at', 'updated_at', 'completed_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from bookings.models import Booking
+from .models import PaymentIntent
+
+
+@receiver(post_save, sender=Booking)
+def queue_deposit(sender, instance, created, using, **kwargs):
+    """Queue the deposit charge for new bookings"""
+    if created and instance.deposit_amount and not instance.deposit_paid:
+        PaymentIntent.objects.using(using).create(
+            customer_id=instance.customer_id,
+            booking_id=instance.pk,
+            amount=instance.deposit_amount,
+        )
@@ -0,0 +1,182 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from bookings.models import Booking
+from vehicles.models import Vehicle
+from .gateways import FakeGateway
+from .models import PaymentIntent
+from .processor import apply_results, claim_batch, run_once
+
+User = get_user_model()
+
+
+class DepositPaymentTest(APITestCase):
+    """Test cases for queued deposit payments"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user, make='Toyota', model='Corolla', year=2021, plate_number='LEA-1', daily_rate=50
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start_date = timezone.now() + timedelta(days=1)
+
+    def create_booking(self, **kwargs):
+        return Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.start_date + timedelta(days=2),
+            total_amount=Decimal('100.00'),
+            deposit_amount=Decimal('20.00'),
+            **kwargs
+        )
+
+    def test_booking_creation_queues_deposit(self):
+        """Test that creating a booking queues its deposit instead of charging inline"""
+        response = self.client.post(reverse('bookings:booking-list-create'), {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start_date.isoformat(),
+            'end_date': (self.start_date + timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.data['deposit_paid'])
+
+        intent = PaymentIntent.objects.get(booking_id=response.data['id'])
+        self.assertEqual(intent.status, 'pending')
+        self.assertEqual(intent.amount, Decimal('20.00'))
+        self.assertEqual(intent.customer, self.user)
+
+    def test_successful_charges_mark_deposits_paid(self):
+        """Test that a batch of successful charges sets deposit_paid on every booking"""
+        bookings = [self.create_booking() for _ in range(3)]
+        gateway = FakeGateway(latency=0, failure_rate=0, decline_rate=0)
+
+        counts = run_once(gateway, workers=2)
+
+        self.assertEqual(counts['succeeded'], 3)
+        self.assertEqual(Booking.objects.filter(id__in=[b.id for b in bookings], deposit_paid=True).count(), 3)
+        for intent in PaymentIntent.objects.all():
+            self.assertEqual(intent.status, 'succeeded')
+            self.assertEqual(intent.attempts, 1)
+            self.assertTrue(intent.gateway_reference.startswith('ch_'))
+            self.assertIsNotNone(intent.completed_at)
+        self.assertEqual(run_once(gateway), {})
+
+    def test_gateway_errors_are_retried_then_fail(self):
+        """Test that retryable errors back off and give up after the last attempt"""
+        booking = self.create_booking()
+        with override_settings(PAYMENT_MAX_ATTEMPTS=2):
+            run_once(FakeGateway(latency=0, failure_rate=1, decline_rate=0))
+            intent = PaymentIntent.objects.get()
+            self.assertEqual(intent.status, 'pending')
+            self.assertEqual(intent.last_error, 'Gateway unavailable.')
+            self.assertGreater(intent.next_attempt_at, timezone.now())
+            self.assertEqual(run_once(FakeGateway(latency=0, failure_rate=1, decline_rate=0)), {})
+
+            PaymentIntent.objects.update(next_attempt_at=timezone.now())
+            run_once(FakeGateway(latency=0, failure_rate=1, decline_rate=0))
+        intent.refresh_from_db()
+        self.assertEqual(intent.status, 'failed')
+        self.assertEqual(intent.attempts, 2)
+        booking.refresh_from_db()
+        self.assertFalse(booking.deposit_paid)
+
+    def test_declined_charge_is_not_retried(self):
+        """Test that declined charges fail on the first attempt"""
+        self.create_booking()
+        counts = run_once(FakeGateway(latency=0, failure_rate=0, decline_rate=1))
+        self.assertEqual(counts['failed'], 1)
+        self.assertEqual(PaymentIntent.objects.get().status, 'failed')
+
+    def test_cancelled_booking_is_not_charged(self):
+        """Test that deposits of cancelled bookings are canceled"""
+        booking = self.create_booking()
+        booking.status = 'cancelled'
+        booking.save()
+        counts = run_once(FakeGateway(latency=0, failure_rate=0, decline_rate=0))
+        self.assertEqual(counts, {'succeeded': 0, 'retried': 0, 'failed': 0, 'canceled': 1})
+        self.assertEqual(PaymentIntent.objects.get().status, 'canceled')
+
+    def test_expired_lease_is_reclaimed_idempotently(self):
+        """Test that intents left processing by a crashed worker are charged once"""
+        self.create_booking()
+        gateway = FakeGateway(latency=0, failure_rate=0, decline_rate=0)
+        intent = PaymentIntent.objects.get()
+        first_reference = gateway.charge(intent)
+        PaymentIntent.objects.update(
+            status='processing', attempts=1, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        run_once(gateway)
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.status, 'succeeded')
+        self.assertEqual(intent.attempts, 2)
+        self.assertEqual(intent.gateway_reference, first_reference)
+
+    def test_results_of_a_lost_lease_are_dropped(self):
+        """Test that a worker whose lease was taken over cannot overwrite the newer result"""
+        self.create_booking()
+        gateway = FakeGateway(latency=0, failure_rate=0, decline_rate=0)
+        intents, _ = claim_batch(10)
+        PaymentIntent.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        run_once(gateway)
+
+        counts = apply_results(intents, [('', 'Gateway timeout.', True)])
+        self.assertEqual(counts, {'succeeded': 0, 'retried': 0, 'failed': 0})
+        intent = PaymentIntent.objects.get()
+        self.assertEqual(intent.status, 'succeeded')
+        self.assertIsNone(intent.lease)
+
+    @override_settings(PAYMENT_FAKE_LATENCY=0, PAYMENT_FAKE_FAILURE_RATE=0, PAYMENT_FAKE_DECLINE_RATE=0)
+    def test_process_payments_command(self):
+        """Test that the worker command drains the queue"""
+        booking = self.create_booking()
+        out = StringIO()
+        call_command('process_payments', once=True, workers=2, stdout=out)
+        self.assertIn('Succeeded 1', out.getvalue())
+        booking.refresh_from_db()
+        self.assertTrue(booking.deposit_paid)
+
+    def test_deposit_status(self):
+        """Test polling the deposit status of a booking"""
+        booking = self.create_booking()
+        url = reverse('payments:deposit-status', args=[booking.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response.data['amount'], '20.00')
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PAYMENT_POLL_INTERVAL=0.05)
+    def test_deposit_status_long_poll(self):
+        """Test that ?wait= holds pending payments and returns final ones at once"""
+        booking = self.create_booking()
+        url = reverse('payments:deposit-status', args=[booking.id])
+
+        started = time.monotonic()
+        response = self.client.get(url, {'wait': '0.3'})
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(response.data['status'], 'pending')
+
+        PaymentIntent.objects.update(status='succeeded')
+        started = time.monotonic()
+        response = self.client.get(url, {'wait': '5'})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.data['status'], 'succeeded')
+
+        response = self.client.get(url, {'wait': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'payments'
+
+urlpatterns = [
+    path('deposits/<int:booking_id>/', views.DepositStatusView.as_view(), name='deposit-status'),
+]
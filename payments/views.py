@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.http import Http404
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
+from core.db.pool import release_connections
+from .models import PaymentIntent
+from .serializers import PaymentIntentSerializer
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Payments'],
+        summary='Get deposit payment status',
+        description=(
+            'Latest deposit payment for a booking. With ?wait=N the request is held for up to N seconds '
+            '(capped at PAYMENT_LONG_POLL_MAX_SECONDS) until the payment succeeds, fails or is canceled.'
+        ),
+        parameters=[
+            OpenApiParameter(
+                name='wait', description='Seconds to wait for a final status (long polling)',
+                required=False, type=float,
+            ),
+        ],
+        responses={200: PaymentIntentSerializer}
+    )
+)
+class DepositStatusView(generics.RetrieveAPIView):
+    """
+    Poll or long-poll the deposit payment of one of the user's bookings
+    """
+    serializer_class = PaymentIntentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return PaymentIntent.objects.filter(customer=self.request.user, booking_id=self.kwargs['booking_id'])
+
+    def get_wait(self):
+        raw = self.request.query_params.get('wait')
+        if raw is None:
+            return 0
+        try:
+            wait = float(raw)
+        except ValueError:
+            raise ValidationError({'wait': ['A number of seconds is required.']})
+        if wait < 0:
+            raise ValidationError({'wait': ['Must not be negative.']})
+        return min(wait, settings.PAYMENT_LONG_POLL_MAX_SECONDS)
+
+    def get_object(self):
+        deadline = time.monotonic() + self.get_wait()
+        while True:
+            intent = self.get_queryset().order_by('-created_at', '-id').first()
+            if intent is None:
+                raise Http404('No deposit payment found for this booking.')
+            remaining = deadline - time.monotonic()
+            if intent.is_final or remaining <= 0:
+                return intent
+            # Do not keep a pooled connection while sleeping
+            release_connections()
+            time.sleep(min(settings.PAYMENT_POLL_INTERVAL, remaining))
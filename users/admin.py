@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from core.admin import EstimatedCountPaginator
 from .models import User
 
 
@@ -7,11 +8,16 @@ from .models import User
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'phone_number', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_active', 'created_at')
-    search_fields = ('username', 'email', 'first_name', 'last_name', 'phone_number')
+    search_fields = ('^username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     ordering = ('-created_at',)
     
+    readonly_fields = ('booking_count', 'upcoming_booking_count', 'lifetime_spend', 'vehicle_count')
+    
     fieldsets = UserAdmin.fieldsets + (
         ('Additional Info', {'fields': ('phone_number', 'address', 'date_of_birth')}),
+        ('Totals', {'fields': readonly_fields, 'classes': ('collapse',)}),
     )
     
     add_fieldsets = UserAdmin.add_fieldsets + (
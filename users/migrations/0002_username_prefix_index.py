@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:10
+
+from django.db import migrations
+
+from core.db.indexes import create_prefix_index, drop_prefix_index
+
+
+def forwards(apps, schema_editor):
+    create_prefix_index(schema_editor.connection, 'users', 'username', 'users_username_prefix_idx')
+
+
+def backwards(apps, schema_editor):
+    drop_prefix_index(schema_editor.connection, 'users_username_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
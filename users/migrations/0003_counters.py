@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_username_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='booking_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='lifetime_spend',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='upcoming_booking_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='vehicle_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,17 +1,27 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from core.counters import CounterFieldsMixin
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     """
     Custom User model for Lahore Car Rental
     """
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
+    # Kept up to date by bookings.counters and vehicles.signals; see core.counters
+    booking_count = models.PositiveIntegerField(default=0)
+    upcoming_booking_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vehicle_count = models.PositiveIntegerField(default=0)
+    # SHA-256 of the key in the user's calendar feed URLs; see bookings.calendar
+    calendar_feed_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('booking_count', 'upcoming_booking_count', 'lifetime_spend', 'vehicle_count')
+
     class Meta:
         db_table = 'users'
 
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.fieldsets import SparseFieldsetMixin
 from django.contrib.auth import authenticate
 from .models import User
 
@@ -47,11 +48,16 @@ class UserLoginSerializer(serializers.Serializer):
         return attrs
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for user profile
     """
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'address', 'date_of_birth', 'created_at']
-        read_only_fields = ['id', 'created_at'] 
\ No newline at end of file
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'address', 'date_of_birth',
+            'booking_count', 'upcoming_booking_count', 'lifetime_spend', 'vehicle_count', 'created_at',
+        ]
+        read_only_fields = [
+            'id', 'booking_count', 'upcoming_booking_count', 'lifetime_spend', 'vehicle_count', 'created_at',
+        ] 
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from datetime import date
+from vehicles.models import Vehicle
 
 User = get_user_model()
 
@@ -137,6 +138,36 @@ class UserProfileTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['username'], 'testuser')
         self.assertEqual(response.data['email'], 'test@example.com')
+
+    def test_get_profile_sparse_fields(self):
+        """Test limiting the profile to selected fields"""
+        response = self.client.get(self.profile_url, {'fields': 'id,username'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), ['id', 'username'])
+
+        response = self.client.get(self.profile_url, {'omit': 'address,date_of_birth'})
+        self.assertNotIn('address', response.data)
+        self.assertIn('email', response.data)
+    
+    def test_profile_includes_counters(self):
+        """Test that the profile carries the user's totals without extra queries"""
+        Vehicle.objects.create(
+            owner=self.user, make='Kia', model='Picanto', year=2021, plate_number='PRF-1', daily_rate=30,
+        )
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+        self.assertEqual(response.data['vehicle_count'], 1)
+        self.assertEqual(response.data['booking_count'], 0)
+        self.assertEqual(response.data['lifetime_spend'], '0.00')
+
+        # Saving the profile neither accepts counters nor writes back stale ones
+        Vehicle.objects.create(
+            owner=self.user, make='Kia', model='Picanto', year=2021, plate_number='PRF-2', daily_rate=30,
+        )
+        response = self.client.patch(self.profile_url, {'vehicle_count': 5, 'first_name': 'Changed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(User.objects.get(pk=self.user.pk).vehicle_count, 2)
     
     def test_update_profile(self):
         """Test updating user profile"""
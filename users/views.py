@@ -1,10 +1,12 @@
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
+from core.fieldsets import SPARSE_FIELDSET_PARAMETERS
+from core.throttling import LoginIPThrottle, LoginUsernameThrottle
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 
 User = get_user_model()
@@ -55,6 +57,7 @@ def register(request):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginUsernameThrottle])
 def login(request):
     """
     Login user and return JWT token
@@ -81,6 +84,7 @@ def login(request):
         tags=['Authentication'],
         summary='Get user profile',
         description='Get user profile',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={200: UserProfileSerializer}
     ),
     put=extend_schema(
@@ -1,14 +1,20 @@
 from django.contrib import admin
+from core.admin import LargeTableAdmin
+from .bulk import update_vehicles
 from .models import Vehicle
 
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(LargeTableAdmin):
     list_display = ('full_name', 'plate_number', 'owner', 'daily_rate', 'status', 'created_at')
-    list_filter = ('status', 'fuel_type', 'transmission', 'year', 'created_at')
-    search_fields = ('make', 'model', 'plate_number', 'owner__username')
+    list_filter = ('status', 'fuel_type', 'transmission')
+    list_select_related = ('owner',)
+    # Prefix matches only, served by the UPPER(...) text_pattern_ops indexes
+    search_fields = ('^plate_number', '^owner__username')
+    date_hierarchy = 'created_at'
+    actions = ('mark_available', 'mark_maintenance')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('booking_count', 'upcoming_booking_count', 'revenue', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Basic Information', {
@@ -20,8 +26,24 @@ class VehicleAdmin(admin.ModelAdmin):
         ('Pricing & Status', {
             'fields': ('daily_rate', 'status', 'description')
         }),
+        ('Totals', {
+            'fields': ('booking_count', 'upcoming_booking_count', 'revenue'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+    def set_status(self, request, queryset, status):
+        updated = update_vehicles(queryset, status=status)
+        self.message_user(request, f'{updated} vehicle(s) marked {status}.')
+
+    @admin.action(description='Mark selected vehicles available')
+    def mark_available(self, request, queryset):
+        self.set_status(request, queryset, 'available')
+
+    @admin.action(description='Mark selected vehicles in maintenance')
+    def mark_maintenance(self, request, queryset):
+        self.set_status(request, queryset, 'maintenance')
@@ -0,0 +1,46 @@
+"""
+When a booked vehicle becomes available again.
+
+A vehicle with a confirmed or active booking covering now is free once the
+run of back-to-back bookings it is in ends: at the earliest end date after
+now that no other such booking spans. Vehicles not booked right now get
+null. Both are correlated subqueries on ``bookings``, so the value is part
+of the list query and computed only for the rows returned; bounding
+``start_date`` by ``BOOKING_MAX_DURATION_DAYS`` keeps partition pruning.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Exists, OuterRef, Subquery, When
+from django.utils import timezone
+
+from bookings.models import Booking
+
+BLOCKING_STATUSES = ('confirmed', 'active')
+
+
+def next_available_at():
+    """Annotation for a Vehicle queryset"""
+    now = timezone.now()
+    max_duration = timedelta(days=settings.BOOKING_MAX_DURATION_DAYS)
+    blocking = Booking.objects.filter(vehicle=OuterRef('pk'), status__in=BLOCKING_STATUSES)
+    booked_now = blocking.filter(start_date__gt=now - max_duration, start_date__lte=now, end_date__gt=now)
+    # Another booking that has started by the time this one ends and runs past it
+    spanned = Booking.objects.filter(
+        vehicle=OuterRef('vehicle'),
+        status__in=BLOCKING_STATUSES,
+        start_date__gt=OuterRef('end_date') - max_duration,
+        start_date__lte=OuterRef('end_date'),
+        end_date__gt=OuterRef('end_date'),
+    )
+    free_from = (
+        blocking.filter(end_date__gt=now, start_date__gt=now - max_duration)
+        .exclude(Exists(spanned))
+        .order_by('end_date')
+        .values('end_date')[:1]
+    )
+    return Case(
+        When(Exists(booked_now), then=Subquery(free_from)),
+        default=None,
+        output_field=DateTimeField(),
+    )
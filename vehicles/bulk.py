@@ -0,0 +1,30 @@
+"""
+Set-based updates of many vehicles at once.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+
+from core.concurrency import bump_version
+from core.signals import bulk_updated
+
+from .models import Vehicle
+
+
+def update_vehicles(queryset, **values):
+    """
+    Apply ``values`` to every vehicle in ``queryset`` with one UPDATE.
+
+    Returns the number of vehicles updated; instances are never loaded.
+    """
+    using = router.db_for_write(Vehicle)
+    with transaction.atomic(using=using):
+        ids = list(
+            queryset.using(using).order_by().select_for_update(of=('self',)).values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        updated = Vehicle.objects.using(using).filter(id__in=ids).update(
+            **values, updated_at=timezone.now(), version=bump_version(),
+        )
+        bulk_updated.send(sender=Vehicle, ids=ids, fields=list(values), using=using)
+    return updated
@@ -0,0 +1,110 @@
+"""
+Facet counts for vehicle listings.
+
+All facets are counted in a single grouped aggregate over the filtered
+queryset: ``GROUPING SETS`` on PostgreSQL, ``UNION ALL`` of grouped selects
+over one CTE elsewhere. Results are cached briefly per filter signature.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+FACETS = ('fuel_type', 'transmission', 'seats', 'year', 'daily_rate')
+
+
+def _source_sql(queryset, vendor):
+    """Project the filtered queryset onto the facet columns"""
+    inner = queryset.order_by().values('fuel_type', 'transmission', 'seats', 'year', 'daily_rate')
+    sql, params = inner.query.get_compiler(using=queryset.db).as_sql()
+    year_bucket = settings.VEHICLE_FACET_YEAR_BUCKET
+    rate_band = settings.VEHICLE_FACET_RATE_BAND
+    if vendor == 'postgresql':
+        rate_expr = f'FLOOR(daily_rate / {rate_band}) * {rate_band}'
+    else:
+        rate_expr = f'CAST(daily_rate / {rate_band} AS INTEGER) * {rate_band}'
+    source = (
+        f'SELECT fuel_type, transmission, seats, (year / {year_bucket}) * {year_bucket} AS year, '
+        f'{rate_expr} AS daily_rate FROM ({sql}) facet_source'
+    )
+    return source, params
+
+
+def _grouping_sets_sql(source):
+    columns = ', '.join(FACETS)
+    sets = ', '.join(f'({facet})' for facet in FACETS)
+    return (
+        f'SELECT GROUPING({columns}), {columns}, COUNT(*) FROM ({source}) f '
+        f'GROUP BY GROUPING SETS ({sets})'
+    )
+
+
+def _union_sql(source):
+    selects = ' UNION ALL '.join(
+        f"SELECT '{facet}', {facet}, COUNT(*) FROM f GROUP BY {facet}" for facet in FACETS
+    )
+    return f'WITH f AS ({source}) {selects}'
+
+
+def _rows(queryset):
+    """Yield ``(facet, value, count)`` tuples from one aggregate query"""
+    connection = connections[queryset.db]
+    source, params = _source_sql(queryset, connection.vendor)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(_grouping_sets_sql(source), params)
+            width = len(FACETS)
+            for row in cursor.fetchall():
+                mask, values, count = row[0], row[1:-1], row[-1]
+                # GROUPING() sets the bit of every column aggregated away, so
+                # the only clear bit names the facet this row belongs to.
+                index = next(i for i in range(width) if not mask & (1 << (width - 1 - i)))
+                yield FACETS[index], values[index], count
+        else:
+            cursor.execute(_union_sql(source), params)
+            yield from cursor.fetchall()
+
+
+def _bucket(value, width):
+    return {'from': value, 'to': value + width}
+
+
+def compute_facets(queryset):
+    year_bucket = settings.VEHICLE_FACET_YEAR_BUCKET
+    rate_band = settings.VEHICLE_FACET_RATE_BAND
+    facets = {facet: [] for facet in FACETS}
+    for facet, value, count in _rows(queryset):
+        if facet == 'year':
+            facets[facet].append({**_bucket(int(value), year_bucket), 'count': count})
+        elif facet == 'daily_rate':
+            start = Decimal(value).quantize(Decimal('0.01'))
+            facets[facet].append({
+                'from': str(start), 'to': str(start + rate_band), 'count': count,
+            })
+        else:
+            facets[facet].append({'value': value, 'count': count})
+    for facet in ('seats', 'year'):
+        facets[facet].sort(key=lambda item: item.get('value', item.get('from')))
+    facets['daily_rate'].sort(key=lambda item: Decimal(item['from']))
+    for facet in ('fuel_type', 'transmission'):
+        facets[facet].sort(key=lambda item: (-item['count'], item['value']))
+    return facets
+
+
+def facet_counts(queryset):
+    """
+    Return counts per facet for ``queryset``.
+
+    Year buckets and rate bands are reported as ``from`` (inclusive) and
+    ``to`` (exclusive) bounds.
+    """
+    sql, params = queryset.order_by().query.get_compiler(using=queryset.db).as_sql()
+    signature = hashlib.sha1(f'{queryset.db}|{sql}|{params!r}'.encode('utf-8')).hexdigest()
+    key = f'vehicle_facets:{signature}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, settings.VEHICLE_FACET_CACHE_TIMEOUT)
+    return facets
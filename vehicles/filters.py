@@ -0,0 +1,18 @@
+import django_filters
+from .models import Vehicle
+
+
+class VehicleFilter(django_filters.FilterSet):
+    """
+    Filters for vehicle listings
+    """
+    seats_min = django_filters.NumberFilter(field_name='seats', lookup_expr='gte')
+    seats_max = django_filters.NumberFilter(field_name='seats', lookup_expr='lte')
+    year_min = django_filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = django_filters.NumberFilter(field_name='year', lookup_expr='lte')
+    daily_rate_min = django_filters.NumberFilter(field_name='daily_rate', lookup_expr='gte')
+    daily_rate_max = django_filters.NumberFilter(field_name='daily_rate', lookup_expr='lte')
+
+    class Meta:
+        model = Vehicle
+        fields = ['fuel_type', 'transmission', 'seats', 'year', 'daily_rate', 'status']
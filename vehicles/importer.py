@@ -0,0 +1,266 @@
+"""
+Streaming bulk import of vehicles.
+
+Rows are read incrementally from CSV, JSON arrays or JSON Lines, validated in
+batches and upserted on ``plate_number`` with one ``bulk_create`` per batch.
+Plate conflicts are resolved with a single ``plate_number__in`` lookup per
+batch, so the number of queries grows with batches rather than rows. The
+lookup locks the plates it finds, existing vehicles are upserted with a
+bumped ``version`` and new plates are plain inserts, so a plate another
+owner registers concurrently is reported as taken instead of overwritten.
+Updates only write the columns a row supplies, with one upsert per
+distinct set of columns in the batch.
+"""
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+
+from core.counters import add_to_counters
+from core.signals import bulk_updated
+
+from .models import Vehicle
+from .serializers import VehicleSerializer
+
+IMPORT_FIELDS = [
+    'make', 'model', 'year', 'plate_number', 'fuel_type', 'transmission',
+    'daily_rate', 'status', 'description', 'mileage', 'color', 'seats',
+]
+
+PLATE_TAKEN_MESSAGE = 'A vehicle with this plate number already exists.'
+
+
+class VehicleImportSerializer(VehicleSerializer):
+    """
+    Row serializer for bulk imports; plate conflicts are checked per batch
+    """
+    owner = None
+    full_name = None
+    plate_number = serializers.CharField(max_length=20)
+
+    class Meta(VehicleSerializer.Meta):
+        fields = IMPORT_FIELDS
+
+    def validate_plate_number(self, value):
+        return value.strip()
+
+
+def iter_csv_rows(lines):
+    """Yield dicts from an iterable of encoded CSV lines"""
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    for row in reader:
+        yield {key: value for key, value in row.items() if key and value not in (None, '')}
+
+
+def iter_json_lines(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise ParseError(f'Invalid JSON line: {exc}')
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array without loading it whole"""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, exhausted = '', 0, False
+
+    def fill():
+        nonlocal buffer, pos, exhausted
+        chunk = stream.read(chunk_size)
+        exhausted = not chunk
+        buffer, pos = buffer[pos:] + text.decode(chunk or b'', final=exhausted), 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if exhausted:
+                raise ParseError('Unexpected end of JSON input.')
+            fill()
+
+    if next_char() != '[':
+        raise ParseError('Expected a JSON array of vehicles.')
+    pos += 1
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError as exc:
+            if exhausted:
+                raise ParseError(f'Invalid JSON: {exc}')
+            fill()
+            continue
+        yield item
+        pos = end
+        separator = next_char()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ParseError('Expected "," or "]" in JSON array.')
+
+
+def read_rows(request):
+    """Pick a row reader for the request body or uploaded file"""
+    upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+    if upload is not None:
+        name = upload.name.lower()
+        if name.endswith('.csv'):
+            return iter_csv_rows(upload)
+        if name.endswith(('.ndjson', '.jsonl')):
+            return iter_json_lines(upload)
+        if name.endswith('.json'):
+            return iter_json_array(upload)
+        raise UnsupportedMediaType(upload.content_type or name)
+
+    content_type = request.content_type.split(';')[0].strip()
+    if content_type == 'text/csv':
+        return iter_csv_rows(request.stream or [])
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        return iter_json_lines(request.stream or [])
+    if content_type == 'application/json':
+        if request.stream is None:
+            raise ParseError('Empty request body.')
+        return iter_json_array(request.stream)
+    raise UnsupportedMediaType(content_type)
+
+
+def _process_batch(owner, batch, seen_plates):
+    results = {}
+    valid = {}
+    for row_number, row in batch:
+        serializer = VehicleImportSerializer(data=row if isinstance(row, dict) else {})
+        if not serializer.is_valid():
+            results[row_number] = {'status': 'error', 'errors': serializer.errors}
+            continue
+        data = serializer.validated_data
+        if data['plate_number'] in seen_plates:
+            results[row_number] = {
+                'status': 'error',
+                'errors': {'plate_number': ['Duplicate plate number in import.']},
+            }
+            continue
+        seen_plates.add(data['plate_number'])
+        valid[row_number] = data
+
+    using = router.db_for_write(Vehicle)
+    with transaction.atomic(using=using):
+        # Lock the batch's plates so they cannot change hands before the upsert
+        existing = {
+            plate: (owner_id, version)
+            for plate, owner_id, version in Vehicle.objects.using(using).select_for_update()
+            .filter(plate_number__in=[data['plate_number'] for data in valid.values()])
+            .values_list('plate_number', 'owner_id', 'version')
+        }
+        updates, creates = {}, {}
+        for row_number, data in valid.items():
+            owner_id, version = existing.get(data['plate_number'], (None, None))
+            if owner_id is not None and owner_id != owner.pk:
+                results[row_number] = {'status': 'error', 'errors': {'plate_number': [PLATE_TAKEN_MESSAGE]}}
+            elif owner_id is not None:
+                # Bump the version so editors holding the old one get a conflict
+                # Only the columns the row supplies are written back
+                fields = tuple(f for f in IMPORT_FIELDS if f in data and f != 'plate_number')
+                updates.setdefault(fields, []).append(Vehicle(owner=owner, version=version + 1, **data))
+                results[row_number] = {'status': 'updated'}
+            else:
+                creates[row_number] = Vehicle(owner=owner, **data)
+
+        for fields, objs in updates.items():
+            Vehicle.objects.using(using).bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['plate_number'],
+                update_fields=[*fields, 'updated_at', 'version'],
+            )
+        while creates:
+            # Plain inserts: a plate registered since the lookup must not be overwritten
+            try:
+                with transaction.atomic(using=using):
+                    Vehicle.objects.using(using).bulk_create(list(creates.values()))
+                break
+            except IntegrityError:
+                taken = set(
+                    Vehicle.objects.using(using)
+                    .filter(plate_number__in=[obj.plate_number for obj in creates.values()])
+                    .values_list('plate_number', flat=True)
+                )
+                if not taken:
+                    raise
+                for row_number, obj in list(creates.items()):
+                    if obj.plate_number in taken:
+                        results[row_number] = {'status': 'error', 'errors': {'plate_number': [PLATE_TAKEN_MESSAGE]}}
+                        del creates[row_number]
+        for row_number in creates:
+            results[row_number] = {'status': 'created'}
+        created = len(creates)
+
+        objs = [obj for objs in updates.values() for obj in objs] + list(creates.values())
+        if objs:
+            # bulk_create skips post_save, so refresh the owner's vehicle count
+            # here and let bulk_updated receivers (search documents, names in
+            # booking lists) catch up on the whole batch.
+            add_to_counters(get_user_model(), {owner.pk: {'vehicle_count': created}}, using)
+            ids = list(
+                Vehicle.objects.using(using).filter(plate_number__in=[obj.plate_number for obj in objs])
+                .values_list('id', flat=True)
+            )
+            bulk_updated.send(sender=Vehicle, ids=ids, fields=IMPORT_FIELDS, using=using)
+
+    for row_number, row in batch:
+        result = {'row': row_number}
+        if isinstance(row, dict) and 'plate_number' in row:
+            result['plate_number'] = row['plate_number']
+        result.update(results[row_number])
+        yield result
+
+
+def import_vehicles(owner, rows):
+    """
+    Upsert ``rows`` for ``owner`` and yield one NDJSON line per row.
+
+    Existing vehicles of the same owner are updated with the row's values,
+    leaving columns the row omits unchanged; plates registered to another owner are rejected. The final line carries
+    a summary of the import.
+    """
+    batch_size = settings.VEHICLE_IMPORT_BATCH_SIZE
+    max_rows = settings.VEHICLE_IMPORT_MAX_ROWS
+    summary = {'created': 0, 'updated': 0, 'error': 0}
+    seen_plates = set()
+    batch = []
+
+    def flush():
+        for result in _process_batch(owner, batch, seen_plates):
+            summary[result['status']] += 1
+            yield json.dumps(result) + '\n'
+        batch.clear()
+
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > max_rows:
+                yield json.dumps({'error': f'Imports are limited to {max_rows} rows.'}) + '\n'
+                break
+            batch.append((row_number, row))
+            if len(batch) >= batch_size:
+                yield from flush()
+    except ParseError as exc:
+        yield from flush()
+        yield json.dumps({'error': str(exc.detail)}) + '\n'
+    yield from flush()
+    yield json.dumps({'summary': {
+        'created': summary['created'], 'updated': summary['updated'], 'failed': summary['error'],
+    }}) + '\n'
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+from core.db.indexes import create_prefix_index, drop_prefix_index
+
+
+def forwards(apps, schema_editor):
+    create_prefix_index(schema_editor.connection, 'vehicles', 'plate_number', 'vehicles_plate_number_prefix_idx')
+
+
+def backwards(apps, schema_editor):
+    drop_prefix_index(schema_editor.connection, 'vehicles_plate_number_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0003_vehicle_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['created_at'], name='vehicles_created_at_idx'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
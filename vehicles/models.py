@@ -1,11 +1,13 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.concurrency import VersionedModelMixin
+from core.counters import CounterFieldsMixin
 
 User = get_user_model()
 
 
-class Vehicle(models.Model):
+class Vehicle(CounterFieldsMixin, VersionedModelMixin, models.Model):
     """
     Vehicle model for car rental system
     """
@@ -46,12 +48,24 @@ class Vehicle(models.Model):
     mileage = models.IntegerField(default=0)
     color = models.CharField(max_length=50, blank=True, null=True)
     seats = models.IntegerField(default=5)
+    # Kept up to date by bookings.counters; see core.counters
+    booking_count = models.PositiveIntegerField(default=0)
+    upcoming_booking_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Bumped on every update; see core.concurrency
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('booking_count', 'upcoming_booking_count', 'revenue')
+
     class Meta:
         db_table = 'vehicles'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='vehicles_created_at_idx'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='vehicles_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.year} {self.make} {self.model} - {self.plate_number}"
@@ -0,0 +1,154 @@
+"""
+Full-text search over vehicles.
+
+PostgreSQL keeps a weighted ``tsvector`` in ``vehicles.search_vector`` behind
+a GIN index. SQLite keeps an FTS5 shadow table, ``vehicles_fts``, whose rowid
+is the vehicle id. Both are refreshed whenever a vehicle is saved; other
+backends fall back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'simple'
+
+SEARCH_FIELDS = ('make', 'model', 'color', 'description', 'fuel_type', 'transmission')
+
+POSTGRES_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(make, '') || ' ' || coalesce(model, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(color, '') || ' ' || year::text || ' ' || "
+    f"fuel_type || ' ' || transmission), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+# Column weights for bm25(), in vehicles_fts column order.
+SQLITE_FTS_COLUMNS = ('make', 'model', 'color', 'year', 'fuel_type', 'transmission', 'description')
+# Fields the search document is built from, on either backend
+INDEXED_FIELDS = frozenset(SQLITE_FTS_COLUMNS)
+SQLITE_BM25_WEIGHTS = '10.0, 10.0, 4.0, 4.0, 4.0, 4.0, 1.0'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def create_search_index(connection):
+    """Create the search column or shadow table and backfill it"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS search_vector tsvector')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS vehicles_search_vector_gin '
+                'ON vehicles USING gin (search_vector)'
+            )
+            cursor.execute(f'UPDATE vehicles SET search_vector = {POSTGRES_VECTOR_SQL}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5("
+                f"{', '.join(SQLITE_FTS_COLUMNS)}, tokenize = 'unicode61')"
+            )
+            cursor.execute(
+                f"INSERT INTO vehicles_fts (rowid, {', '.join(SQLITE_FTS_COLUMNS)}) "
+                f"SELECT id, {', '.join(SQLITE_FTS_COLUMNS)} FROM vehicles"
+            )
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS vehicles_search_vector_gin')
+            cursor.execute('ALTER TABLE vehicles DROP COLUMN IF EXISTS search_vector')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('DROP TABLE IF EXISTS vehicles_fts')
+
+
+def _connection():
+    from .models import Vehicle
+    return connections[router.db_for_write(Vehicle)]
+
+
+def index_vehicles(vehicle_ids):
+    """Refresh the search document of the given vehicles"""
+    vehicle_ids = list(vehicle_ids)
+    if not vehicle_ids:
+        return
+    connection = _connection()
+    placeholders = ', '.join(['%s'] * len(vehicle_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'UPDATE vehicles SET search_vector = {POSTGRES_VECTOR_SQL} WHERE id IN ({placeholders})',
+                vehicle_ids,
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM vehicles_fts WHERE rowid IN ({placeholders})', vehicle_ids)
+            cursor.execute(
+                f"INSERT INTO vehicles_fts (rowid, {', '.join(SQLITE_FTS_COLUMNS)}) "
+                f"SELECT id, {', '.join(SQLITE_FTS_COLUMNS)} FROM vehicles WHERE id IN ({placeholders})",
+                vehicle_ids,
+            )
+
+
+def unindex_vehicles(vehicle_ids):
+    """Drop deleted vehicles from the shadow table (PostgreSQL needs nothing)"""
+    vehicle_ids = list(vehicle_ids)
+    connection = _connection()
+    if not vehicle_ids or connection.vendor != 'sqlite':
+        return
+    placeholders = ', '.join(['%s'] * len(vehicle_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM vehicles_fts WHERE rowid IN ({placeholders})', vehicle_ids)
+
+
+def search_vehicles(queryset, query):
+    """
+    Filter ``queryset`` down to vehicles matching every term of ``query``.
+
+    Matches are annotated with ``search_rank`` (higher is better) and ordered
+    by it. The last term is matched as a prefix on PostgreSQL and SQLite so
+    partially typed words still find results. A blank query returns the
+    queryset unchanged.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        vector = RawSQL('"vehicles"."search_vector"', [], output_field=SearchVectorField())
+        # Tokens are \w+ runs, so quoting them is enough to keep the
+        # tsquery syntax out of user input.
+        terms = ["'%s'" % token for token in tokens]
+        terms[-1] += ':*'
+        search_query = SearchQuery(' & '.join(terms), config=SEARCH_CONFIG, search_type='raw')
+        return (
+            queryset.alias(search_document=vector)
+            .filter(search_document=search_query)
+            .annotate(search_rank=SearchRank(vector, search_query))
+            .order_by('-search_rank', '-created_at')
+        )
+
+    if vendor == 'sqlite':
+        terms = ['"%s"' % token.replace('"', '""') for token in tokens]
+        terms[-1] += '*'
+        match = ' '.join(terms)
+        return (
+            queryset.filter(id__in=RawSQL(
+                'SELECT rowid FROM vehicles_fts WHERE vehicles_fts MATCH %s', [match]
+            ))
+            .annotate(search_rank=RawSQL(
+                f'(SELECT -bm25(vehicles_fts, {SQLITE_BM25_WEIGHTS}) FROM vehicles_fts '
+                f'WHERE vehicles_fts MATCH %s AND vehicles_fts.rowid = "vehicles"."id")',
+                [match], output_field=FloatField(),
+            ))
+            .order_by('-search_rank', '-created_at')
+        )
+
+    for token in tokens:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': token})
+        queryset = queryset.filter(condition)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
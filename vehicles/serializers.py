@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from core.fieldsets import SparseFieldsetMixin
+from core.serializers import BulkUpdateSerializer
+from .availability import next_available_at
 from .models import Vehicle
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Vehicle model
     """
@@ -15,9 +18,17 @@ class VehicleSerializer(serializers.ModelSerializer):
             'id', 'owner', 'make', 'model', 'year', 'plate_number', 
             'fuel_type', 'transmission', 'daily_rate', 'status', 
             'description', 'mileage', 'color', 'seats', 'full_name',
-            'created_at', 'updated_at'
+            'booking_count', 'upcoming_booking_count', 'revenue',
+            'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'owner', 'booking_count', 'upcoming_booking_count', 'revenue',
+            'version', 'created_at', 'updated_at',
+        ]
+        # Columns read by property fields, used to narrow queries
+        read_dependencies = {
+            'full_name': ['year', 'make', 'model'],
+        }
 
     def validate_plate_number(self, value):
         """
@@ -44,17 +55,56 @@ class VehicleSerializer(serializers.ModelSerializer):
         return value
 
 
-class VehicleListSerializer(serializers.ModelSerializer):
+class VehicleBulkUpdateSerializer(BulkUpdateSerializer):
+    """
+    Serializer for changing the status or daily rate of many vehicles
+    """
+    status = serializers.ChoiceField(choices=Vehicle.STATUS_CHOICES, required=False)
+    daily_rate = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def validate_daily_rate(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Daily rate must be greater than zero.")
+        return value
+
+    def validate(self, attrs):
+        if 'status' not in attrs and 'daily_rate' not in attrs:
+            raise serializers.ValidationError('Provide status and/or daily_rate.')
+        return attrs
+
+
+class VehicleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Simplified serializer for vehicle listing
     """
     owner = serializers.ReadOnlyField(source='owner.username')
     full_name = serializers.ReadOnlyField()
+    next_available_at = serializers.DateTimeField(
+        read_only=True, allow_null=True,
+        help_text='When a vehicle booked right now is free again; null if it is not booked now',
+    )
 
     class Meta:
         model = Vehicle
         fields = [
             'id', 'owner', 'make', 'model', 'year', 'plate_number',
             'fuel_type', 'transmission', 'daily_rate', 'status',
-            'color', 'seats', 'full_name', 'created_at'
-        ] 
\ No newline at end of file
+            'color', 'seats', 'full_name', 'created_at', 'next_available_at'
+        ]
+        # Columns read by property fields, used by the fast path and to narrow queries
+        read_dependencies = {
+            'full_name': ['year', 'make', 'model'],
+        }
+        # Only returned when requested with ?fields=
+        optional_fields = ['next_available_at']
+        annotations = {
+            'next_available_at': next_available_at,
+        }
+
+
+class CalendarFeedKeySerializer(serializers.Serializer):
+    """
+    A new calendar feed key and the owner feed URL that uses it
+    """
+    key = serializers.CharField(help_text='Shown only once; add "?key=<key>" to feed URLs')
+    url = serializers.URLField(help_text='Owner calendar feed URL for calendar apps')
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from core.counters import add_to_counters
+from core.signals import bulk_updated
+from core.sync import record_deletions
+from .models import Vehicle
+from .search import INDEXED_FIELDS, index_vehicles, unindex_vehicles
+
+
+@receiver(post_save, sender=Vehicle)
+def update_search_index(sender, instance, **kwargs):
+    """Keep the full-text search document in step with the vehicle row"""
+    index_vehicles([instance.pk])
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_vehicles([instance.pk])
+
+
+@receiver(bulk_updated, sender=Vehicle)
+def update_search_index_in_bulk(sender, ids, fields, **kwargs):
+    if INDEXED_FIELDS.intersection(fields):
+        index_vehicles(ids)
+
+
+@receiver(post_init, sender=Vehicle)
+def remember_owner(sender, instance, **kwargs):
+    instance._counted_owner_id = instance.__dict__.get('owner_id')
+
+
+@receiver(post_save, sender=Vehicle)
+def update_vehicle_count(sender, instance, created, using, raw=False, **kwargs):
+    """Keep the owner's ``vehicle_count`` in step; see core.counters"""
+    if raw:
+        return
+    previous = instance._counted_owner_id
+    if created:
+        deltas = {instance.owner_id: {'vehicle_count': 1}}
+    elif previous is not None and previous != instance.owner_id:
+        deltas = {previous: {'vehicle_count': -1}, instance.owner_id: {'vehicle_count': 1}}
+    else:
+        deltas = {}
+    add_to_counters(get_user_model(), deltas, using)
+    instance._counted_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_from_vehicle_count(sender, instance, using, **kwargs):
+    add_to_counters(get_user_model(), {instance.owner_id: {'vehicle_count': -1}}, using)
+
+
+@receiver(post_delete, sender=Vehicle)
+def leave_tombstone(sender, instance, using, **kwargs):
+    """Tell the owner's synced copies to drop the vehicle"""
+    record_deletions('vehicles', [(instance.pk, instance.owner_id)], using)
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_owner_username(sender, instance, **kwargs):
+    instance._synced_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=get_user_model())
+def touch_renamed_owner_vehicles(sender, instance, created, using, raw=False, **kwargs):
+    """Vehicle rows show the owner's username, so synced copies need them again"""
+    if not raw and not created and instance._synced_username != instance.username:
+        Vehicle.objects.using(using).filter(owner_id=instance.pk).update(updated_at=timezone.now())
+    instance._synced_username = instance.username
@@ -1,9 +1,22 @@
-from django.test import TestCase
+import io
+import json
+from unittest import mock
+from datetime import timedelta, timezone as dt_timezone
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from bookings.models import Booking
+from core.concurrency import VersionConflict
 from .models import Vehicle
+from .facets import facet_counts
+from .importer import iter_json_array
 
 User = get_user_model()
 
@@ -81,6 +94,51 @@ class VehicleAPITest(APITestCase):
         self.vehicle_list_url = reverse('vehicles:vehicle-list-create')
         self.vehicle_detail_url = reverse('vehicles:vehicle-detail', args=[self.vehicle.id])
     
+    def test_vehicle_detail_etag(self):
+        """Test that vehicle details carry the version as ETag"""
+        response = self.client.get(self.vehicle_detail_url)
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(response['ETag'], '"1"')
+
+    def test_update_vehicle_with_if_match(self):
+        """Test that updates based on the current version succeed and bump it"""
+        response = self.client.patch(self.vehicle_detail_url, {'color': 'Red'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_stale_vehicle_update_conflicts(self):
+        """Test that a stale If-Match or body version gets 409 with the current state"""
+        self.client.patch(self.vehicle_detail_url, {'color': 'Red'}, HTTP_IF_MATCH='"1"')
+
+        response = self.client.patch(self.vehicle_detail_url, {'color': 'Blue'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['current']['color'], 'Red')
+        self.assertEqual(response.data['current']['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+
+        response = self.client.patch(self.vehicle_detail_url, {'color': 'Blue', 'version': 1})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.delete(self.vehicle_detail_url, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.color, 'Red')
+
+        response = self.client.patch(self.vehicle_detail_url, {'color': 'Blue'}, HTTP_IF_MATCH='"abc"')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_saves_do_not_overwrite(self):
+        """Test that saving a stale instance raises instead of overwriting"""
+        first = Vehicle.objects.get(pk=self.vehicle.pk)
+        second = Vehicle.objects.get(pk=self.vehicle.pk)
+        first.color = 'Red'
+        first.save()
+        second.color = 'Blue'
+        with self.assertRaises(VersionConflict):
+            second.save()
+        self.vehicle.refresh_from_db()
+        self.assertEqual((self.vehicle.color, self.vehicle.version), ('Red', 2))
+
     def test_list_vehicles(self):
         """Test listing user's vehicles"""
         response = self.client.get(self.vehicle_list_url)
@@ -137,6 +195,15 @@ class VehicleAPITest(APITestCase):
         self.assertEqual(response.data['make'], 'Toyota')
         self.assertEqual(response.data['plate_number'], 'ABC123')
     
+    def test_retrieve_vehicle_counters(self):
+        """Test that vehicle detail carries the booking totals in the same query"""
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(booking_count=3, upcoming_booking_count=1, revenue=250)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.vehicle_detail_url)
+        self.assertEqual(response.data['booking_count'], 3)
+        self.assertEqual(response.data['upcoming_booking_count'], 1)
+        self.assertEqual(response.data['revenue'], '250.00')
+    
     def test_update_vehicle(self):
         """Test updating a vehicle"""
         data = {
@@ -182,3 +249,637 @@ class VehicleAPITest(APITestCase):
         other_vehicle_url = reverse('vehicles:vehicle-detail', args=[other_vehicle.id])
         response = self.client.get(other_vehicle_url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_fast_path_matches_serializer(self):
+        """Test that the fast list path renders the same bytes as the serializer"""
+        Vehicle.objects.create(
+            owner=self.user,
+            make='Honda',
+            model='Civic \u2028 Turbo',
+            year=2021,
+            plate_number='XYZ789',
+            daily_rate=62.5
+        )
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(self.vehicle_list_url).content
+        self.assertEqual(self.client.get(self.vehicle_list_url).content, expected)
+
+    def test_list_vehicles_sparse_fields(self):
+        """Test that ?fields= returns only the requested fields"""
+        params = {'fields': 'id,plate_number,full_name'}
+        response = self.client.get(self.vehicle_list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['results'][0], {'id': self.vehicle.id, 'plate_number': 'ABC123', 'full_name': '2020 Toyota Camry'}
+        )
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            self.assertEqual(self.client.get(self.vehicle_list_url, params).content, response.content)
+
+    def test_batch_retrieve_vehicles(self):
+        """Test fetching several vehicles in request order with missing ids reported"""
+        second = Vehicle.objects.create(
+            owner=self.user, make='Honda', model='City', year=2019, plate_number='LEB-22', daily_rate=40
+        )
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='x')
+        foreign = Vehicle.objects.create(
+            owner=other_user, make='Kia', model='Picanto', year=2022, plate_number='LEC-33', daily_rate=30
+        )
+        url = reverse('vehicles:vehicle-batch')
+        ids = f'{second.id},{foreign.id},{self.vehicle.id},{second.id}'
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': ids, 'fields': 'id,plate_number'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'id': second.id, 'plate_number': 'LEB-22'},
+            {'id': self.vehicle.id, 'plate_number': 'ABC123'},
+        ])
+        self.assertEqual(response.data['missing'], [foreign.id])
+
+    def test_retrieve_vehicle_sparse_fields(self):
+        """Test that ?fields= narrows the vehicle detail query"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.vehicle_detail_url, {'fields': 'id,daily_rate'})
+        self.assertEqual(response.data, {'id': self.vehicle.id, 'daily_rate': '50.00'})
+        self.assertNotIn('"description"', queries.captured_queries[0]['sql'])
+
+
+class VehicleSearchAPITest(APITestCase):
+    """Test cases for vehicle full-text search"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.corolla = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Corolla',
+            year=2020,
+            plate_number='LEA123',
+            daily_rate=50.00,
+            color='White',
+            transmission='automatic',
+            seats=5
+        )
+        self.manual_corolla = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Corolla',
+            year=2018,
+            plate_number='LEB456',
+            daily_rate=40.00,
+            color='Black',
+            transmission='manual',
+            seats=5
+        )
+        self.civic = Vehicle.objects.create(
+            owner=self.user,
+            make='Honda',
+            model='Civic',
+            year=2021,
+            plate_number='LEC789',
+            daily_rate=45.00,
+            color='White',
+            transmission='automatic',
+            description='Spacious family sedan',
+            seats=5
+        )
+        self.client.force_authenticate(user=self.user)
+        self.search_url = reverse('vehicles:vehicle-search')
+
+    def test_search_matches_all_terms(self):
+        """Test that every search term must match"""
+        response = self.client.get(self.search_url, {'q': 'white automatic corolla'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([v['id'] for v in response.data['results']], [self.corolla.id])
+
+    def test_search_ranks_results(self):
+        """Test that results are ordered by relevance"""
+        response = self.client.get(self.search_url, {'q': 'white'})
+        ids = [v['id'] for v in response.data['results']]
+        self.assertCountEqual(ids, [self.corolla.id, self.civic.id])
+
+        response = self.client.get(self.search_url, {'q': 'family'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.civic.id])
+
+    def test_search_combines_with_filters(self):
+        """Test combining search with structured filters"""
+        response = self.client.get(self.search_url, {'q': 'corolla', 'transmission': 'manual'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.manual_corolla.id])
+
+    def test_search_index_follows_vehicle_save(self):
+        """Test that updating a vehicle refreshes its search document"""
+        self.civic.color = 'Red'
+        self.civic.save()
+        response = self.client.get(self.search_url, {'q': 'red'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.civic.id])
+
+        self.civic.delete()
+        response = self.client.get(self.search_url, {'q': 'civic'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_only_finds_available_vehicles(self):
+        """Test that rented or maintained vehicles, including other owners', are not searchable"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        Vehicle.objects.create(
+            owner=other, make='Toyota', model='Corolla', year=2022, plate_number='LED321',
+            daily_rate=55.00, color='White', transmission='automatic', seats=5, status='maintenance',
+        )
+        self.manual_corolla.status = 'rented'
+        self.manual_corolla.save()
+        response = self.client.get(self.search_url, {'q': 'corolla'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.corolla.id])
+
+    def test_search_matches_last_term_as_prefix(self):
+        """Test that a partially typed last term still matches"""
+        response = self.client.get(self.search_url, {'q': 'white coro'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.corolla.id])
+        response = self.client.get(self.search_url, {'q': 'coro white'})
+        self.assertEqual(response.data['results'], [])
+
+
+class VehicleFacetAPITest(APITestCase):
+    """Test cases for vehicle filters and facet counts"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        specs = [
+            ('Toyota', 'Corolla', 2018, 'petrol', 'automatic', 5, 40),
+            ('Toyota', 'Prius', 2021, 'hybrid', 'automatic', 5, 75),
+            ('Honda', 'Civic', 2022, 'petrol', 'manual', 5, 55),
+            ('Toyota', 'Hiace', 2016, 'diesel', 'manual', 12, 120),
+        ]
+        for index, (make, model, year, fuel, transmission, seats, rate) in enumerate(specs):
+            Vehicle.objects.create(
+                owner=self.user, make=make, model=model, year=year,
+                plate_number=f'FAC{index}', fuel_type=fuel, transmission=transmission,
+                seats=seats, daily_rate=rate
+            )
+        self.client.force_authenticate(user=self.user)
+        self.vehicle_list_url = reverse('vehicles:vehicle-list-create')
+
+    def test_filterset_ranges(self):
+        """Test range filters on seats, year and daily rate, and exact daily rate"""
+        response = self.client.get(self.vehicle_list_url, {'seats_min': 6})
+        self.assertEqual([v['model'] for v in response.data['results']], ['Hiace'])
+
+        response = self.client.get(self.vehicle_list_url, {'year_min': 2020, 'daily_rate_max': 60})
+        self.assertEqual([v['model'] for v in response.data['results']], ['Civic'])
+
+        response = self.client.get(self.vehicle_list_url, {'daily_rate': 75})
+        self.assertEqual([v['model'] for v in response.data['results']], ['Prius'])
+
+    def test_facet_counts(self):
+        """Test facet counts for every facet"""
+        response = self.client.get(self.vehicle_list_url, {'facets': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        facets = response.data['facets']
+        self.assertEqual(facets['fuel_type'][0], {'value': 'petrol', 'count': 2})
+        self.assertEqual(facets['transmission'], [
+            {'value': 'automatic', 'count': 2},
+            {'value': 'manual', 'count': 2},
+        ])
+        self.assertEqual(facets['seats'], [{'value': 5, 'count': 3}, {'value': 12, 'count': 1}])
+        self.assertEqual(facets['year'], [
+            {'from': 2015, 'to': 2020, 'count': 2},
+            {'from': 2020, 'to': 2025, 'count': 2},
+        ])
+        self.assertEqual(facets['daily_rate'], [
+            {'from': '0.00', 'to': '50.00', 'count': 1},
+            {'from': '50.00', 'to': '100.00', 'count': 2},
+            {'from': '100.00', 'to': '150.00', 'count': 1},
+        ])
+
+    def test_facets_follow_filters(self):
+        """Test that facet counts reflect the active filters"""
+        response = self.client.get(self.vehicle_list_url, {'facets': '1', 'transmission': 'manual'})
+        facets = response.data['facets']
+        self.assertEqual(sum(item['count'] for item in facets['fuel_type']), 2)
+        self.assertEqual(facets['transmission'], [{'value': 'manual', 'count': 2}])
+
+    def test_facets_use_one_cached_query(self):
+        """Test that all facets come from one query and are cached"""
+        queryset = Vehicle.objects.filter(owner=self.user)
+        with self.assertNumQueries(1):
+            facet_counts(queryset)
+        with self.assertNumQueries(0):
+            facet_counts(queryset)
+
+
+class VehicleImportAPITest(APITestCase):
+    """Test cases for bulk vehicle import"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='pass123'
+        )
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Camry',
+            year=2020,
+            plate_number='ABC123',
+            daily_rate=50.00
+        )
+        Vehicle.objects.create(
+            owner=self.other_user,
+            make='Honda',
+            model='City',
+            year=2019,
+            plate_number='OTH999',
+            daily_rate=35.00
+        )
+        self.client.force_authenticate(user=self.user)
+        self.import_url = reverse('vehicles:vehicle-import')
+
+    def _results(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return [json.loads(line) for line in lines]
+
+    def test_import_csv(self):
+        """Test importing CSV rows with creates, updates and errors"""
+        body = (
+            'make,model,year,plate_number,daily_rate,transmission\n'
+            'Honda,Civic,2021,XYZ789,45.00,automatic\n'
+            'Toyota,Camry,2020,ABC123,65.00,manual\n'
+            'Suzuki,Alto,2022,OTH999,20.00,manual\n'
+            'Kia,Picanto,2022,KIA111,-5,manual\n'
+            'Honda,Civic,2021,XYZ789,47.00,automatic\n'
+        )
+        response = self.client.generic('POST', self.import_url, body, content_type='text/csv')
+        results = self._results(response)
+
+        self.assertEqual([r.get('status') for r in results[:5]], ['created', 'updated', 'error', 'error', 'error'])
+        self.assertIn('daily_rate', results[3]['errors'])
+        self.assertEqual(results[-1], {'summary': {'created': 1, 'updated': 1, 'failed': 3}})
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(str(self.vehicle.daily_rate), '65.00')
+        self.assertEqual(self.vehicle.version, 2)
+        self.assertTrue(Vehicle.objects.filter(plate_number='XYZ789', owner=self.user).exists())
+        self.assertEqual(Vehicle.objects.get(plate_number='OTH999').owner, self.other_user)
+
+    def test_import_partial_rows_keep_other_columns(self):
+        """Test that updating from a row with fewer columns leaves the others unchanged"""
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(status='rented', mileage=12345, color='Red', seats=7)
+        second = Vehicle.objects.create(
+            owner=self.user, make='Honda', model='Civic', year=2021, plate_number='DEF456',
+            daily_rate=45.00, color='Blue', mileage=500,
+        )
+        rows = '\n'.join(json.dumps(row) for row in [
+            {'make': 'Toyota', 'model': 'Camry', 'year': 2020, 'plate_number': 'ABC123', 'daily_rate': '65.00'},
+            {'make': 'Honda', 'model': 'Civic', 'year': 2021, 'plate_number': 'DEF456', 'daily_rate': '45.00', 'color': 'Green'},
+        ])
+        results = self._results(self.client.post(self.import_url, rows, content_type='application/x-ndjson'))
+        self.assertEqual([r['status'] for r in results[:2]], ['updated', 'updated'])
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(str(self.vehicle.daily_rate), '65.00')
+        self.assertEqual(
+            (self.vehicle.status, self.vehicle.mileage, self.vehicle.color, self.vehicle.seats),
+            ('rented', 12345, 'Red', 7),
+        )
+        second.refresh_from_db()
+        self.assertEqual((second.color, second.mileage), ('Green', 500))
+
+    def test_import_json_array(self):
+        """Test importing a streamed JSON array"""
+        rows = [
+            {'make': 'Honda', 'model': 'Civic', 'year': 2021, 'plate_number': f'JSN{i:03}', 'daily_rate': '45.00'}
+            for i in range(30)
+        ]
+        response = self.client.post(self.import_url, json.dumps(rows), content_type='application/json')
+        results = self._results(response)
+        self.assertEqual(results[-1]['summary']['created'], 30)
+        self.assertEqual(Vehicle.objects.filter(plate_number__startswith='JSN').count(), 30)
+
+    def test_json_array_reader_handles_chunk_boundaries(self):
+        """Test that the incremental JSON reader copes with split elements"""
+        rows = [{'plate_number': f'P{i}', 'notes': 'x' * i} for i in range(20)]
+        stream = io.BytesIO(json.dumps(rows, indent=2).encode())
+        self.assertEqual(list(iter_json_array(stream, chunk_size=7)), rows)
+
+    def test_import_queries_scale_with_batches(self):
+        """Test that validation and upsert are done per batch, not per row"""
+        rows = '\n'.join(
+            json.dumps({'make': 'Kia', 'model': 'Rio', 'year': 2020, 'plate_number': f'NDJ{i:03}', 'daily_rate': 30})
+            for i in range(50)
+        )
+        with override_settings(VEHICLE_IMPORT_BATCH_SIZE=500), CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.import_url, rows, content_type='application/x-ndjson')
+            results = self._results(response)
+        self.assertEqual(results[-1]['summary']['created'], 50)
+        self.assertLess(len(queries), 15)
+
+    def test_imported_vehicles_are_searchable(self):
+        """Test that imported vehicles are added to the search index"""
+        body = 'make,model,year,plate_number,daily_rate\nSuzuki,Swift,2021,SWF001,30\n'
+        self._results(self.client.generic('POST', self.import_url, body, content_type='text/csv'))
+        response = self.client.get(reverse('vehicles:vehicle-search'), {'q': 'swift'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_import_does_not_take_over_concurrently_registered_plate(self):
+        """Test that a plate another owner registers after the lookup is reported, not overwritten"""
+        bulk_create = QuerySet.bulk_create
+
+        def register_first(queryset, objs, *args, **kwargs):
+            # Runs between the plate lookup and the inserts of new plates
+            if kwargs.get('update_conflicts'):
+                Vehicle.objects.create(
+                    owner=self.other_user, make='Suzuki', model='Alto', year=2022,
+                    plate_number='RACE1', daily_rate=20,
+                )
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        body = (
+            'make,model,year,plate_number,daily_rate\n'
+            'Toyota,Camry,2020,ABC123,65\nKia,Rio,2020,RACE1,30\nKia,Rio,2020,RACE2,30\n'
+        )
+        with mock.patch.object(QuerySet, 'bulk_create', register_first):
+            results = self._results(self.client.generic('POST', self.import_url, body, content_type='text/csv'))
+
+        self.assertEqual([r['status'] for r in results[:3]], ['updated', 'error', 'created'])
+        race = Vehicle.objects.get(plate_number='RACE1')
+        self.assertEqual((race.owner, race.make), (self.other_user, 'Suzuki'))
+        self.assertEqual(Vehicle.objects.get(plate_number='RACE2').owner, self.user)
+
+    def test_import_rejects_unknown_content_type(self):
+        """Test that unsupported formats are rejected"""
+        response = self.client.generic('POST', self.import_url, 'data', content_type='application/xml')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class VehicleCalendarAPITest(APITestCase):
+    """Test cases for the iCalendar booking feeds"""
+
+    def setUp(self):
+        from bookings.models import Booking
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user, make='Toyota', model='Corolla', year=2021, plate_number='LEA-1', daily_rate=50
+        )
+        self.second_vehicle = Vehicle.objects.create(
+            owner=self.user, make='Honda', model='Civic', year=2022, plate_number='LEB-2', daily_rate=60
+        )
+        self.start = timezone.now() + timedelta(days=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking = Booking.objects.create(
+                customer=self.other_user, vehicle=self.vehicle, start_date=self.start,
+                end_date=self.start + timedelta(days=2), total_amount=100, status='confirmed',
+            )
+            Booking.objects.create(
+                customer=self.other_user, vehicle=self.second_vehicle, start_date=self.start,
+                end_date=self.start + timedelta(days=1), total_amount=60,
+            )
+            Booking.objects.create(
+                customer=self.other_user, vehicle=self.vehicle, start_date=self.start + timedelta(days=10),
+                end_date=self.start + timedelta(days=11), total_amount=50, status='cancelled',
+            )
+        self.url = reverse('vehicles:vehicle-calendar', args=[self.vehicle.id])
+        self.client.force_authenticate(user=self.user)
+
+    def test_vehicle_feed(self):
+        """Test that the vehicle feed streams its non-cancelled bookings"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'))
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:booking-{self.booking.id}@lahore-car-rental', content)
+        self.assertIn(f"DTSTART:{self.start.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}", content)
+        self.assertIn('SUMMARY:Booking #%d: 2021 Toyota Corolla (LEA-1)' % self.booking.id, content)
+        self.assertIn('STATUS:CONFIRMED', content)
+        self.assertTrue(response['ETag'])
+
+    def test_owner_feed(self):
+        """Test that the owner feed covers every vehicle of the owner"""
+        response = self.client.get(reverse('vehicles:owner-calendar'), HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+        self.assertIn('STATUS:TENTATIVE', content)
+
+    def test_unchanged_feed_is_cached_and_not_modified(self):
+        """Test that repeat polls are served from the cache or with 304"""
+        response = self.client.get(self.url)
+        content = b''.join(response.streaming_content)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, content)
+        self.assertFalse([q for q in queries if 'bookings' in q['sql']])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_booking_change_invalidates_feed(self):
+        """Test that a committed booking change produces a new ETag and content"""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.status = 'cancelled'
+            self.booking.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn(b'BEGIN:VEVENT', b''.join(response.streaming_content))
+
+        owner_etag = self.client.get(reverse('vehicles:owner-calendar'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second_vehicle.color = 'Red'
+            self.second_vehicle.save()
+        self.assertNotEqual(self.client.get(reverse('vehicles:owner-calendar'))['ETag'], owner_etag)
+
+    def test_feed_of_other_owner_vehicle(self):
+        """Test that feeds of other owners' vehicles are not found"""
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_feed_key(self):
+        """Test that feeds can be read with a feed key instead of a JWT until it is rotated or revoked"""
+        response = self.client.post(reverse('vehicles:calendar-feed-key'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        key = response.data['key']
+        self.assertTrue(response.data['url'].endswith(f'/calendar.ics?key={key}'))
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url, {'key': key})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('vehicles:owner-calendar'), {'key': key}).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        new_key = self.client.post(reverse('vehicles:calendar-feed-key')).data['key']
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url, {'key': key}).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.url, {'key': new_key}).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.delete(reverse('vehicles:calendar-feed-key'))
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url, {'key': new_key}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_long_lines_are_folded(self):
+        """Test that content lines longer than 75 octets are folded"""
+        from bookings.calendar import content_line
+        line = content_line('SUMMARY:' + 'é' * 80)
+        for part in line.split(b'\r\n')[:-1]:
+            self.assertLessEqual(len(part), 75)
+        self.assertEqual(line.replace(b'\r\n ', b'').decode('utf-8'), 'SUMMARY:' + 'é' * 80 + '\r\n')
+
+
+class VehicleNextAvailableTest(APITestCase):
+    """Test cases for the optional next_available_at list field"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('vehicles:vehicle-list-create')
+        self.now = timezone.now()
+        self.booked = self.create_vehicle('NXT-1')
+        self.free = self.create_vehicle('NXT-2')
+
+    def create_vehicle(self, plate_number):
+        return Vehicle.objects.create(
+            owner=self.user, make='Kia', model='Picanto', year=2021, plate_number=plate_number, daily_rate=30,
+        )
+
+    def book(self, vehicle, start_days, end_days, status='confirmed'):
+        booking = Booking(
+            customer=self.user, vehicle=vehicle, status=status, total_amount=60,
+            start_date=self.now + timedelta(days=start_days), end_date=self.now + timedelta(days=end_days),
+        )
+        booking.save(validate=False)
+        return booking
+
+    def next_available(self, fast):
+        with override_settings(FAST_LIST_SERIALIZATION=fast):
+            response = self.client.get(self.url, {'fields': 'plate_number,next_available_at'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['plate_number']: row['next_available_at'] for row in response.data['results']}
+
+    def test_end_of_back_to_back_bookings(self):
+        """Test that a booked vehicle is free when its run of adjoining bookings ends"""
+        self.book(self.booked, -1, 2, status='active')
+        last = self.book(self.booked, 2, 4)
+        self.book(self.booked, 6, 8)
+        self.book(self.booked, 4, 5, status='cancelled')
+        self.book(self.free, 3, 5)
+
+        expected = last.end_date.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+        for fast in (True, False):
+            self.assertEqual(self.next_available(fast), {'NXT-1': expected, 'NXT-2': None})
+
+    def test_not_returned_unless_requested(self):
+        """Test that the field and its subqueries are left out by default"""
+        self.book(self.booked, -1, 2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertNotIn('next_available_at', response.data['results'][0])
+        self.assertFalse(any('bookings' in query['sql'] for query in queries))
+
+
+class VehicleBulkUpdateAPITest(APITestCase):
+    """Test cases for updating many vehicles at once"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.vehicles = [
+            Vehicle.objects.create(
+                owner=self.user, make='Honda', model='City', year=2019,
+                plate_number=f'CTY-{index}', daily_rate=45,
+            )
+            for index in range(3)
+        ]
+        self.foreign = Vehicle.objects.create(
+            owner=self.other, make='Honda', model='City', year=2019, plate_number='CTY-X', daily_rate=45,
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse('vehicles:vehicle-bulk-update')
+
+    def test_bulk_update_rate_and_status(self):
+        """Test that rate and status change for the user's vehicles only"""
+        ids = [vehicle.id for vehicle in self.vehicles] + [self.foreign.id]
+        response = self.client.patch(self.url, {'ids': ids, 'daily_rate': '55.50', 'status': 'maintenance'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 3})
+        for vehicle in self.vehicles:
+            vehicle.refresh_from_db()
+            self.assertEqual(str(vehicle.daily_rate), '55.50')
+            self.assertEqual(vehicle.status, 'maintenance')
+            self.assertEqual(vehicle.version, 2)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'available')
+
+    def test_bulk_update_validation(self):
+        """Test that a change and a positive rate are required"""
+        ids = [self.vehicles[0].id]
+        response = self.client.patch(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(self.url, {'ids': ids, 'daily_rate': '0'}, format='json')
+        self.assertIn('daily_rate', response.data)
+        with override_settings(BULK_UPDATE_MAX_IDS=2):
+            response = self.client.patch(self.url, {'ids': [1, 2, 3], 'status': 'available'}, format='json')
+        self.assertIn('ids', response.data)
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class VehicleSyncAPITest(APITestCase):
+    """Test cases for delta sync of the vehicle list"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.kept, self.sold = [
+            Vehicle.objects.create(
+                owner=self.user, make='Toyota', model='Yaris', year=2021, plate_number=f'YRS-{index}', daily_rate=60,
+            )
+            for index in range(2)
+        ]
+        Vehicle.objects.create(
+            owner=self.other, make='Toyota', model='Yaris', year=2021, plate_number='YRS-X', daily_rate=60,
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse('vehicles:vehicle-sync')
+
+    def test_sync_reports_deletes_and_owner_renames(self):
+        """Test that deleted vehicles come back as ids and renaming the owner resends the rest"""
+        data = self.client.get(self.url).data
+        self.assertEqual([row['id'] for row in data['results']], [self.kept.id, self.sold.id])
+
+        response = self.client.delete(reverse('vehicles:vehicle-detail', args=[self.sold.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        data = self.client.get(self.url, {'since': data['cursor']}).data
+        self.assertEqual((data['results'], data['deleted']), ([], [self.sold.id]))
+
+        self.user.username = 'fleet'
+        self.user.save()
+        data = self.client.get(self.url, {'since': data['cursor'], 'fields': 'id,owner'}).data
+        self.assertEqual(data['results'], [{'id': self.kept.id, 'owner': 'fleet'}])
+        self.assertEqual(data['deleted'], [])
@@ -5,5 +5,13 @@ app_name = 'vehicles'
 
 urlpatterns = [
     path('', views.VehicleListCreateView.as_view(), name='vehicle-list-create'),
+    path('import/', views.VehicleImportView.as_view(), name='vehicle-import'),
+    path('sync/', views.VehicleSyncView.as_view(), name='vehicle-sync'),
+    path('batch/', views.VehicleBatchView.as_view(), name='vehicle-batch'),
+    path('bulk/', views.VehicleBulkUpdateView.as_view(), name='vehicle-bulk-update'),
+    path('search/', views.VehicleSearchView.as_view(), name='vehicle-search'),
+    path('calendar.ics', views.OwnerCalendarView.as_view(), name='owner-calendar'),
+    path('calendar/key/', views.CalendarFeedKeyView.as_view(), name='calendar-feed-key'),
     path('<int:pk>/', views.VehicleDetailView.as_view(), name='vehicle-detail'),
+    path('<int:pk>/calendar.ics', views.VehicleCalendarView.as_view(), name='vehicle-calendar'),
 ] 
\ No newline at end of file
@@ -1,10 +1,51 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from bookings.calendar import FeedKeyAuthentication, feed_response, revoke_feed_key, rotate_feed_key
+from core.concurrency import CONFLICT_RESPONSE, IF_MATCH_PARAMETER, OptimisticConcurrencyMixin
+from core.fastpath import FastListMixin
+from core.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetViewMixin
+from core.renderers import FastJSONRenderer, ICalendarRenderer
+from core.serializers import BulkUpdateResultSerializer
+from core.views import (
+    IDS_PARAMETER, SINCE_PARAMETER, SYNC_ERROR_RESPONSES, BatchRetrieveAPIView, DeltaSyncAPIView,
+    batch_response_serializer, sync_response_serializer,
+)
 from .models import Vehicle
-from .serializers import VehicleSerializer, VehicleListSerializer
+from .bulk import update_vehicles
+from .serializers import CalendarFeedKeySerializer, VehicleBulkUpdateSerializer, VehicleSerializer, VehicleListSerializer
+from .search import search_vehicles
+from .filters import VehicleFilter
+from .facets import facet_counts
+from .importer import VehicleImportSerializer, import_vehicles, read_rows
+
+
+FACETS_PARAMETER = OpenApiParameter(
+    name='facets',
+    description='Set to 1 to include counts per fuel type, transmission, seats, year bucket and daily rate band',
+    required=False,
+    type=bool,
+)
+
+
+class VehicleFacetMixin:
+    """
+    Add facet counts for the filtered queryset to list responses on request
+    """
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets', '').lower() in ('1', 'true', 'yes'):
+            response.data['facets'] = facet_counts(self.filter_queryset(self.get_queryset()))
+        return response
 
 
 @extend_schema_view(
@@ -12,6 +53,7 @@ from .serializers import VehicleSerializer, VehicleListSerializer
         tags=['Vehicles'],
         summary='List user vehicles',
         description='List user vehicles',
+        parameters=[FACETS_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
         responses={200: VehicleListSerializer}
     ),
     post=extend_schema(
@@ -25,12 +67,14 @@ from .serializers import VehicleSerializer, VehicleListSerializer
         }
     )
 )
-class VehicleListCreateView(generics.ListCreateAPIView):
+class VehicleListCreateView(VehicleFacetMixin, FastListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     List all vehicles owned by the authenticated user
     Create a new vehicle
     """
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = VehicleFilter
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -49,30 +93,34 @@ class VehicleListCreateView(generics.ListCreateAPIView):
         tags=['Vehicles'],
         summary='Get vehicle details',
         description='Get vehicle details',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={200: VehicleSerializer}
     ),
     put=extend_schema(
         tags=['Vehicles'],
         summary='Update vehicle',
         description='Update vehicle',
+        parameters=[IF_MATCH_PARAMETER],
         request=VehicleSerializer,
-        responses={200: VehicleSerializer}
+        responses={200: VehicleSerializer, 409: CONFLICT_RESPONSE}
     ),
     patch=extend_schema(
         tags=['Vehicles'],
         summary='Partially update vehicle',
         description='Partially update vehicle',
+        parameters=[IF_MATCH_PARAMETER],
         request=VehicleSerializer,
-        responses={200: VehicleSerializer}
+        responses={200: VehicleSerializer, 409: CONFLICT_RESPONSE}
     ),
     delete=extend_schema(
         tags=['Vehicles'],
         summary='Delete vehicle',
         description='Delete vehicle',
-        responses={204: None}
+        parameters=[IF_MATCH_PARAMETER],
+        responses={204: None, 409: CONFLICT_RESPONSE}
     )
 )
-class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VehicleDetailView(OptimisticConcurrencyMixin, SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a vehicle
     """
@@ -82,13 +130,237 @@ class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Vehicle.objects.filter(owner=self.request.user)
     
-    def get_object(self):
-        vehicle_id = self.kwargs.get('pk')
-        return get_object_or_404(Vehicle, id=vehicle_id, owner=self.request.user)
-    
     def destroy(self, request, *args, **kwargs):
         vehicle = self.get_object()
+        # Also leaves the tombstone delta sync reports (vehicles.signals)
         vehicle.delete()
         return Response({
             'message': 'Vehicle deleted successfully'
         }, status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(
+    tags=['Vehicles'],
+    summary='Update several vehicles',
+    description=(
+        'Set the status and/or daily rate of several of your vehicles in a single update. '
+        'Ids that are not yours are skipped.'
+    ),
+    request=VehicleBulkUpdateSerializer,
+    responses={200: BulkUpdateResultSerializer, 400: VehicleBulkUpdateSerializer},
+)
+class VehicleBulkUpdateView(generics.GenericAPIView):
+    """
+    Update many of the authenticated user's vehicles at once
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VehicleBulkUpdateSerializer
+
+    def get_queryset(self):
+        return Vehicle.objects.filter(owner=self.request.user)
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        values = dict(serializer.validated_data)
+        ids = values.pop('ids')
+        updated = update_vehicles(self.get_queryset().filter(id__in=ids), **values)
+        return Response({'updated': updated})
+
+
+@extend_schema(
+    tags=['Vehicles'],
+    summary='Get several vehicles',
+    description='Get several of your vehicles by id in one request; unknown ids are listed under "missing"',
+    parameters=[IDS_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
+    responses={200: batch_response_serializer('VehicleBatchResponse', VehicleSerializer)},
+)
+class VehicleBatchView(SparseFieldsetViewMixin, BatchRetrieveAPIView):
+    """
+    Retrieve several vehicles by id
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VehicleSerializer
+
+    def get_queryset(self):
+        return Vehicle.objects.filter(owner=self.request.user)
+
+
+@extend_schema(
+    tags=['Vehicles'],
+    summary='Sync vehicles',
+    description=(
+        'Your vehicles (as in the list) created or changed since the "since" cursor, plus the ids of vehicles '
+        'deleted since. Leave out "since" for a full sync, then keep the returned cursor and sync again while '
+        '"has_more" is true. Rows may be sent more than once; apply them as upserts.'
+    ),
+    parameters=[SINCE_PARAMETER, *SPARSE_FIELDSET_PARAMETERS],
+    responses={200: sync_response_serializer('VehicleSyncResponse', VehicleListSerializer), **SYNC_ERROR_RESPONSES},
+)
+class VehicleSyncView(DeltaSyncAPIView):
+    """
+    Delta sync of the vehicle list
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VehicleListSerializer
+    sync_resource = 'vehicles'
+
+    def get_queryset(self):
+        return Vehicle.objects.filter(owner=self.request.user).select_related('owner')
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Vehicles'],
+        summary='Search vehicles',
+        description=(
+            'Full-text search across make, model, color and description of available vehicles, '
+            'ranked by relevance. The last term matches as a prefix.'
+        ),
+        parameters=[
+            OpenApiParameter(name='q', description='Search terms, e.g. "white automatic corolla"', required=False, type=str),
+            OpenApiParameter(name='fuel_type', description='Filter by fuel type', required=False, type=str),
+            OpenApiParameter(name='transmission', description='Filter by transmission', required=False, type=str),
+            OpenApiParameter(name='seats', description='Filter by number of seats', required=False, type=int),
+            FACETS_PARAMETER,
+            *SPARSE_FIELDSET_PARAMETERS,
+        ],
+        responses={200: VehicleListSerializer}
+    )
+)
+class VehicleSearchView(VehicleFacetMixin, FastListMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Search available vehicles, optionally combined with structured filters
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VehicleListSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = VehicleFilter
+
+    def get_queryset(self):
+        queryset = Vehicle.objects.filter(status='available').select_related('owner')
+        return search_vehicles(queryset, self.request.query_params.get('q', ''))
+
+
+@extend_schema(
+    tags=['Vehicles'],
+    summary='Bulk import vehicles',
+    description=(
+        'Upsert vehicles from CSV (text/csv), a JSON array (application/json), '
+        'JSON Lines (application/x-ndjson) or an uploaded "file". Rows are keyed on '
+        'plate_number; one NDJSON result line is streamed back per row, followed by a summary.'
+    ),
+    request={
+        'text/csv': VehicleImportSerializer(many=True),
+        'application/json': VehicleImportSerializer(many=True),
+        'application/x-ndjson': VehicleImportSerializer,
+    },
+    responses={200: None},
+)
+class VehicleImportView(generics.GenericAPIView):
+    """
+    Bulk create or update the authenticated user's vehicles
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VehicleImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        rows = read_rows(request)
+        return StreamingHttpResponse(
+            import_vehicles(request.user, rows),
+            content_type='application/x-ndjson',
+        )
+
+
+CALENDAR_RESPONSES = {(200, 'text/calendar'): OpenApiTypes.STR, 304: None}
+
+
+class CalendarFeedView(APIView):
+    """
+    Base view for iCalendar feeds; answers conditional requests with 304
+    """
+    authentication_classes = [JWTAuthentication, FeedKeyAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [ICalendarRenderer, FastJSONRenderer]
+
+
+@extend_schema_view(
+    post=extend_schema(
+        tags=['Vehicles'],
+        summary='Create calendar feed key',
+        description=(
+            'Create a new key for subscribing to your calendar feeds without a JWT and return it with the '
+            'owner feed URL; add "?key=<key>" to vehicle feed URLs too. URLs with an older key stop working.'
+        ),
+        request=None,
+        responses={201: CalendarFeedKeySerializer},
+    ),
+    delete=extend_schema(
+        tags=['Vehicles'],
+        summary='Revoke calendar feed key',
+        description='Revoke your calendar feed key; feeds then need a JWT again',
+        responses={204: None},
+    ),
+)
+class CalendarFeedKeyView(APIView):
+    """
+    Rotate or revoke the authenticated owner's calendar feed key
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        key = rotate_feed_key(request.user)
+        url = request.build_absolute_uri(reverse('vehicles:owner-calendar'))
+        serializer = CalendarFeedKeySerializer({'key': key, 'url': f'{url}?key={key}'})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        revoke_feed_key(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Vehicles'],
+        operation_id='vehicles_calendar_retrieve',
+        summary='Vehicle booking calendar',
+        description=(
+            'iCalendar feed of the bookings of one of your vehicles. Send If-None-Match with the last ETag; '
+            'unchanged feeds are answered with 304.'
+        ),
+        responses=CALENDAR_RESPONSES,
+    )
+)
+class VehicleCalendarView(CalendarFeedView):
+    """
+    iCalendar feed for one vehicle
+    """
+
+    def get(self, request, pk):
+        vehicle = get_object_or_404(
+            Vehicle.objects.filter(owner=request.user).only('id', 'year', 'make', 'model'), pk=pk
+        )
+        return feed_response(request, f'vehicle:{vehicle.pk}', vehicle.full_name, [vehicle.pk])
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Vehicles'],
+        operation_id='vehicles_owner_calendar_retrieve',
+        summary='Owner booking calendar',
+        description=(
+            'iCalendar feed of the bookings of all your vehicles. Send If-None-Match with the last ETag; '
+            'unchanged feeds are answered with 304.'
+        ),
+        responses=CALENDAR_RESPONSES,
+    )
+)
+class OwnerCalendarView(CalendarFeedView):
+    """
+    iCalendar feed for all vehicles of the authenticated owner
+    """
+
+    def get(self, request):
+        vehicle_ids = list(Vehicle.objects.filter(owner=request.user).values_list('id', flat=True))
+        name = f'{request.user.username} - vehicle bookings'
+        return feed_response(request, f'owner:{request.user.pk}', name, vehicle_ids)
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import OutboxEvent, WebhookEndpoint
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'events', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'url')
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'endpoint', 'event_type', 'booking_id', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('status', 'event_type', 'endpoint')
+    search_fields = ('booking_id',)
+    list_select_related = ('endpoint',)
+    readonly_fields = ('created_at', 'delivered_at')
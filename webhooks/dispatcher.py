@@ -0,0 +1,203 @@
+"""
+Batched webhook delivery.
+
+Each batch leases due outbox rows with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and commits straight away, so several dispatchers can run side by
+side and no transaction or row lock is held while events are posted. The
+events are posted concurrently with asyncio, and the outcomes are written
+back in a second short transaction, skipping rows whose lease has since
+run out and been taken over. Only the oldest undelivered event of each
+(endpoint, booking) pair is eligible, so a booking's events reach an
+endpoint in the order they happened even across retries.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import ssl
+import uuid
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+
+class DeliveryError(Exception):
+    """The endpoint could not be reached or did not answer with 2xx"""
+
+
+def sign(secret, timestamp, body):
+    message = f'{timestamp}.'.encode('utf-8') + body
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def event_body(event):
+    return json.dumps({
+        'id': event.pk,
+        'type': event.event_type,
+        'created_at': event.created_at,
+        'data': event.payload,
+    }, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+async def post(url, body, headers, timeout):
+    """POST ``body`` to ``url`` and return the response status code"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        raise DeliveryError(f'Unsupported URL scheme {parts.scheme!r}.')
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    target = parts.path or '/'
+    if parts.query:
+        target += f'?{parts.query}'
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None,
+        )
+        try:
+            head = [
+                f'POST {target} HTTP/1.1',
+                f'Host: {parts.netloc}',
+                'Content-Type: application/json',
+                f'Content-Length: {len(body)}',
+                'Connection: close',
+                *(f'{name}: {value}' for name, value in headers.items()),
+            ]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+            await writer.drain()
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+        try:
+            return int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise DeliveryError(f'Invalid HTTP response: {status_line[:100]!r}')
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError:
+        raise DeliveryError(f'Timed out after {timeout}s.')
+    except (OSError, ssl.SSLError) as exc:
+        raise DeliveryError(str(exc) or type(exc).__name__)
+
+
+async def deliver(event, semaphore):
+    """Send one event; return None on success or the error message"""
+    body = event_body(event)
+    timestamp = str(int(timezone.now().timestamp()))
+    headers = {
+        'X-Webhook-Id': str(event.pk),
+        'X-Webhook-Event': event.event_type,
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': f'sha256={sign(event.endpoint.secret, timestamp, body)}',
+    }
+    async with semaphore:
+        try:
+            status = await post(event.endpoint.url, body, headers, settings.WEBHOOK_TIMEOUT)
+        except DeliveryError as exc:
+            return str(exc)
+    if 200 <= status < 300:
+        return None
+    return f'HTTP {status}'
+
+
+async def deliver_all(events):
+    semaphore = asyncio.Semaphore(settings.WEBHOOK_CONCURRENCY)
+    return await asyncio.gather(*(deliver(event, semaphore) for event in events))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at WEBHOOK_RETRY_MAX_SECONDS"""
+    delay = min(settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1, 1.2))
+
+
+def due_events(now):
+    """
+    Pending events that are due, plus processing ones whose lease expired,
+    that are first in line for their booking
+    """
+    earlier = OutboxEvent.objects.filter(
+        status__in=('pending', 'processing'),
+        endpoint=OuterRef('endpoint'),
+        booking_id=OuterRef('booking_id'),
+        id__lt=OuterRef('id'),
+    )
+    return (
+        OutboxEvent.objects.filter(
+            Q(status='pending', next_attempt_at__lte=now) | Q(status='processing', locked_until__lt=now)
+        )
+        .exclude(Exists(earlier))
+        .order_by('id')
+    )
+
+
+def claim_batch(batch_size):
+    """Lease up to ``batch_size`` due events and return them with the lease"""
+    now = timezone.now()
+    lease = uuid.uuid4()
+    with transaction.atomic():
+        ids = list(
+            due_events(now).select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return [], lease
+        OutboxEvent.objects.filter(id__in=ids).update(
+            status='processing', lease=lease, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS),
+        )
+    return list(OutboxEvent.objects.filter(id__in=ids).select_related('endpoint').order_by('id')), lease
+
+
+def record_results(events, errors, lease):
+    """Write delivery outcomes back for the events still leased to ``lease``"""
+    now = timezone.now()
+    with transaction.atomic():
+        held = set(
+            OutboxEvent.objects.filter(id__in=[event.pk for event in events], lease=lease)
+            .select_for_update().values_list('id', flat=True)
+        )
+        recorded = []
+        for event, error in zip(events, errors):
+            if event.pk not in held:
+                continue
+            event.lease = event.locked_until = None
+            if error is None:
+                event.status = 'delivered'
+                event.delivered_at = now
+                event.last_error = ''
+            else:
+                event.last_error = error[:1000]
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    event.status = 'failed'
+                else:
+                    event.status = 'pending'
+                    event.next_attempt_at = now + retry_delay(event.attempts)
+            recorded.append(event)
+        OutboxEvent.objects.bulk_update(
+            recorded,
+            ['status', 'next_attempt_at', 'lease', 'locked_until', 'last_error', 'delivered_at'],
+        )
+
+
+def dispatch_batch(batch_size=None):
+    """Deliver one batch of due events and return how many were attempted"""
+    events, lease = claim_batch(batch_size or settings.WEBHOOK_BATCH_SIZE)
+    if not events:
+        return 0
+    errors = asyncio.run(deliver_all(events))
+    record_results(events, errors, lease)
+    return len(events)
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from webhooks.dispatcher import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending booking webhooks from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.WEBHOOK_BATCH_SIZE, help='Events per batch')
+        parser.add_argument('--once', action='store_true', help='Drain the due events and exit')
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.WEBHOOK_POLL_INTERVAL,
+            help='Seconds to wait when no events are due',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            attempted = dispatch_batch(options['batch_size'])
+            if attempted:
+                self.stdout.write(f'Attempted {attempted} webhook deliveries.')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
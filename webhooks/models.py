@@ -0,0 +1,79 @@
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    Partner URL notified about booking events
+    """
+    EVENT_CHOICES = [
+        ('booking.created', 'Booking created'),
+        ('booking.confirmed', 'Booking confirmed'),
+        ('booking.cancelled', 'Booking cancelled'),
+    ]
+
+    name = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=128, default=generate_secret)
+    # Event types to deliver; empty means all of them
+    events = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'webhook_endpoints'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.url})"
+
+    def subscribes_to(self, event_type):
+        return not self.events or event_type in self.events
+
+
+class OutboxEvent(models.Model):
+    """
+    Booking event waiting to be delivered to one endpoint.
+
+    Rows are written in the same transaction as the booking change and
+    drained by the ``dispatch_webhooks`` command.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='events_outbox')
+    event_type = models.CharField(max_length=50, choices=WebhookEndpoint.EVENT_CHOICES)
+    # Plain id: bookings may be partitioned or archived, so no foreign key
+    booking_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set while a dispatcher delivers the event; see webhooks.dispatcher
+    lease = models.UUIDField(blank=True, null=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'webhook_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_outbox_due_idx'),
+            models.Index(fields=['endpoint', 'booking_id', 'id'], name='webhook_outbox_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for booking {self.booking_id} -> {self.endpoint_id}"
@@ -0,0 +1,56 @@
+"""
+Writing booking events to the outbox.
+
+One ``OutboxEvent`` is created per subscribed endpoint, on the same database
+and inside the same transaction as the booking change that caused it.
+"""
+from decimal import Decimal
+
+from django.db import router
+
+from .models import OutboxEvent, WebhookEndpoint
+
+
+def _amount(value):
+    if value is None:
+        return None
+    return str(Decimal(str(value)).quantize(Decimal('0.01')))
+
+
+PAYLOAD_FIELDS = (
+    'id', 'status', 'customer_id', 'vehicle_id', 'start_date', 'end_date',
+    'total_amount', 'deposit_amount', 'deposit_paid',
+)
+
+
+def booking_payload(values):
+    """Build the event payload from a mapping of ``PAYLOAD_FIELDS``"""
+    payload = {field: values[field] for field in PAYLOAD_FIELDS}
+    payload['total_amount'] = _amount(payload['total_amount'])
+    payload['deposit_amount'] = _amount(payload['deposit_amount'])
+    return payload
+
+
+def record_booking_events(bookings, event_type):
+    """
+    Queue ``event_type`` for several bookings with one insert.
+
+    ``bookings`` are mappings of ``PAYLOAD_FIELDS``, e.g. ``.values()`` rows.
+    """
+    using = router.db_for_write(OutboxEvent)
+    endpoints = [
+        endpoint for endpoint in WebhookEndpoint.objects.using(using).filter(is_active=True)
+        if endpoint.subscribes_to(event_type)
+    ]
+    if not endpoints:
+        return []
+    payloads = [booking_payload(values) for values in bookings]
+    return OutboxEvent.objects.using(using).bulk_create([
+        OutboxEvent(endpoint=endpoint, event_type=event_type, booking_id=payload['id'], payload=payload)
+        for payload in payloads
+        for endpoint in endpoints
+    ])
+
+
+def record_booking_event(booking, event_type):
+    return record_booking_events([{field: getattr(booking, field) for field in PAYLOAD_FIELDS}], event_type)
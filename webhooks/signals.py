@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from bookings.models import Booking
+from core.signals import bulk_updated
+from .outbox import PAYLOAD_FIELDS, record_booking_event, record_booking_events
+
+TERMINAL_STATUSES = ('cancelled', 'completed')
+
+
+@receiver(post_init, sender=Booking)
+def remember_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred status fields are not fetched
+    instance._webhook_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """Queue webhook events for new bookings and status changes"""
+    previous = None if created else instance._webhook_status
+    if created:
+        record_booking_event(instance, 'booking.created')
+    if instance.status != previous and instance.status in ('confirmed', 'cancelled'):
+        record_booking_event(instance, f'booking.{instance.status}')
+    instance._webhook_status = instance.status
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """Deleting a booking cancels it, unless it had already ended"""
+    if instance.status not in TERMINAL_STATUSES:
+        record_booking_event(instance, 'booking.cancelled')
+
+
+@receiver(bulk_updated, sender=Booking)
+def bookings_bulk_updated(sender, ids, fields, using, **kwargs):
+    """Queue one event per booking moved to confirmed or cancelled"""
+    if 'status' not in fields:
+        return
+    rows = Booking.objects.using(using).filter(id__in=ids, status__in=('confirmed', 'cancelled')).values(*PAYLOAD_FIELDS)
+    for status in ('confirmed', 'cancelled'):
+        matching = [row for row in rows if row['status'] == status]
+        if matching:
+            record_booking_events(matching, f'booking.{status}')
@@ -0,0 +1,227 @@
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from bookings.models import Booking
+from vehicles.models import Vehicle
+from .dispatcher import claim_batch, dispatch_batch, record_results
+from .models import OutboxEvent, WebhookEndpoint
+
+User = get_user_model()
+
+
+class StubPartner:
+    """Local HTTP server recording webhook requests"""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        # Booking ids whose next event is answered with 503
+        self.fail_bookings = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append((dict(self.headers), body))
+                booking_id = json.loads(body)['data'].get('id')
+                if booking_id in stub.fail_bookings:
+                    stub.fail_bookings.discard(booking_id)
+                    code = 503
+                else:
+                    code = stub.responses.pop(0) if stub.responses else 200
+                self.send_response(code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hooks?source=test'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def events(self):
+        return [json.loads(body) for _, body in self.requests]
+
+
+@override_settings(WEBHOOK_TIMEOUT=5)
+class WebhookOutboxTest(APITestCase):
+    """Test cases for the booking event outbox and dispatcher"""
+
+    def setUp(self):
+        self.partner = StubPartner()
+        self.addCleanup(self.partner.close)
+        self.endpoint = WebhookEndpoint.objects.create(name='Partner', url=self.partner.url, secret='s3cret')
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user, make='Toyota', model='Corolla', year=2021, plate_number='LEA-1', daily_rate=50
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start_date = timezone.now() + timedelta(days=1)
+
+    def create_booking(self, **kwargs):
+        return Booking.objects.create(
+            customer=self.user,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.start_date + timedelta(days=2),
+            total_amount=100.00,
+            **kwargs
+        )
+
+    def test_booking_changes_write_outbox_events(self):
+        """Test that creating, confirming and cancelling bookings queue events"""
+        response = self.client.post(reverse('bookings:booking-list-create'), {
+            'vehicle': self.vehicle.id,
+            'start_date': self.start_date.isoformat(),
+            'end_date': (self.start_date + timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse('bookings:booking-detail', args=[response.data['id']])
+        self.client.patch(url, {'status': 'confirmed'})
+        self.client.patch(url, {'notes': 'No status change'})
+        self.client.delete(url)
+
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('event_type', flat=True)),
+            ['booking.created', 'booking.confirmed', 'booking.cancelled'],
+        )
+
+    def test_outbox_event_rolls_back_with_booking(self):
+        """Test that events are written in the booking's transaction"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.create_booking()
+                raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_endpoint_event_filter(self):
+        """Test that endpoints only receive the event types they subscribe to"""
+        self.endpoint.events = ['booking.cancelled']
+        self.endpoint.save()
+        booking = self.create_booking()
+        self.assertFalse(OutboxEvent.objects.exists())
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(OutboxEvent.objects.get().event_type, 'booking.cancelled')
+
+    def test_dispatch_delivers_signed_events(self):
+        """Test that the dispatcher posts signed events and marks them delivered"""
+        bookings = [self.create_booking() for _ in range(3)]
+        self.assertEqual(dispatch_batch(), 3)
+
+        self.assertEqual(len(self.partner.requests), 3)
+        headers, body = self.partner.requests[0]
+        expected = hmac.new(
+            b's3cret', headers['X-Webhook-Timestamp'].encode() + b'.' + body, hashlib.sha256
+        ).hexdigest()
+        self.assertEqual(headers['X-Webhook-Signature'], f'sha256={expected}')
+        self.assertEqual(
+            sorted(event['data']['id'] for event in self.partner.events()), [b.id for b in bookings]
+        )
+        self.assertEqual(self.partner.events()[0]['data']['total_amount'], '100.00')
+        self.assertFalse(OutboxEvent.objects.exclude(status='delivered').exists())
+        self.assertEqual(dispatch_batch(), 0)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Test that failures are rescheduled and later retried"""
+        self.partner.responses = [500]
+        self.create_booking()
+        dispatch_batch()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'HTTP 500')
+        self.assertGreaterEqual(event.next_attempt_at, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(dispatch_batch(), 0)
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        dispatch_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'delivered')
+        self.assertEqual(event.attempts, 2)
+
+    def test_events_for_a_booking_are_delivered_in_order(self):
+        """Test that a failed event holds back later events for the same booking"""
+        booking = self.create_booking()
+        other = self.create_booking()
+        self.partner.fail_bookings = {booking.id}
+        booking.status = 'cancelled'
+        booking.save()
+
+        dispatch_batch()
+        # Events in one batch are posted concurrently and may arrive in any order
+        self.assertCountEqual(
+            [(e['type'], e['data']['id']) for e in self.partner.events()],
+            [('booking.created', booking.id), ('booking.created', other.id)],
+        )
+
+        OutboxEvent.objects.filter(status='pending').update(next_attempt_at=timezone.now())
+        dispatch_batch()
+        dispatch_batch()
+        self.assertEqual(
+            [e['type'] for e in self.partner.events() if e['data']['id'] == booking.id],
+            ['booking.created', 'booking.created', 'booking.cancelled'],
+        )
+
+    def test_bulk_status_change_writes_outbox_events(self):
+        """Test that set-wise cancellations queue one event per booking"""
+        bookings = [self.create_booking(), self.create_booking()]
+        OutboxEvent.objects.all().delete()
+        response = self.client.patch(
+            reverse('bookings:booking-bulk-status'),
+            {'ids': [booking.id for booking in bookings], 'status': 'cancelled'}, format='json',
+        )
+        self.assertEqual(response.data, {'updated': 2})
+        events = OutboxEvent.objects.order_by('booking_id')
+        self.assertEqual(
+            [(event.event_type, event.booking_id) for event in events],
+            [('booking.cancelled', bookings[0].id), ('booking.cancelled', bookings[1].id)],
+        )
+        self.assertEqual(events[0].payload['status'], 'cancelled')
+        self.assertEqual(events[0].payload['total_amount'], '100.00')
+
+    def test_expired_lease_is_taken_over(self):
+        """Test that events are claimed outside a transaction and stale results are not recorded"""
+        self.create_booking()
+        events, lease = claim_batch(10)
+        self.assertEqual(OutboxEvent.objects.get().status, 'processing')
+        self.assertEqual(claim_batch(10)[0], [])
+
+        OutboxEvent.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(dispatch_batch(), 1)
+        record_results(events, ['HTTP 500'], lease)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, 'delivered')
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNone(event.lease)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=1)
+    def test_unreachable_endpoint_gives_up(self):
+        """Test that events are marked failed after the last attempt"""
+        self.endpoint.url = 'http://127.0.0.1:1/unreachable'
+        self.endpoint.save()
+        self.create_booking()
+        call_command('dispatch_webhooks', once=True, stdout=StringIO())
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, 'failed')
+        self.assertTrue(event.last_error)